@@ -1,12 +1,84 @@
 from __future__ import annotations
 
+import weakref
+from abc import abstractmethod
 from typing import List
 from typing import Tuple
 from typing import Union
 
 
+# Live terms, indexed by their class and fields. Subterms are indexed by
+# identity (they are interned already, and kept alive by the term), so
+# holes equal by name but not by arguments stay apart. Entries go away with
+# the last reference to the term.
+_terms: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+
 class LiquidTerm:
-    pass
+    """A hash-consed liquid term.
+
+    Building a term structurally equal to a live one returns that same
+    object, so equality is identity. The hash, the free variables and the
+    variables (the free variables but the functions applied) of a term are
+    computed once, when it is built, and terms are immutable.
+    """
+
+    __slots__ = ("hash", "free_vars", "variables", "__weakref__")
+
+    hash: int
+    free_vars: frozenset[str]
+    variables: frozenset[str]
+
+    def __init_subclass__(cls, **kwargs):
+        # Checked when the class is defined, as an ABCMeta base would slow
+        # down every isinstance test on terms
+        super().__init_subclass__(**kwargs)
+        if getattr(cls.fields, "__isabstractmethod__", False):
+            raise TypeError(f"{cls.__name__} does not implement fields")
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self) -> int:
+        return self.hash
+
+    def __reduce__(self):
+        return (type(self), self.fields())
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @abstractmethod
+    def fields(self) -> tuple:
+        """The arguments the term is built from, in order."""
+
+
+def _intern(cls,
+            key: tuple,
+            fields: tuple,
+            hash_: int,
+            free_vars: frozenset[str],
+            variables: frozenset[str] | None = None):
+    term = object.__new__(cls)
+    for (name, value) in zip(cls.__slots__, fields):
+        object.__setattr__(term, name, value)
+    object.__setattr__(term, "hash", hash_)
+    object.__setattr__(term, "free_vars", free_vars)
+    object.__setattr__(term, "variables",
+                       free_vars if variables is None else variables)
+    _terms[key] = term
+    return term
+
+
+def interned_terms() -> int:
+    """Returns the number of distinct live liquid terms."""
+    return len(_terms)
 
 
 def ensure_liqterm(a: LiquidTerm | str) -> LiquidTerm:
@@ -16,16 +88,33 @@ def ensure_liqterm(a: LiquidTerm | str) -> LiquidTerm:
 
 
 class LiquidHole(LiquidTerm):
+    """A hole to be filled by liquid inference.
+
+    Holes are equal when they have the same name, whatever their arguments.
+    """
+
+    __slots__ = ("name", "argtypes")
+
     name: str
-    argtypes: list[tuple[LiquidTerm, str]]
+    argtypes: tuple[tuple[LiquidTerm, str], ...]
 
-    def __init__(
-        self,
+    def __new__(
+        cls,
         name: str,
         argtypes: list[tuple[LiquidTerm | str, str]] = None,
     ):
-        self.name = name
-        self.argtypes = [(ensure_liqterm(a), b) for (a, b) in (argtypes or [])]
+        argtypes = tuple(
+            (ensure_liqterm(a), b) for (a, b) in (argtypes or []))
+        key = (cls, name, tuple((id(a), b) for (a, b) in argtypes))
+        term = _terms.get(key)
+        if term is None:
+            free_vars = frozenset([name]).union(*(a.free_vars
+                                                  for (a, _) in argtypes))
+            term = _intern(cls, key, (name, argtypes), hash(name), free_vars)
+        return term
+
+    def fields(self) -> tuple:
+        return (self.name, list(self.argtypes))
 
     def __repr__(self):
         j = ", ".join([f"{n}:{t}" for (n, t) in self.argtypes])
@@ -34,87 +123,107 @@ class LiquidHole(LiquidTerm):
     def __eq__(self, other):
         return isinstance(other, LiquidHole) and other.name == self.name
 
-    def __hash__(self) -> int:
-        return hash(self.name)
+    __hash__ = LiquidTerm.__hash__
 
 
 class LiquidLiteralBool(LiquidTerm):
+    __slots__ = ("value", )
+
     value: bool
 
-    def __init__(self, value: bool):
-        self.value = value
+    def __new__(cls, value: bool):
+        term = _terms.get((cls, value))
+        if term is None:
+            term = _intern(cls, (cls, value), (value, ), hash(value),
+                           frozenset())
+        return term
+
+    def fields(self) -> tuple:
+        return (self.value, )
 
     def __repr__(self):
         return f"{self.value}".lower()
 
-    def __eq__(self, other):
-        return isinstance(other,
-                          LiquidLiteralBool) and other.value == self.value
-
-    def __hash__(self) -> int:
-        return hash(self.value)
-
 
 class LiquidLiteralInt(LiquidTerm):
+    __slots__ = ("value", )
+
     value: int
 
-    def __init__(self, value: int):
-        self.value = value
+    def __new__(cls, value: int):
+        term = _terms.get((cls, value))
+        if term is None:
+            term = _intern(cls, (cls, value), (value, ), hash(value),
+                           frozenset())
+        return term
+
+    def fields(self) -> tuple:
+        return (self.value, )
 
     def __repr__(self):
         return f"{self.value}"
 
-    def __eq__(self, other):
-        return isinstance(other,
-                          LiquidLiteralInt) and other.value == self.value
-
-    def __hash__(self) -> int:
-        return hash(self.value)
-
 
 class LiquidLiteralString(LiquidTerm):
+    __slots__ = ("value", )
+
     value: str
 
-    def __init__(self, value: str):
-        self.value = value
+    def __new__(cls, value: str):
+        term = _terms.get((cls, value))
+        if term is None:
+            term = _intern(cls, (cls, value), (value, ), hash(value),
+                           frozenset())
+        return term
+
+    def fields(self) -> tuple:
+        return (self.value, )
 
     def __repr__(self):
         return f"{self.value}"
 
-    def __eq__(self, other):
-        return isinstance(other,
-                          LiquidLiteralString) and other.value == self.value
-
-    def __hash__(self) -> int:
-        return hash(self.value)
-
 
 class LiquidVar(LiquidTerm):
+    __slots__ = ("name", )
+
     name: str
 
-    def __init__(self, name: str):
+    def __new__(cls, name: str):
         assert isinstance(name, str)
-        self.name = name
+        term = _terms.get((cls, name))
+        if term is None:
+            term = _intern(cls, (cls, name), (name, ), hash(name),
+                           frozenset([name]))
+        return term
+
+    def fields(self) -> tuple:
+        return (self.name, )
 
     def __repr__(self):
         return f"{self.name}"
 
-    def __eq__(self, other):
-        return isinstance(other, LiquidVar) and other.name == self.name
-
-    def __hash__(self) -> int:
-        return hash(self.name)
-
 
 class LiquidApp(LiquidTerm):
+    __slots__ = ("fun", "args")
+
     fun: str
-    args: list[LiquidTerm]
+    args: tuple[LiquidTerm, ...]
 
-    def __init__(self, fun: str, args: list[LiquidTerm]):
-        self.fun = fun
-        self.args = args
-        for a in self.args:
+    def __new__(cls, fun: str, args: list[LiquidTerm]):
+        args = tuple(args)
+        for a in args:
             assert isinstance(a, LiquidTerm)
+        key = (cls, fun, tuple(map(id, args)))
+        term = _terms.get(key)
+        if term is None:
+            free_vars = frozenset([fun]).union(*(a.free_vars for a in args))
+            variables = frozenset().union(*(a.variables for a in args))
+            term = _intern(cls, key, (fun, args), hash((fun, args)),
+                           free_vars, variables)
+        return term
+
+    def fields(self) -> tuple:
+        return (self.fun, list(self.args))
 
     def __repr__(self):
         if all([not c.isalnum() for c in self.fun]) and len(self.args) == 2:
@@ -124,12 +233,10 @@ class LiquidApp(LiquidTerm):
         fargs = ",".join([repr(x) for x in self.args])
         return f"{self.fun}({fargs})"
 
-    def __eq__(self, other):
-        return (isinstance(other, LiquidApp) and other.fun == self.fun
-                and all(x == y for (x, y) in zip(self.args, other.args)))
 
-    def __hash__(self) -> int:
-        return hash(self.fun) + sum(hash(a) for a in self.args)
+# The boolean literals are built over and over (e.g. to be compared with),
+# so they are kept alive instead of being interned again every time.
+_pinned = (LiquidLiteralBool(True), LiquidLiteralBool(False))
 
 
 def liquid_free_vars(e: LiquidTerm) -> list[str]:
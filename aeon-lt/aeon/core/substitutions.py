@@ -55,7 +55,9 @@ def substitution_in_liquid(t: LiquidTerm, rep: LiquidTerm,
                            name: str) -> LiquidTerm:
     """substitutes name in the term t with the new replacement term rep."""
     assert isinstance(rep, LiquidTerm)
-    if isinstance(t, LiquidLiteralInt):
+    if name not in t.free_vars:
+        return t
+    elif isinstance(t, LiquidLiteralInt):
         return t
     elif isinstance(t, LiquidLiteralBool):
         return t
@@ -185,7 +187,7 @@ def liquefy_app(app: Application) -> LiquidApp | None:
         liquid_pseudo_fun = liquefy_app(app.fun)
         if liquid_pseudo_fun:
             return LiquidApp(liquid_pseudo_fun.fun,
-                             liquid_pseudo_fun.args + [arg])
+                             list(liquid_pseudo_fun.args) + [arg])
         return None
     elif isinstance(app.fun, Let):
         return liquefy_app(
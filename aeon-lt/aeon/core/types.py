@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 from abc import ABC
+from abc import abstractmethod
 from dataclasses import dataclass
 from typing import List
 from typing import Tuple
 from typing import Union
 
 from aeon.core.liquid import liquid_free_vars
+from aeon.core.liquid import LiquidApp
 from aeon.core.liquid import LiquidHole
 from aeon.core.liquid import LiquidLiteralBool
+from aeon.core.liquid import LiquidLiteralInt
 from aeon.core.liquid import LiquidTerm
+from aeon.core.liquid import LiquidVar
 
 
 class Kind(ABC):
@@ -115,15 +119,46 @@ top = Top()
 bottom = Bottom()
 
 
-class AbstractionType(Type):
+class ImmutableType(Type):
+    """A type whose fields cannot be reassigned once it is built.
+
+    Renamings and substitutions build new types, sharing the parts they do
+    not change, so types can be shared between contexts, annotations and
+    layers without being copied.
+    """
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return (type(self), self.fields())
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @abstractmethod
+    def fields(self) -> tuple:
+        """The arguments the type is built from, in order."""
+
+
+class AbstractionType(ImmutableType):
     var_name: str
     var_type: Type
     type: Type
 
     def __init__(self, var_name: str, var_type: Type, type: Type):
-        self.var_name = var_name
-        self.var_type = var_type
-        self.type = type
+        object.__setattr__(self, "var_name", var_name)
+        object.__setattr__(self, "var_type", var_type)
+        object.__setattr__(self, "type", type)
+
+    def fields(self) -> tuple:
+        return (self.var_name, self.var_type, self.type)
 
     def __repr__(self):
         return f"({self.var_name}:{self.var_type}) -> {self.type}"
@@ -138,16 +173,26 @@ class AbstractionType(Type):
         return hash(self.var_name) + hash(self.var_type) + hash(self.type)
 
 
-class RefinedType(Type):
+class RefinedType(ImmutableType):
     name: str
     type: BaseType | TypeVar
     refinement: LiquidTerm
 
     def __init__(self, name: str, ty: BaseType | TypeVar,
                  refinement: LiquidTerm):
-        self.name = name
-        self.type = ty
-        self.refinement = refinement
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "type", ty)
+        object.__setattr__(self, "refinement", refinement)
+
+    def fields(self) -> tuple:
+        return (self.name, self.type, self.refinement)
+
+    def with_refinement(self, refinement: LiquidTerm) -> RefinedType:
+        """Returns this type with another refinement (itself, if it is the
+        same)."""
+        if refinement is self.refinement:
+            return self
+        return RefinedType(self.name, self.type, refinement)
 
     def __repr__(self):
         return f"{{ {self.name}:{self.type} | {self.refinement} }}"
@@ -168,6 +213,43 @@ class TypePolymorphism(Type):
     body: Type
 
 
+def mk_singleton_int(value: int, name: str = "v") -> RefinedType:
+    """Returns the type of an integer literal, { name:Int | name == value }."""
+    return RefinedType(
+        name,
+        t_int,
+        LiquidApp("==", [LiquidVar(name), LiquidLiteralInt(value)]),
+    )
+
+
+def mk_singleton_bool(value: bool, name: str = "v") -> RefinedType:
+    """Returns the type of a boolean literal, { name:Bool | name } or {
+    name:Bool | !name }."""
+    if value:
+        return RefinedType(name, t_bool, LiquidVar(name))
+    return RefinedType(name, t_bool, LiquidApp("!", [LiquidVar(name)]))
+
+
+def mk_binop_result(
+    name: str,
+    ty: BaseType,
+    op: str,
+    lhs: str,
+    rhs: str,
+) -> RefinedType:
+    """Returns the type of the result of a binary operation, { name:ty |
+    name == (lhs op rhs) }."""
+    return RefinedType(
+        name,
+        ty,
+        LiquidApp(
+            "==",
+            [LiquidVar(name),
+             LiquidApp(op, [LiquidVar(lhs), LiquidVar(rhs)])],
+        ),
+    )
+
+
 def extract_parts(
     t: RefinedType | BaseType | TypeVar,
 ) -> tuple[str, BaseType | TypeVar, LiquidTerm]:
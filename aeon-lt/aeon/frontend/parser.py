@@ -184,14 +184,61 @@ class TreeToCore(Transformer):
         return StarKind()
 
 
-def mk_parser(rule="start", start_counter=0):
-    return Lark.open(
+# Building a parser analyses the grammar and constructs the LALR tables from
+# scratch, which is far more expensive than parsing a single type. Parsers are
+# therefore built once per start rule and shared for the rest of the process.
+# Lark additionally serializes the analysed grammar to disk (``cache=True``),
+# so that even the first build of a new process is cheap.
+parser_registry: dict[str, tuple[Lark, TreeToCore]] = {}
+parser_registry_stats: dict[str, int] = {"hits": 0, "builds": 0}
+
+
+def get_registered_parser(rule: str) -> tuple[Lark, TreeToCore]:
+    """Returns the shared parser for a start rule, building it on first
+    use."""
+    if rule in parser_registry:
+        parser_registry_stats["hits"] += 1
+        return parser_registry[rule]
+
+    transformer = TreeToCore()
+    parser = Lark.open(
         pathlib.Path(__file__).parent.absolute() / "aeon_core.lark",
         parser="lalr",
         # lexer='standard',
         start=rule,
-        transformer=TreeToCore(start_counter),
+        transformer=transformer,
+        cache=True,
     )
+    parser_registry[rule] = (parser, transformer)
+    parser_registry_stats["builds"] += 1
+    return parser_registry[rule]
+
+
+class RegisteredParser:
+    """Handle to a shared parser.
+
+    Each handle keeps its own counter for fresh ANF names, so it
+    behaves exactly like a parser built with the same start counter.
+    """
+
+    rule: str
+    counter: int
+
+    def __init__(self, rule: str, start_counter: int = 0):
+        self.rule = rule
+        self.counter = start_counter
+
+    def parse(self, text: str) -> Any:
+        parser, transformer = get_registered_parser(self.rule)
+        transformer.counter = self.counter
+        try:
+            return parser.parse(text)
+        finally:
+            self.counter = transformer.counter
+
+
+def mk_parser(rule="start", start_counter=0) -> RegisteredParser:
+    return RegisteredParser(rule, start_counter)
 
 
 parse_type: Callable[[str], Type] = mk_parser("type").parse
@@ -8,12 +8,26 @@ from typing import Tuple
 
 from aeon.core.types import Kind
 from aeon.core.types import Type
+from aeon.utils.names import NameSupply
+from aeon.utils.pmap import PMap
 
 
 class TypingContext(ABC):
+    """A persistent typing context.
+
+    Contexts are immutable chains of binders, and each of them also keeps
+    a persistent map from the variables in scope to their types (shared
+    with the context it extends). Extending a context and looking up a
+    variable thus take O(log n) time, instead of walking the chain.
+    """
+
+    # Variables in scope, the innermost binding of each name
+    index: PMap
+    # Context the supply of fresh variables belongs to
+    root: EmptyContext
 
     def type_of(self, name: str) -> Type | None:
-        return None
+        return self.index.get(name)
 
     def with_var(self, name: str, type: Type) -> TypingContext:
         return VariableBinder(self, name, type)
@@ -22,7 +36,8 @@ class TypingContext(ABC):
         return TypeBinder(self, name, kind)
 
     def fresh_var(self):
-        return "fresh_"
+        """Returns a name that is not bound in this context."""
+        return self.root.names.fresh("fresh", self, numbered=True)
 
     def typevars(self) -> list[tuple[str, Kind]]:
         ...
@@ -30,15 +45,31 @@ class TypingContext(ABC):
     def vars(self) -> list[tuple[str, Type]]:
         ...
 
+    def binder_hash(self, prev_hash: int) -> int:
+        ...
 
-class EmptyContext(TypingContext):
+    def __hash__(self) -> int:
+        # Hashes are computed once per binder, from the innermost binder
+        # that has one already, without recursing down the chain
+        chain = []
+        ctx: TypingContext = self
+        while ctx._hash is None:
+            chain.append(ctx)
+            ctx = ctx.prev
+        h = ctx._hash
+        for binder in reversed(chain):
+            h = binder._hash = binder.binder_hash(h)
+        return h
 
-    def __init__(self):
-        self.counter = 0
 
-    def fresh_var(self):
-        self.counter += 1
-        return f"fresh_{self.counter}"
+class EmptyContext(TypingContext):
+
+    def __init__(self, names: NameSupply | None = None):
+        # Contexts built on top of this one draw fresh names from here
+        self.names = names if names is not None else NameSupply()
+        self.index = PMap()
+        self.root = self
+        self._hash = 0
 
     def __repr__(self) -> str:
         return "ø"
@@ -59,37 +90,31 @@ class VariableBinder(TypingContext):
     type: Type
 
     def __init__(self, prev: TypingContext, name: str, type: Type):
+        assert isinstance(prev, TypingContext)
         self.prev = prev
         self.name = name
         self.type = type
-        assert isinstance(prev, TypingContext)
-        assert name not in prev.vars()
-
-    def type_of(self, name: str) -> Type | None:
-        if name == self.name:
-            return self.type
-        return self.prev.type_of(name)
-
-    def fresh_var(self):
-        p = int(self.prev.fresh_var().split("_")[-1])
-        while True:
-            name = f"fresh_{p}"
-            if self.type_of(name) is None:
-                break
-            p += 1
-        return name
+        self.index = prev.index.set(name, type)
+        self.root = prev.root
+        self._hash = None
 
     def __repr__(self) -> str:
         return f"{self.prev},{self.name}:{self.type}"
 
     def vars(self) -> list[tuple[str, Type]]:
-        return [(self.name, self.type)] + self.prev.vars()
+        result = []
+        ctx: TypingContext = self
+        while not isinstance(ctx, EmptyContext):
+            if isinstance(ctx, VariableBinder):
+                result.append((ctx.name, ctx.type))
+            ctx = ctx.prev
+        return result
 
     def typevars(self) -> list[tuple[str, Kind]]:
         return self.prev.typevars()
 
-    def __hash__(self) -> int:
-        return hash(self.prev) + hash(self.name) + hash(self.type)
+    def binder_hash(self, prev_hash: int) -> int:
+        return prev_hash + hash(self.name) + hash(self.type)
 
 
 class TypeBinder(TypingContext):
@@ -100,21 +125,24 @@ class TypeBinder(TypingContext):
         self.prev = prev
         self.type_name = type_name
         self.type_kind = type_kind
-
-    def type_of(self, name: str) -> Type | None:
-        return self.prev.type_of(name)
-
-    def fresh_var(self):
-        return self.prev.fresh_var()
+        self.index = prev.index
+        self.root = prev.root
+        self._hash = None
 
     def vars(self) -> list[tuple[str, Type]]:
         return self.prev.vars()
 
     def typevars(self) -> list[tuple[str, Kind]]:
-        return [(self.type_name, self.type_kind)] + self.prev.typevars()
+        result = []
+        ctx: TypingContext = self
+        while not isinstance(ctx, EmptyContext):
+            if isinstance(ctx, TypeBinder):
+                result.append((ctx.type_name, ctx.type_kind))
+            ctx = ctx.prev
+        return result
 
     def __repr__(self) -> str:
         return f"{self.prev},<{self.type_name}:{self.type_kind}>"
 
-    def __hash__(self) -> int:
-        return hash(self.prev) + hash(self.type_name) + hash(self.type_kind)
+    def binder_hash(self, prev_hash: int) -> int:
+        return prev_hash + hash(self.type_name) + hash(self.type_kind)
@@ -1,30 +1,131 @@
 from __future__ import annotations
 
+from aeon.core.liquid import LiquidTerm
 from aeon.core.liquid import LiquidVar
+from aeon.core.liquid_ops import ops
 from aeon.core.substitutions import substitution_in_liquid
 from aeon.core.types import AbstractionType
+from aeon.core.types import BaseType
 from aeon.core.types import extract_parts
 from aeon.typing.context import EmptyContext
 from aeon.typing.context import TypeBinder
 from aeon.typing.context import TypingContext
 from aeon.typing.context import VariableBinder
+from aeon.verification.horn import obtain_holes_constraint
 from aeon.verification.horn import solve
 from aeon.verification.vcs import Constraint
 from aeon.verification.vcs import Implication
+from aeon.verification.vcs import variables_free_in
 
+# Drop the hypotheses of the context that are not connected to the goal
+slicing = True
+# Whether hypotheses sharing an uninterpreted function (e.g. n_rows) are
+# connected, besides those sharing a variable
+slice_through_functions = False
 
-def entailment(ctx: TypingContext, c: Constraint):
-    if isinstance(ctx, EmptyContext):
-        return solve(c)
-        # return smt_valid(c)
-    elif isinstance(ctx, VariableBinder):
-        if isinstance(ctx.type, AbstractionType):
-            return entailment(ctx.prev, c)
-        else:
+# Counters of the entailment checks since the last reset_slice_stats
+slice_stats: dict[str, int] = {
+    "queries": 0,
+    "sliced": 0,
+    "hypotheses": 0,
+    "kept": 0,
+    "fallbacks": 0,
+}
+
+Hypothesis = tuple[str, BaseType, LiquidTerm]
+
+interpreted = frozenset(ops)
+
+
+def reset_slice_stats():
+    for key in slice_stats:
+        slice_stats[key] = 0
+
+
+def hypotheses(ctx: TypingContext) -> list[Hypothesis]:
+    """Returns the (name, base, refinement) binders of a context, innermost
+    first, that entailment turns into hypotheses."""
+    result = []
+    while not isinstance(ctx, EmptyContext):
+        if isinstance(ctx, VariableBinder) and not isinstance(
+                ctx.type, AbstractionType):
             (name, base, cond) = extract_parts(ctx.type)
             ncond = substitution_in_liquid(cond, LiquidVar(ctx.name), name)
-            return entailment(ctx.prev, Implication(ctx.name, base, ncond, c))
-    elif isinstance(ctx, TypeBinder):
-        return entailment(ctx.prev, c)  # TODO
-    else:
-        assert False
+            result.append((ctx.name, base, ncond))
+        elif not isinstance(ctx, (VariableBinder, TypeBinder)):
+            assert False
+        ctx = ctx.prev
+    return result
+
+
+def symbols(t: LiquidTerm) -> frozenset[str]:
+    if slice_through_functions:
+        return t.free_vars - interpreted
+    return t.variables
+
+
+def relevant_hypotheses(hs: list[Hypothesis],
+                        c: Constraint) -> list[Hypothesis] | None:
+    """Keeps the hypotheses transitively connected to the goal through
+    their variables (and uninterpreted functions, if
+    ``slice_through_functions`` is set).
+
+    Returns None if the hypotheses cannot be sliced, e.g. because a name is
+    bound twice.
+    """
+    if len({name for (name, _, _) in hs}) != len(hs):
+        return None
+    binders_of: dict[str, list[int]] = {}
+    for (i, (name, _, cond)) in enumerate(hs):
+        for sym in symbols(cond) | {name}:
+            binders_of.setdefault(sym, []).append(i)
+    kept = [False] * len(hs)
+    pending = list(set(variables_free_in(c)) - interpreted)
+    reached = set(pending)
+    while pending:
+        for i in binders_of.get(pending.pop(), []):
+            if kept[i]:
+                continue
+            kept[i] = True
+            (name, _, cond) = hs[i]
+            for sym in symbols(cond) | {name}:
+                if sym not in reached:
+                    reached.add(sym)
+                    pending.append(sym)
+    return [h for (h, k) in zip(hs, kept) if k]
+
+
+def implication_of(hs: list[Hypothesis], c: Constraint) -> Constraint:
+    for (name, base, cond) in hs:
+        c = Implication(name, base, cond, c)
+    return c
+
+
+def entailment(ctx: TypingContext, c: Constraint, backend: str | None = None):
+    return hypotheses_entail(hypotheses(ctx), c, backend)
+
+
+def hypotheses_entail(hs: list[Hypothesis],
+                      c: Constraint,
+                      backend: str | None = None) -> bool:
+    """Checks whether the hypotheses of a context (see ``hypotheses``)
+    entail a constraint."""
+    full = implication_of(hs, c)
+    # Constraints with holes are left whole for liquid inference
+    if slicing and not obtain_holes_constraint(full):
+        relevant = relevant_hypotheses(hs, c)
+        if relevant is not None:
+            slice_stats["queries"] += 1
+            slice_stats["hypotheses"] += len(hs)
+            slice_stats["kept"] += len(relevant)
+            if len(relevant) < len(hs):
+                slice_stats["sliced"] += 1
+            if solve(implication_of(relevant, c), backend):
+                return True
+            if len(relevant) == len(hs):
+                return False
+            # Leaving hypotheses out can only turn a valid query into an
+            # invalid one (e.g. if they are contradictory), so the whole
+            # context decides
+            slice_stats["fallbacks"] += 1
+    return solve(full, backend)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Any
+
+
+class NameSupply:
+    """Hands out fresh variable names, such as ``x``, ``x_1``, ``x_2``...
+
+    The supply keeps a counter per base name and never gives the same name
+    twice. Names bound in the contexts it is given are skipped, and so are
+    never tried again, which makes drawing a name O(1) amortized instead of
+    probing ``x_1``, ``x_2``... in the context on every call.
+
+    Supplies with different separators never hand out the same numbered
+    name, as long as the separators do not occur in the base names.
+    """
+
+    def __init__(self, separator: str = "_"):
+        self.separator = separator
+        self.counters: dict[str, int] = {}
+
+    def fresh(self, base: str, *contexts: Any, numbered: bool = False) -> str:
+        """Returns a name derived from ``base`` that is not bound in any of
+        the given typing contexts.
+
+        The first name drawn for a base is the base itself, unless
+        ``numbered`` is set.
+        """
+        counter = self.counters.get(base, 1 if numbered else 0)
+        while True:
+            name = f"{base}{self.separator}{counter}" if counter else base
+            counter += 1
+            if all(ctx.type_of(name) is None for ctx in contexts):
+                break
+        self.counters[base] = counter
+        return name
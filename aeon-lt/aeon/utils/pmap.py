@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+from typing import Any
+from typing import Iterator
+from typing import Mapping
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+MAX_SHIFT = 30
+
+
+def _popcount(x: int) -> int:
+    return bin(x).count("1")
+
+
+class _Bitmap:
+    """Trie node with up to 32 entries, indexed by a bitmap.
+
+    Each entry is either a ``(key, value)`` pair or a child node.
+    """
+
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: tuple):
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def get(self, shift: int, h: int, key: Any, default: Any) -> Any:
+        bit = 1 << ((h >> shift) & MASK)
+        if not self.bitmap & bit:
+            return default
+        entry = self.entries[_popcount(self.bitmap & (bit - 1))]
+        if isinstance(entry, tuple):
+            return entry[1] if entry[0] == key else default
+        return entry.get(shift + BITS, h, key, default)
+
+    def set(self, shift: int, h: int, key: Any,
+            value: Any) -> tuple[_Bitmap, bool]:
+        bit = 1 << ((h >> shift) & MASK)
+        index = _popcount(self.bitmap & (bit - 1))
+        if not self.bitmap & bit:
+            entries = self.entries[:index] + (
+                (key, value), ) + self.entries[index:]
+            return _Bitmap(self.bitmap | bit, entries), True
+        entry = self.entries[index]
+        if isinstance(entry, tuple):
+            if entry[0] == key:
+                if entry[1] is value:
+                    return self, False
+                node, added = (key, value), False
+            else:
+                node, added = _split(shift + BITS, entry, hash(entry[0]),
+                                     (key, value), h), True
+        else:
+            node, added = entry.set(shift + BITS, h, key, value)
+            if node is entry:
+                return self, False
+        entries = self.entries[:index] + (node, ) + self.entries[index + 1:]
+        return _Bitmap(self.bitmap, entries), added
+
+    def remove(self, shift: int, h: int, key: Any) -> _Bitmap | tuple | None:
+        bit = 1 << ((h >> shift) & MASK)
+        if not self.bitmap & bit:
+            return self
+        index = _popcount(self.bitmap & (bit - 1))
+        entry = self.entries[index]
+        if isinstance(entry, tuple):
+            if entry[0] != key:
+                return self
+            node = None
+        else:
+            node = entry.remove(shift + BITS, h, key)
+            if node is entry:
+                return self
+        if node is None:
+            if len(self.entries) == 1:
+                return None
+            entries = self.entries[:index] + self.entries[index + 1:]
+            if len(entries) == 1 and isinstance(entries[0], tuple):
+                return entries[0]
+            return _Bitmap(self.bitmap & ~bit, entries)
+        entries = self.entries[:index] + (node, ) + self.entries[index + 1:]
+        return _Bitmap(self.bitmap, entries)
+
+    def items(self) -> Iterator[tuple[Any, Any]]:
+        for entry in self.entries:
+            if isinstance(entry, tuple):
+                yield entry
+            else:
+                yield from entry.items()
+
+
+class _Collision:
+    """Leaf holding the entries whose keys have the same full hash."""
+
+    __slots__ = ("entries", )
+
+    def __init__(self, entries: tuple):
+        self.entries = entries
+
+    def get(self, shift: int, h: int, key: Any, default: Any) -> Any:
+        for (k, v) in self.entries:
+            if k == key:
+                return v
+        return default
+
+    def set(self, shift: int, h: int, key: Any,
+            value: Any) -> tuple[_Collision, bool]:
+        for (i, (k, v)) in enumerate(self.entries):
+            if k == key:
+                if v is value:
+                    return self, False
+                return _Collision(self.entries[:i] + ((key, value), ) +
+                                  self.entries[i + 1:]), False
+        return _Collision(self.entries + ((key, value), )), True
+
+    def remove(self, shift: int, h: int, key: Any) -> _Collision | tuple:
+        entries = tuple((k, v) for (k, v) in self.entries if k != key)
+        if len(entries) == len(self.entries):
+            return self
+        if len(entries) == 1:
+            return entries[0]
+        return _Collision(entries)
+
+    def items(self) -> Iterator[tuple[Any, Any]]:
+        yield from self.entries
+
+
+def _split(shift: int, e1: tuple, h1: int, e2: tuple, h2: int):
+    """Builds the smallest node holding two entries with distinct keys."""
+    if shift > MAX_SHIFT or h1 == h2:
+        return _Collision((e1, e2))
+    i1 = (h1 >> shift) & MASK
+    i2 = (h2 >> shift) & MASK
+    if i1 == i2:
+        return _Bitmap(1 << i1, (_split(shift + BITS, e1, h1, e2, h2), ))
+    entries = (e1, e2) if i1 < i2 else (e2, e1)
+    return _Bitmap((1 << i1) | (1 << i2), entries)
+
+
+_EMPTY_NODE = _Bitmap(0, ())
+_missing = object()
+
+
+class PMap(Mapping):
+    """Persistent hash map (a hash array mapped trie).
+
+    Updates return a new map and leave the original untouched, sharing all
+    the unchanged parts of the trie with it. Setting a key costs
+    O(log32 n) time and memory, which makes it cheap to keep a snapshot of
+    an environment at every point of a program.
+    """
+
+    __slots__ = ("_root", "_size", "_hash")
+
+    def __init__(self, items: Mapping | None = None):
+        self._root = _EMPTY_NODE
+        self._size = 0
+        self._hash = None
+        if items:
+            for (k, v) in items.items():
+                (self._root, added) = self._root.set(0, hash(k), k, v)
+                self._size += added
+
+    @classmethod
+    def _make(cls, root: _Bitmap, size: int) -> PMap:
+        m = cls.__new__(cls)
+        m._root = root
+        m._size = size
+        m._hash = None
+        return m
+
+    def set(self, key: Any, value: Any) -> PMap:
+        """Returns a map where ``key`` is bound to ``value``."""
+        (root, added) = self._root.set(0, hash(key), key, value)
+        if root is self._root:
+            return self
+        return PMap._make(root, self._size + added)
+
+    def update(self, items: Mapping) -> PMap:
+        m = self
+        for (k, v) in items.items():
+            m = m.set(k, v)
+        return m
+
+    def remove(self, key: Any) -> PMap:
+        """Returns a map without ``key``."""
+        root = self._root.remove(0, hash(key), key)
+        if root is self._root:
+            return self
+        if root is None:
+            return PMap._make(_EMPTY_NODE, 0)
+        if isinstance(root, tuple):
+            return PMap._make(_EMPTY_NODE, 0).set(root[0], root[1])
+        if isinstance(root, _Collision):
+            m = PMap._make(_EMPTY_NODE, 0)
+            for (k, v) in root.items():
+                m = m.set(k, v)
+            return m
+        return PMap._make(root, self._size - 1)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self._root.get(0, hash(key), key, default)
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self._root.get(0, hash(key), key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        return self._root.get(0, hash(key), key, _missing) is not _missing
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Any]:
+        return (k for (k, _) in self._root.items())
+
+    def items(self):
+        return list(self._root.items())
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(frozenset(self._root.items()))
+        return self._hash
+
+    def __reduce__(self):
+        # The layout of the trie depends on the hash seed of the interpreter,
+        # so maps are rebuilt from their items when unpickled.
+        return (PMap, (dict(self._root.items()), ))
+
+    def __repr__(self):
+        return f"PMap({dict(self._root.items())!r})"
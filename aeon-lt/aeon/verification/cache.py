@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import os
+import shelve
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+
+from aeon.core.liquid import LiquidApp
+from aeon.core.liquid import LiquidHole
+from aeon.core.liquid import LiquidLiteralBool
+from aeon.core.liquid import LiquidLiteralInt
+from aeon.core.liquid import LiquidLiteralString
+from aeon.core.liquid import LiquidTerm
+from aeon.core.liquid import LiquidVar
+from aeon.verification.vcs import Conjunction
+from aeon.verification.vcs import Constraint
+from aeon.verification.vcs import Implication
+from aeon.verification.vcs import LiquidConstraint
+
+
+class _Canonicalizer:
+    """Builds alpha-equivalence invariant keys for constraints.
+
+    Variables bound by an Implication are replaced by their de Bruijn
+    index, and holes are numbered in order of first occurrence, so two
+    constraints that only differ in the names they pick for binders and
+    holes get the same key.
+    """
+
+    def __init__(self):
+        self.holes: dict[str, int] = {}
+
+    def name(self, name: str, scope: list[str]) -> tuple:
+        for (i, bound) in enumerate(reversed(scope)):
+            if bound == name:
+                return ("b", i)
+        return ("f", name)
+
+    def base(self, base: Any) -> tuple:
+        return (type(base).__name__, getattr(base, "name", repr(base)))
+
+    def liquid(self, t: LiquidTerm, scope: list[str]) -> tuple:
+        if isinstance(t, LiquidLiteralBool):
+            return ("bool", t.value)
+        elif isinstance(t, LiquidLiteralInt):
+            return ("int", t.value)
+        elif isinstance(t, LiquidLiteralString):
+            return ("str", t.value)
+        elif isinstance(t, LiquidVar):
+            return self.name(t.name, scope)
+        elif isinstance(t, LiquidHole):
+            index = self.holes.setdefault(t.name, len(self.holes))
+            args = tuple((self.liquid(a, scope), s) for (a, s) in t.argtypes)
+            return ("hole", index, args)
+        elif isinstance(t, LiquidApp):
+            args = tuple(self.liquid(a, scope) for a in t.args)
+            return ("app", self.name(t.fun, scope), args)
+        assert False
+
+    def constraint(self, c: Constraint, scope: list[str]) -> tuple:
+        if isinstance(c, LiquidConstraint):
+            return ("c", self.liquid(c.expr, scope))
+        elif isinstance(c, Conjunction):
+            return ("and", self.constraint(c.c1, scope),
+                    self.constraint(c.c2, scope))
+        elif isinstance(c, Implication):
+            inner = scope + [c.name]
+            return ("imp", self.base(c.base), self.liquid(c.pred, inner),
+                    self.constraint(c.seq, inner))
+        assert False
+
+
+def canonical_constraint(c: Constraint) -> tuple:
+    """Returns the alpha-normalized structure of a constraint."""
+    return _Canonicalizer().constraint(c, [])
+
+
+def constraint_key(c: Constraint) -> str:
+    """Returns a stable structural hash of a constraint.
+
+    Unlike ``hash``, the key does not depend on the interpreter run, so it
+    can be used to index an on-disk store.
+    """
+    return hashlib.blake2b(repr(canonical_constraint(c)).encode(),
+                           digest_size=20).hexdigest()
+
+
+class ValidityCache:
+    """LRU cache of constraint validity results.
+
+    Results are kept in memory for the ``maxsize`` most recently used
+    constraints. If ``path`` is given, they are also written to a shelve
+    store there, so that they survive across runs. The store is only used
+    by the process that opened it; forked workers fall back to memory.
+    """
+
+    def __init__(self, maxsize: int = 4096, path: str | None = None):
+        self.maxsize = maxsize
+        self.entries: OrderedDict[str, bool] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.store = None
+        self.owner = os.getpid()
+        if path is not None:
+            self.store = shelve.open(path)
+            atexit.register(self.close)
+
+    def lookup(self, key: str) -> bool | None:
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        store = self.shared_store()
+        if store is not None and key in store:
+            self.hits += 1
+            result = store[key]
+            self.remember(key, result)
+            return result
+        self.misses += 1
+        return None
+
+    def remember(self, key: str, result: bool):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def insert(self, key: str, result: bool):
+        self.remember(key, result)
+        store = self.shared_store()
+        if store is not None:
+            store[key] = result
+
+    def shared_store(self):
+        return self.store if os.getpid() == self.owner else None
+
+    def cached(self,
+               c: Constraint,
+               compute: Callable[[Constraint], bool | None],
+               tag: str | None = None) -> bool:
+        """Returns the validity of c, computing it on a miss.
+
+        ``compute`` returns None when it cannot decide (e.g. the solver
+        timed out). Such results count as invalid but are not remembered,
+        so a later call tries again. Results computed differently (e.g. by
+        another Horn backend) are kept apart by giving them a ``tag``.
+        """
+        if self.maxsize <= 0 and self.store is None:
+            return bool(compute(c))
+        key = constraint_key(c)
+        if tag is not None:
+            key = f"{tag}:{key}"
+        result = self.lookup(key)
+        if result is None:
+            result = compute(c)
+            if result is None:
+                return False
+            self.insert(key, result)
+        return result
+
+    def clear(self):
+        """Forgets every result, in memory and in the store."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        store = self.shared_store()
+        if store is not None:
+            store.clear()
+
+    def close(self):
+        if self.shared_store() is not None:
+            self.store.close()
+            self.store = None
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+        }
+
+
+validity_cache = ValidityCache()
+
+
+def use_validity_cache(cache: ValidityCache):
+    """Makes ``cache`` the cache used by ``horn.solve``."""
+    global validity_cache
+    validity_cache = cache
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections import deque
 from typing import Any
 from typing import Dict
 from typing import List
@@ -13,25 +14,27 @@ from aeon.core.liquid import LiquidLiteralInt
 from aeon.core.liquid import LiquidLiteralString
 from aeon.core.liquid import LiquidTerm
 from aeon.core.liquid import LiquidVar
-from aeon.core.liquid_ops import all_ops
 from aeon.core.liquid_ops import mk_liquid_and
 from aeon.core.substitutions import substitution_in_liquid
 from aeon.core.types import AbstractionType
 from aeon.core.types import BaseType
 from aeon.core.types import Bottom
 from aeon.core.types import RefinedType
-from aeon.core.types import t_bool
-from aeon.core.types import t_int
 from aeon.core.types import Top
 from aeon.core.types import Type
-from aeon.typing.context import EmptyContext
 from aeon.typing.context import TypingContext
-from aeon.typing.context import VariableBinder
-from aeon.typing.liquid import type_infer_liquid
+from aeon.verification import cache
+from aeon.verification import qualifiers
 from aeon.verification.helpers import constraint_builder
 from aeon.verification.helpers import end
 from aeon.verification.helpers import imp
+from aeon.verification.horn_z3 import solve_chc
+from aeon.verification.qualifiers import get_possible_args
+from aeon.verification.qualifiers import mk_arg
+from aeon.verification.qualifiers import reverse_type
 from aeon.verification.smt import smt_valid
+from aeon.verification.smt import undecided_stats
+from aeon.verification.smt import smt_valid_goals
 from aeon.verification.vcs import Conjunction
 from aeon.verification.vcs import Constraint
 from aeon.verification.vcs import Implication
@@ -144,39 +147,8 @@ def wellformed_horn(predicate: LiquidTerm):
         return False
 
 
-def mk_arg(i: int) -> str:
-    return f"_{i}"
-
-
-def get_possible_args(vars: list[tuple[LiquidTerm, str]], arity: int):
-    if arity == 0:
-        yield []
-    else:
-        for base in get_possible_args(vars, arity - 1):
-            for (i, (_, _)) in enumerate(vars):
-                yield [LiquidVar(mk_arg(i))] + base
-                yield [LiquidLiteralBool(True)] + base
-                yield [LiquidLiteralBool(False)] + base
-                yield [LiquidLiteralInt(0)] + base
-                yield [LiquidLiteralInt(1)] + base
-
-
-def reverse_type(t: str) -> Type:
-    return {"Int": t_int, "Bool": t_bool}[t]
-
-
-def build_possible_assignment(hole: LiquidHole):
-    ctx: TypingContext = EmptyContext()
-    for (i, (_, t)) in enumerate(hole.argtypes):
-        ctx = VariableBinder(ctx, mk_arg(i), reverse_type(t))
-    for (opn, opt) in all_ops:
-        arity = len(opt) - 1
-        for args in get_possible_args(hole.argtypes, arity):
-            if not any([isinstance(a, LiquidVar) for a in args]):
-                continue
-            app = LiquidApp(opn, list(args))
-            if type_infer_liquid(ctx, app) == t_bool:
-                yield app
+def build_possible_assignment(hole: LiquidHole) -> list[LiquidTerm]:
+    return qualifiers.qualifier_library.qualifiers(hole)
 
 
 def build_initial_assignment(c: Constraint) -> Assignment:
@@ -305,38 +277,165 @@ def extract_components_of_imp(
         assert False
 
 
+# Check all the qualifiers of a hole against its premise on one solver
+batched_weakening = True
+
+
 def weaken(assign, c: Constraint) -> Assignment:
     (vs, (p, h)) = extract_components_of_imp(c)
     assert h.name in assign
     current_rep = assign[h.name]
 
+    if batched_weakening:
+        goals = [fill_horn_arguments(h, q) for q in current_rep]
+        kept = smt_valid_goals(vs, apply(assign, p), goals, solve_stats)
+        return {h.name: [q for (q, k) in zip(current_rep, kept) if k]}
+
     def keep(q: LiquidTerm) -> bool:
         qp = fill_horn_arguments(h, q)
         nc = constraint_builder(vs, imp(apply(assign, p), end(qp)))
-        return smt_valid(nc)
+        return counted_smt_valid(nc)
 
     qsp = [q for q in current_rep if keep(q)]
     return {h.name: qsp}
 
 
+def head_hole(c: Constraint) -> LiquidHole:
+    (_, (_, h)) = extract_components_of_imp(c)
+    return h
+
+
+def body_holes(c: Constraint) -> set[str]:
+    (_, (p, _)) = extract_components_of_imp(c)
+    return {h.name for h in obtain_holes(p)}
+
+
+def dependency_graph(cs: list[Constraint]) -> dict[str, list[int]]:
+    """Maps each hole to the (indices of the) constraints that read it."""
+    readers: dict[str, list[int]] = {}
+    for (i, c) in enumerate(cs):
+        for name in body_holes(c):
+            readers.setdefault(name, []).append(i)
+    return readers
+
+
+# Counters of the last call to solve
+solve_stats: dict[str, int] = {
+    "constraints": 0,
+    "iterations": 0,
+    "weakenings": 0,
+    "smt_calls": 0,
+    "chc_calls": 0,
+    "chc_fallbacks": 0,
+}
+
+# Backend solving constraints with holes: "fixpoint" (liquid inference
+# over the qualifier library) or "spacer" (Z3's CHC engine)
+horn_backend = "fixpoint"
+backends = ("fixpoint", "spacer")
+
+
+def use_horn_backend(backend: str):
+    """Makes ``backend`` the default backend of ``solve``."""
+    global horn_backend
+    assert backend in backends, f"Unknown Horn backend {backend}"
+    horn_backend = backend
+
+
+def counted_smt_valid(c: Constraint) -> bool:
+    solve_stats["smt_calls"] += 1
+    return smt_valid(c)
+
+
 def fixpoint(cs: list[Constraint], assign) -> Assignment:
-    ncs = [c for c in cs if not smt_valid(apply(assign, c))]
-    if not ncs:
-        return assign
-    else:
-        return fixpoint(cs, weaken(assign, ncs[0]))
+    """Weakens the assignment until all constraints in cs are valid.
+
+    Constraints are kept in a worklist. When the head hole of an invalid
+    constraint is weakened, only the constraints that read that hole are
+    checked again.
+    """
+    readers = dependency_graph(cs)
+    worklist = deque(range(len(cs)))
+    pending = set(worklist)
+    while worklist:
+        i = worklist.popleft()
+        pending.discard(i)
+        solve_stats["iterations"] += 1
+        c = cs[i]
+        if counted_smt_valid(apply(assign, c)):
+            continue
+        h = head_hole(c)
+        weakened = weaken(assign, c)
+        solve_stats["weakenings"] += 1
+        if len(weakened[h.name]) == len(assign[h.name]):
+            # Nothing left to drop, rechecking would not change the outcome
+            continue
+        assign = {**assign, **weakened}
+        for j in readers.get(h.name, []):
+            if j not in pending:
+                pending.add(j)
+                worklist.append(j)
+    return assign
+
+
+def solve(c: Constraint, backend: str | None = None) -> bool:
+    """Checks the validity of a constraint, memoizing the result.
+
+    ``backend`` overrides the module-level ``horn_backend``.
+    """
+    for key in solve_stats:
+        solve_stats[key] = 0
+    backend = backend or horn_backend
+    tag = backend if backend == "spacer" else None
+    if contains_horn_constraint(c):
+        # The refinements inferred for the holes depend on the qualifiers
+        tag = f"{tag or 'fixpoint'}:{qualifiers.qualifier_library.state}"
+    if backend == "spacer":
+        return cache.validity_cache.cached(c, decided(solve_spacer), tag=tag)
+    return cache.validity_cache.cached(c, decided(solve_uncached), tag=tag)
+
+
+def decided(compute):
+    """Wraps a solver so that it returns None instead of an answer that
+    depends on a check the SMT solver gave up on."""
+
+    def run(c: Constraint) -> bool | None:
+        before = undecided_stats["unknown"]
+        result = compute(c)
+        return result if undecided_stats["unknown"] == before else None
+
+    return run
+
+
+def solve_spacer(c: Constraint) -> bool:
+    """Solves all holes at once with Spacer.
+
+    Falls back to the fixpoint when the constraints use sorts Spacer is not
+    given (e.g. holes over uninterpreted sorts) or it gives up.
+    """
+    if not contains_horn_constraint(c):
+        return counted_smt_valid(c)
+    cs = flat(c)
+    solve_stats["constraints"] = len(cs)
+    solve_stats["chc_calls"] += 1
+    (valid, _) = solve_chc(cs)
+    if valid is not None:
+        return valid
+    solve_stats["chc_fallbacks"] += 1
+    return solve_uncached(c)
 
 
-def solve(c: Constraint) -> bool:
+def solve_uncached(c: Constraint) -> bool:
     # Performance improvement
     if not contains_horn_constraint(c):
-        return smt_valid(c)
+        return counted_smt_valid(c)
     cs = flat(c)
     csk = [c for c in cs if has_k_head(c)]
     csp = [c for c in cs if not has_k_head(c)]
+    solve_stats["constraints"] = len(cs)
     assignment0: Assignment = build_initial_assignment(c)
     subst = fixpoint(csk, assignment0)
     merged_csps = LiquidConstraint(LiquidLiteralBool(True))
     for pi in csp:
         merged_csps = Conjunction(merged_csps, pi)
-    return smt_valid(apply(subst, merged_csps))
+    return counted_smt_valid(apply(subst, merged_csps))
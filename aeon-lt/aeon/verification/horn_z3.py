@@ -1,129 +1,213 @@
 from __future__ import annotations
 
+from typing import Any
+
 from z3 import And
-from z3 import Bools
 from z3 import BoolSort
+from z3 import BoolVal
 from z3 import Const
-from z3 import Datatype
-from z3 import Fixedpoint
+from z3 import ExprRef
 from z3 import ForAll
 from z3 import Function
 from z3 import Implies
-from z3 import Ints
 from z3 import IntSort
-from z3 import set_option
+from z3 import is_app
+from z3 import is_false
+from z3 import is_int_value
+from z3 import is_true
+from z3 import Not
+from z3 import sat
 from z3 import SolverFor
+from z3 import unsat
+from z3 import Z3_OP_ADD
+from z3 import Z3_OP_AND
+from z3 import Z3_OP_DISTINCT
+from z3 import Z3_OP_EQ
+from z3 import Z3_OP_GE
+from z3 import Z3_OP_GT
+from z3 import Z3_OP_IDIV
+from z3 import Z3_OP_IMPLIES
+from z3 import Z3_OP_LE
+from z3 import Z3_OP_LT
+from z3 import Z3_OP_MOD
+from z3 import Z3_OP_MUL
+from z3 import Z3_OP_NOT
+from z3 import Z3_OP_OR
+from z3 import Z3_OP_SUB
+from z3 import Z3_OP_UMINUS
+from z3 import Z3_OP_UNINTERPRETED
+from z3 import Z3Exception
 
 from aeon.core.liquid import LiquidApp
+from aeon.core.liquid import LiquidHole
+from aeon.core.liquid import LiquidLiteralBool
 from aeon.core.liquid import LiquidLiteralInt
 from aeon.core.liquid import LiquidTerm
-
-# let max max2 x y z = max2 (max2 x y) z
-# let f x y = if x > y then x else y
-# assert (f (max f x y z) x) = (max f x y z)
-
-LiqTermWDef = Datatype("LiqTermW")
-LiqTermWDef.declare("lit", ("v", IntSort()))
-LiqTermWDef.declare("lt", ("op1", LiqTermWDef), ("op2", LiqTermWDef))
-LiqTermWDef.declare("eq", ("op1", LiqTermWDef), ("op2", LiqTermWDef))
-LiqTermW = LiqTermWDef.create()
-
-
-def reverse_z3(e) -> LiquidTerm:
-    if e.sort() == LiqTermW:
-        if e.decl() == LiqTermW.lit:
-            return LiquidLiteralInt(reverse_z3(e.arg(0)))
-        if e.decl() == LiqTermW.lt:
-            return LiquidApp("<", [reverse_z3(e.arg(0)), reverse_z3(e.arg(1))])
-    elif e.sort() == IntSort():
-        return LiquidLiteralInt(int(str(e)))
-    else:
-        raise Exception("TODO")
-
-
-evalBool = Function("evalBool", LiqTermW, BoolSort(), BoolSort())
-evalInt = Function("evalInt", LiqTermW, IntSort(), BoolSort())
-
-k1 = Const("k1", LiqTermW)
-k2 = Const("k2", LiqTermW)
-
-x = Const("x", IntSort())
-y = Const("y", IntSort())
-z = Const("z", IntSort())
-b = Const("b", BoolSort())
-
-fp = Fixedpoint()
-fp.register_relation(evalBool)
-fp.register_relation(evalInt)
-
-k1e, k2e = Bools("k1e k2e")
-
-fp.declare_var(x, y, k1, k2, b, z, k1e)
-
-fp.rule(evalInt(LiqTermW.lit(x), x))
-fp.rule(evalBool(LiqTermW.lt(k1, k2), b),
-        [evalInt(k1, x), evalInt(k2, y), x < y])
-fp.rule(evalBool(LiqTermW.eq(k1, k2), b),
-        [evalInt(k1, x), evalInt(k2, y), x == y])
-
-x, v = Ints("x v")
-(c, ) = Bools("c")
-fp.declare_var(x, v, c)
-p1 = Implies(c == (0 <= x), Implies(c, Implies(v == x, k1e)))
-
-fp.query(evalBool(k1, k1e), p1)
-
-a = fp.get_answer()
-# print(fp.get_ground_sat_answer())
-try:
-    sol = a.arg(0).arg(1).children()[0]
-    r = reverse_z3(sol)
-    print(r)
-except:
-    print("Could not verify")
-
-ignore = """
-Expr = Datatype("Expr")
-Expr.declare("Max")
-Expr.declare("f")
-Expr.declare("I", ("i", IntSort()))
-Expr.declare("App", ("fn", Expr), ("arg", Expr))
-Expr = Expr.create()
-Max = Expr.Max
-I = Expr.I
-App = Expr.App
-f = Expr.f
-Eval = Function("Eval", Expr, Expr, Expr, BoolSort())
-"""
-
-ignore2 = """
-# Max max x y z = max (max x y) z
-fp.rule(
-    x
-
-    Eval(App(App(App(Max, max), x), y), z, r2),
-    [Eval(App(max, x), y, r1), Eval(App(max, r1), z, r2)],
-)
-
-# f x y = x if x >= y
-# f x y = y if x < y
-fp.rule(Eval(App(f, I(xi)), I(yi), I(xi)), xi >= yi)
-fp.rule(Eval(App(f, I(xi)), I(yi), I(yi)), xi < yi)
-
-print(
-    fp.query(
-        And(Eval(App(App(App(Max, f), x), y), z, r1), Eval(App(f, x), r1, r2), r1 != r2)
-    )
-)
-
-print(fp.get_answer())
-"""
-
-s = SolverFor("HORN")
-print(s)
-
-k_ = Const("k_", LiqTermW)
-
-s.add(evalBool(k_, True))
-
-print(s.check())
+from aeon.core.liquid import LiquidVar
+from aeon.core.types import Type
+from aeon.verification.smt import base_functions
+from aeon.verification.smt import has_sort
+from aeon.verification.smt import make_variable
+from aeon.verification.smt import to_bool
+from aeon.verification.smt import translate_liq
+from aeon.verification.vcs import Constraint
+from aeon.verification.vcs import Implication
+from aeon.verification.vcs import LiquidConstraint
+
+Assignment = dict[str, list[LiquidTerm]]
+
+# Milliseconds Spacer may spend on a system of constraints
+spacer_timeout = 2000
+
+hole_sorts = {"Int": IntSort, "Bool": BoolSort}
+
+
+class UnsupportedHorn(Exception):
+    """The constraints cannot be encoded as CHCs (or decoded back)."""
+
+
+def clause_parts(
+    c: Constraint,
+) -> tuple[list[tuple[str, Type]], list[LiquidTerm], LiquidTerm]:
+    """Splits a flat constraint into its binders, premises and head."""
+    binders: list[tuple[str, Type]] = []
+    premises: list[LiquidTerm] = []
+    while isinstance(c, Implication):
+        binders.append((c.name, c.base))
+        premises.append(c.pred)
+        c = c.seq
+    assert isinstance(c, LiquidConstraint)
+    return (binders, premises, c.expr)
+
+
+class HornEncoder:
+    """Encodes flat liquid constraints as CHC rules.
+
+    Every hole becomes an uninterpreted relation over the sorts of its
+    arguments. Constraints with a hole in the head are rules defining it,
+    the others are queries, asserted as ``body && !head => false``.
+    """
+
+    def __init__(self):
+        self.relations: dict[str, Any] = {}
+        self.arities: dict[str, list[str]] = {}
+
+    def relation(self, hole: LiquidHole):
+        sorts = [s for (_, s) in hole.argtypes]
+        if hole.name not in self.relations:
+            if any(s not in hole_sorts for s in sorts):
+                raise UnsupportedHorn(f"Sort of {hole} not supported")
+            self.relations[hole.name] = Function(
+                f"k_{hole.name}", *[hole_sorts[s]() for s in sorts],
+                BoolSort())
+            self.arities[hole.name] = sorts
+        elif self.arities[hole.name] != sorts:
+            raise UnsupportedHorn(f"Arguments of {hole} differ in sort")
+        return self.relations[hole.name]
+
+    def translate(self, t: LiquidTerm, variables: list[tuple[str, Any]]):
+        if isinstance(t, LiquidHole):
+            args = [translate_liq(a, variables) for (a, _) in t.argtypes]
+            return self.relation(t)(*args)
+        elif isinstance(t, LiquidApp) and t.fun in base_functions:
+            args = [self.translate(a, variables) for a in t.args]
+            return base_functions[t.fun](*args)
+        return translate_liq(t, variables)
+
+    def rule(self, c: Constraint) -> ExprRef:
+        (binders, premises, head) = clause_parts(c)
+        variables = [(name, make_variable(name, base))
+                     for (name, base) in binders if has_sort(base)]
+        body = [to_bool(self.translate(p, variables)) for p in premises]
+        if isinstance(head, LiquidHole):
+            clause = Implies(And(body), self.translate(head, variables))
+        else:
+            goal = to_bool(self.translate(head, variables))
+            clause = Implies(And(body + [Not(goal)]), BoolVal(False))
+        if not variables:
+            return clause
+        return ForAll([v for (_, v) in variables], clause)
+
+
+binary_ops = {
+    Z3_OP_EQ: "==",
+    Z3_OP_DISTINCT: "!=",
+    Z3_OP_LE: "<=",
+    Z3_OP_GE: ">=",
+    Z3_OP_LT: "<",
+    Z3_OP_GT: ">",
+    Z3_OP_IMPLIES: "-->",
+    Z3_OP_IDIV: "/",
+    Z3_OP_MOD: "%",
+}
+
+nary_ops = {
+    Z3_OP_AND: "&&",
+    Z3_OP_OR: "||",
+    Z3_OP_ADD: "+",
+    Z3_OP_SUB: "-",
+    Z3_OP_MUL: "*",
+}
+
+
+def reverse_z3(e: ExprRef) -> LiquidTerm:
+    """Translates a quantifier-free Z3 expression back to a liquid term."""
+    if is_true(e):
+        return LiquidLiteralBool(True)
+    elif is_false(e):
+        return LiquidLiteralBool(False)
+    elif is_int_value(e):
+        return LiquidLiteralInt(e.as_long())
+    elif not is_app(e):
+        raise UnsupportedHorn(f"Cannot translate {e}")
+    kind = e.decl().kind()
+    args = [reverse_z3(a) for a in e.children()]
+    if kind == Z3_OP_UNINTERPRETED and not args:
+        return LiquidVar(e.decl().name())
+    elif kind == Z3_OP_NOT:
+        return LiquidApp("!", args)
+    elif kind == Z3_OP_UMINUS:
+        return LiquidApp("-", [LiquidLiteralInt(0), args[0]])
+    elif kind in binary_ops and len(args) == 2:
+        return LiquidApp(binary_ops[kind], args)
+    elif kind in nary_ops and args:
+        r = args[0]
+        for a in args[1:]:
+            r = LiquidApp(nary_ops[kind], [r, a])
+        return r
+    raise UnsupportedHorn(f"Cannot translate {e}")
+
+
+def solve_chc(cs: list[Constraint]) -> tuple[bool | None, Assignment | None]:
+    """Solves flat constraints with Spacer.
+
+    Returns whether they are valid (None if they cannot be encoded or Spacer
+    gave up) and, if they are, the interpretation of each hole over the
+    arguments ``_0``, ``_1``... (None if it cannot be translated back).
+    """
+    encoder = HornEncoder()
+    solver = SolverFor("HORN")
+    solver.set("timeout", spacer_timeout)
+    try:
+        for c in cs:
+            solver.add(encoder.rule(c))
+        result = solver.check()
+    except (UnsupportedHorn, AssertionError, Z3Exception):
+        return (None, None)
+    if result == unsat:
+        return (False, None)
+    elif result != sat:
+        return (None, None)
+
+    model = solver.model()
+    assignment: Assignment = {}
+    try:
+        for (name, relation) in encoder.relations.items():
+            args = [
+                Const(f"_{i}", hole_sorts[s]())
+                for (i, s) in enumerate(encoder.arities[name])
+            ]
+            assignment[name] = [reverse_z3(model.eval(relation(*args)))]
+    except (UnsupportedHorn, Z3Exception):
+        return (True, None)
+    return (True, assignment)
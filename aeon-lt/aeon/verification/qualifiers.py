@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import atexit
+import copy
+import hashlib
+import itertools
+import os
+import shelve
+
+from aeon.core.liquid import LiquidApp
+from aeon.core.liquid import LiquidHole
+from aeon.core.liquid import LiquidLiteralBool
+from aeon.core.liquid import LiquidLiteralInt
+from aeon.core.liquid import LiquidTerm
+from aeon.core.liquid import LiquidVar
+from aeon.core.liquid_ops import all_ops
+from aeon.core.substitutions import substitution_in_liquid
+from aeon.core.types import BaseType
+from aeon.core.types import t_bool
+from aeon.core.types import t_int
+from aeon.core.types import Type
+from aeon.typing.context import EmptyContext
+from aeon.typing.context import TypingContext
+from aeon.typing.context import VariableBinder
+from aeon.typing.liquid import type_infer_liquid
+
+# Bump when the enumeration of templates changes
+LIBRARY_VERSION = 2
+
+Signature = tuple[str, ...]
+
+
+def mk_arg(i: int) -> str:
+    return f"_{i}"
+
+
+def get_possible_args(vars: list[tuple[LiquidTerm, str]], arity: int):
+    if arity == 0:
+        yield []
+    else:
+        for base in get_possible_args(vars, arity - 1):
+            for (i, (_, _)) in enumerate(vars):
+                yield [LiquidVar(mk_arg(i))] + base
+                yield [LiquidLiteralBool(True)] + base
+                yield [LiquidLiteralBool(False)] + base
+                yield [LiquidLiteralInt(0)] + base
+                yield [LiquidLiteralInt(1)] + base
+
+
+def reverse_type(t: str) -> Type:
+    return {"Int": t_int, "Bool": t_bool}.get(t) or BaseType(t)
+
+
+def enumerate_templates(sorts: Signature) -> list[LiquidTerm]:
+    """Builds the well-sorted applications of the liquid operators to the
+    arguments of a hole with the given sorts (and a few literals).
+
+    Arguments are named ``_0``, ``_1``..., in order.
+    """
+    argtypes = [(LiquidVar(mk_arg(i)), s) for (i, s) in enumerate(sorts)]
+    ctx: TypingContext = EmptyContext()
+    for (i, s) in enumerate(sorts):
+        ctx = VariableBinder(ctx, mk_arg(i), reverse_type(s))
+    templates = []
+    for (opn, opt) in all_ops:
+        arity = len(opt) - 1
+        for args in get_possible_args(argtypes, arity):
+            if not any([isinstance(a, LiquidVar) for a in args]):
+                continue
+            app = LiquidApp(opn, list(args))
+            if type_infer_liquid(ctx, app) == t_bool:
+                templates.append(app)
+    return templates
+
+
+def _fingerprint() -> str:
+    return hashlib.blake2b(repr((LIBRARY_VERSION, all_ops)).encode(),
+                           digest_size=8).hexdigest()
+
+
+class QualifierLibrary:
+    """Qualifier templates, compiled once per signature of argument sorts.
+
+    The candidate qualifiers of a hole only depend on the sorts of its
+    arguments, so they are enumerated (and filtered for well-sortedness)
+    once per signature and shared by all holes with that signature. If
+    ``path`` is given, the enumerated templates are also kept in a shelve
+    store there, so later runs do not enumerate them again.
+
+    Domain qualifiers, such as ``n_rows(d) >= 0`` for a ``DataSet``
+    argument, can be registered and are instantiated for every argument
+    (or combination of arguments) of a matching sort. Setting ``generic``
+    to False leaves only the domain qualifiers, which shrinks the search
+    when they are known to be enough.
+
+    Libraries that only differ in their domain qualifiers can share their
+    templates, see ``derived``.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.generic = True
+        self.templates: dict[Signature, tuple[LiquidTerm, ...]] = {}
+        self.domain: list[tuple[Signature, LiquidTerm]] = []
+        self.instances: dict[Signature, tuple[LiquidTerm, ...]] = {}
+        self.store = None
+        self.owner = os.getpid()
+        self.fingerprint = _fingerprint()
+        if path is not None:
+            self.store = shelve.open(path)
+            atexit.register(self.close)
+
+    def shared_store(self):
+        return self.store if os.getpid() == self.owner else None
+
+    def generic_templates(self, sorts: Signature) -> tuple[LiquidTerm, ...]:
+        if sorts not in self.templates:
+            key = f"{self.fingerprint}:{sorts!r}"
+            store = self.shared_store()
+            if store is not None and key in store:
+                templates = store[key]
+            else:
+                templates = tuple(enumerate_templates(sorts))
+                if store is not None:
+                    store[key] = templates
+            self.templates[sorts] = templates
+        return self.templates[sorts]
+
+    def register(self, params: list[tuple[str, str]],
+                 qualifier: str | LiquidTerm):
+        """Adds a domain qualifier over the (name, sort) parameters.
+
+        e.g. ``register([("d", "DataSet")], "n_rows(d) >= 0")``.
+        Registering the same qualifier twice has no effect.
+        """
+        if isinstance(qualifier, str):
+            from aeon.verification.helpers import parse_liquid
+            qualifier = parse_liquid(qualifier)
+        # Parameters are renamed apart from the argument names of holes
+        for (i, (name, _)) in enumerate(params):
+            qualifier = substitution_in_liquid(qualifier,
+                                               LiquidVar(f"__param_{i}"),
+                                               name)
+        entry = (tuple(sort for (_, sort) in params), qualifier)
+        if entry not in self.domain:
+            self.domain.append(entry)
+            self.instances.clear()
+
+    def derived(self, qualifiers=()) -> QualifierLibrary:
+        """Returns a library with the templates (and store) of this one and
+        its domain qualifiers, plus the given (params, qualifier) ones.
+
+        Registering in the derived library leaves this one unchanged.
+        """
+        library = copy.copy(self)
+        library.domain = list(self.domain)
+        library.instances = {}
+        for (params, qualifier) in qualifiers:
+            library.register(params, qualifier)
+        return library
+
+    @property
+    def state(self) -> str:
+        """Hashes what the candidate qualifiers of a hole depend on.
+
+        Results inferred with libraries of different states are kept apart
+        by the validity cache.
+        """
+        return hashlib.blake2b(repr(
+            (self.fingerprint, self.generic, self.domain)).encode(),
+                               digest_size=8).hexdigest()
+
+    def domain_qualifiers(self, sorts: Signature) -> tuple[LiquidTerm, ...]:
+        if sorts not in self.instances:
+            instances: list[LiquidTerm] = []
+            for (params, qualifier) in self.domain:
+                for positions in itertools.permutations(
+                        range(len(sorts)), len(params)):
+                    if any(sorts[p] != s for (p, s) in zip(positions, params)):
+                        continue
+                    q = qualifier
+                    for (i, p) in enumerate(positions):
+                        q = substitution_in_liquid(q, LiquidVar(mk_arg(p)),
+                                                   f"__param_{i}")
+                    instances.append(q)
+            self.instances[sorts] = tuple(instances)
+        return self.instances[sorts]
+
+    def qualifiers(self, hole: LiquidHole) -> list[LiquidTerm]:
+        """Returns the candidate qualifiers of a hole, over ``_0``, ``_1``..."""
+        sorts = tuple(s for (_, s) in hole.argtypes)
+        templates = list(self.domain_qualifiers(sorts))
+        if self.generic:
+            templates = list(self.generic_templates(sorts)) + templates
+        return templates
+
+    def close(self):
+        if self.shared_store() is not None:
+            self.store.close()
+            self.store = None
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "signatures": len(self.templates),
+            "templates": sum(len(t) for t in self.templates.values()),
+            "domain_qualifiers": len(self.domain),
+        }
+
+
+qualifier_library = QualifierLibrary()
+
+
+def use_qualifier_library(library: QualifierLibrary):
+    """Makes ``library`` the library used by ``horn.solve``."""
+    global qualifier_library
+    qualifier_library = library
+
+
+def register_qualifier(params: list[tuple[str, str]],
+                       qualifier: str | LiquidTerm):
+    """Registers a domain qualifier in the current library."""
+    qualifier_library.register(params, qualifier)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from typing import Any
 from typing import Callable
 from typing import Dict
@@ -14,10 +15,12 @@ from z3 import Not
 from z3 import sat
 from z3 import Solver
 from z3 import unknown
+from z3 import is_false
 from z3 import unsat
 from z3.z3 import And, Function, ArraySort
 from z3.z3 import Bool
 from z3.z3 import BoolRef
+from z3.z3 import BoolVal
 from z3.z3 import BoolSort
 from z3.z3 import Const
 from z3.z3 import DeclareSort
@@ -113,11 +116,114 @@ def flatten(c: Constraint) -> Generator[CanonicConstraint, None, None]:
 s = Solver()
 s.set(timeout=200),
 
+# Number of checks the solver gave up on (e.g. timed out) since the start of
+# the process. Their constraints count as invalid, but callers can tell the
+# answer was not definite when it moves.
+undecided_stats: dict[str, int] = {"unknown": 0}
 
-def smt_valid(c: Constraint, foralls: list[tuple[str, Any]] = []) -> bool:
-    """Verifies if a constraint is true using Z3."""
+
+class IncrementalSolver:
+    """A long-lived solver that checks goals under assumption literals.
+
+    Each hypothesis (a conjunct of the premise of a canonic constraint) is
+    asserted once, guarded by a fresh Boolean literal. Goals are asserted
+    negated, guarded in the same way, and checked with ``check(guards)``.
+    Nothing is ever popped, so the lemmas learned by Z3 on a query are
+    kept for the following ones. The solver is reset once it holds more
+    than ``max_guards`` guarded assertions.
+    """
+
+    def __init__(self, timeout: int = 200, max_guards: int = 10000):
+        self.timeout = timeout
+        self.max_guards = max_guards
+        self.stats: dict[str, float] = {
+            "queries": 0,
+            "solver_calls": 0,
+            "hypotheses_asserted": 0,
+            "hypotheses_reused": 0,
+            "resets": 0,
+            "time": 0.0,
+        }
+        self.reset()
+
+    def reset(self):
+        self.solver = Solver()
+        self.solver.set(timeout=self.timeout)
+        # Keyed by Z3 AST id: the guarded expressions are kept alive in the
+        # values, so ids are never recycled while they are in the table.
+        self.guards: dict[int, tuple[ExprRef, BoolRef]] = {}
+
+    def guard(self, e: BoolRef, negated: bool = False) -> BoolRef:
+        key = e.get_id() * 2 + int(negated)
+        if key in self.guards:
+            self.stats["hypotheses_reused"] += 1
+            return self.guards[key][1]
+        lit = Bool(f"__guard_{len(self.guards)}")
+        self.solver.add(Implies(lit, Not(e) if negated else e))
+        self.guards[key] = (e, lit)
+        self.stats["hypotheses_asserted"] += 1
+        return lit
+
+    def valid(self, cons: list[CanonicConstraint]) -> bool:
+        if len(self.guards) > self.max_guards:
+            self.stats["resets"] += 1
+            self.reset()
+        start = time.perf_counter()
+        try:
+            for c in cons:
+                self.stats["queries"] += 1
+                variables = [(name, make_variable(name, base))
+                             for (name, base) in c.binders if has_sort(base)]
+                assumptions = [
+                    self.guard(to_bool(translate_liq(h, variables)))
+                    for h in conjuncts(c.pre)
+                ]
+                goal = to_bool(translate_liq(c.pos, variables))
+                assumptions.append(self.guard(goal, negated=True))
+                self.stats["solver_calls"] += 1
+                result = self.solver.check(*assumptions)
+                if result == unknown:
+                    undecided_stats["unknown"] += 1
+                if result == sat or result == unknown:
+                    return False
+            return True
+        finally:
+            self.stats["time"] += time.perf_counter() - start
+
+
+incremental_solver = IncrementalSolver()
+incremental_mode = True
+
+
+def conjuncts(t: LiquidTerm) -> Generator[LiquidTerm, None, None]:
+    """Splits a premise into its conjuncts, dropping trivial ``true``s."""
+    if isinstance(t, LiquidApp) and t.fun == "&&":
+        for a in t.args:
+            yield from conjuncts(a)
+    elif not (isinstance(t, LiquidLiteralBool) and t.value):
+        yield t
+
+
+def to_bool(e: BoolRef | bool) -> BoolRef:
+    return BoolVal(e) if isinstance(e, bool) else e
+
+
+def smt_valid(c: Constraint,
+              foralls: list[tuple[str, Any]] = [],
+              incremental: bool | None = None) -> bool:
+    """Verifies if a constraint is true using Z3.
+
+    Unless ``incremental`` is False (or the module-level
+    ``incremental_mode`` is off), constraints without universally
+    quantified variables are checked on the shared incremental solver.
+    """
     cons: list[CanonicConstraint] = list(flatten(c))
 
+    if incremental is None:
+        incremental = incremental_mode
+    if incremental and not foralls:
+        return incremental_solver.valid(cons)
+
     forall_vars = [(f[0], make_variable(f[0], f[1])) for f in foralls
                    if has_sort(f[1])]
 
@@ -133,11 +239,70 @@ def smt_valid(c: Constraint, foralls: list[tuple[str, Any]] = []) -> bool:
         if result == sat:
             return False
         elif result == unknown:
+            undecided_stats["unknown"] += 1
             return False
 
     return True
 
 
+def smt_valid_goals(binders: list[tuple[str, Type]],
+                    pre: LiquidTerm,
+                    goals: list[LiquidTerm],
+                    stats: dict[str, int] | None = None) -> list[bool]:
+    """Checks, for each goal, if it follows from ``pre`` for all values of
+    the binders.
+
+    The premise is asserted once, and each goal is bound to an indicator
+    literal. Every solver call asks for a model of the premise where one
+    of the goals still believed valid is false; all the goals that are
+    false in that model are dropped at once. If the solver gives up, the
+    remaining goals are checked one by one (and dropped on ``unknown``).
+    """
+    variables = [(name, make_variable(name, base))
+                 for (name, base) in binders if has_sort(base)]
+    solver = Solver()
+    solver.set(timeout=200)
+    solver.add(to_bool(translate_liq(pre, variables)))
+    indicators = []
+    for (i, goal) in enumerate(goals):
+        lit = Bool(f"__goal_{i}")
+        solver.add(lit == to_bool(translate_liq(goal, variables)))
+        indicators.append(lit)
+
+    def check(*assumptions):
+        if stats is not None:
+            stats["smt_calls"] += 1
+        return solver.check(*assumptions)
+
+    valid = [True] * len(goals)
+    remaining = list(range(len(goals)))
+    rounds = 0
+    while remaining:
+        guard = Bool(f"__round_{rounds}")
+        rounds += 1
+        solver.add(Implies(guard, Or([Not(indicators[i]) for i in remaining])))
+        result = check(guard)
+        if result == unsat:
+            break
+        elif result == unknown:
+            for i in remaining:
+                result = check(Not(indicators[i]))
+                if result == unknown:
+                    undecided_stats["unknown"] += 1
+                valid[i] = result == unsat
+            break
+        model = solver.model()
+        falsified = {
+            i
+            for i in remaining
+            if is_false(model.eval(indicators[i], model_completion=True))
+        }
+        for i in falsified:
+            valid[i] = False
+        remaining = [i for i in remaining if i not in falsified]
+    return valid
+
+
 def type_of_variable(variables: list[tuple[str, Any]], name: str) -> Any:
     for (na, ref) in variables:
         if na == name:
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from aeon.core.liquid import LiquidApp
+from aeon.core.liquid import LiquidHole
+from aeon.core.liquid import LiquidLiteralInt
+from aeon.core.liquid import LiquidVar
+from aeon.core.types import t_int
+from aeon.verification.cache import constraint_key
+from aeon.verification.cache import ValidityCache
+from aeon.verification.vcs import Implication
+from aeon.verification.vcs import LiquidConstraint
+
+
+def positive(name: str, bound: int = 0):
+    return LiquidApp(">", [LiquidVar(name), LiquidLiteralInt(bound)])
+
+
+def implies_positive(name: str, bound: int = 0):
+    return Implication(name, t_int, positive(name, bound),
+                       LiquidConstraint(positive(name, bound)))
+
+
+def test_alpha_equivalent_keys():
+    assert constraint_key(implies_positive("x")) == constraint_key(
+        implies_positive("y"))
+    assert constraint_key(implies_positive("x")) != constraint_key(
+        implies_positive("x", 1))
+
+
+def test_free_variables_are_not_renamed():
+    c1 = Implication("x", t_int, positive("z"),
+                     LiquidConstraint(positive("x")))
+    c2 = Implication("x", t_int, positive("w"),
+                     LiquidConstraint(positive("x")))
+    assert constraint_key(c1) != constraint_key(c2)
+
+
+def test_holes_are_renamed():
+    c1 = Implication("x", t_int, positive("x"),
+                     LiquidConstraint(LiquidHole("k1", [("x", "Int")])))
+    c2 = Implication("y", t_int, positive("y"),
+                     LiquidConstraint(LiquidHole("k7", [("y", "Int")])))
+    assert constraint_key(c1) == constraint_key(c2)
+
+
+def test_lru_eviction():
+    cache = ValidityCache(maxsize=2)
+    calls = []
+
+    def compute(c):
+        calls.append(c)
+        return True
+
+    for bound in [0, 1, 0, 2, 1]:
+        assert cache.cached(implies_positive("x", bound), compute)
+    assert len(calls) == 4
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 4
+    assert cache.stats["size"] == 2
+
+
+def test_undecided_results_are_not_cached(tmp_path):
+    cache = ValidityCache(path=str(tmp_path / "validity"))
+    results = [None, True]
+    assert not cache.cached(implies_positive("x"), lambda c: results.pop(0))
+    assert cache.cached(implies_positive("x"), lambda c: results.pop(0))
+    assert cache.cached(implies_positive("x"), lambda c: False)
+    cache.close()
+
+
+def test_clear_empties_store(tmp_path):
+    path = str(tmp_path / "validity")
+    cache = ValidityCache(path=path)
+    assert cache.cached(implies_positive("x"), lambda c: True)
+    cache.clear()
+    assert not cache.cached(implies_positive("x"), lambda c: False)
+    cache.close()
+
+    cache = ValidityCache(path=path)
+    assert not cache.cached(implies_positive("x"), lambda c: True)
+    cache.close()
+
+
+def test_persistent_store(tmp_path):
+    path = str(tmp_path / "validity")
+    cache = ValidityCache(path=path)
+    assert not cache.cached(implies_positive("x"), lambda c: False)
+    cache.close()
+
+    cache = ValidityCache(path=path)
+    assert not cache.cached(implies_positive("y"), lambda c: True)
+    assert cache.stats["hits"] == 1
+    cache.close()
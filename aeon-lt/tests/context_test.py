@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from aeon.core.types import t_bool
+from aeon.core.types import t_int
+from aeon.typing.context import EmptyContext
+from aeon.typing.context import TypeBinder
+from aeon.typing.context import VariableBinder
+
+
+def test_type_of():
+    ctx = EmptyContext().with_var("x", t_int).with_typevar("a", "*")
+    ctx = ctx.with_var("y", t_bool)
+    assert ctx.type_of("x") == t_int
+    assert ctx.type_of("y") == t_bool
+    assert ctx.type_of("z") is None
+    assert ctx.vars() == [("y", t_bool), ("x", t_int)]
+    assert ctx.typevars() == [("a", "*")]
+
+
+def test_extension_is_persistent():
+    ctx = EmptyContext().with_var("x", t_int)
+    shadowed = ctx.with_var("x", t_bool)
+    assert shadowed.type_of("x") == t_bool
+    assert ctx.type_of("x") == t_int
+
+
+def test_fresh_var_is_unbound():
+    ctx = EmptyContext()
+    ctx = VariableBinder(ctx, "fresh_1", t_int)
+    ctx = VariableBinder(ctx, "fresh_2", t_int)
+    ctx = TypeBinder(ctx, "a")
+    name = ctx.fresh_var()
+    assert ctx.type_of(name) is None
+    assert ctx.fresh_var() != name
+
+
+def test_large_context():
+    ctx = EmptyContext()
+    for i in range(20000):
+        ctx = ctx.with_var(f"x_{i}", t_int)
+    assert ctx.type_of("x_0") == t_int
+    same = EmptyContext()
+    for i in range(20000):
+        same = same.with_var(f"x_{i}", t_int)
+    assert hash(ctx) == hash(same)
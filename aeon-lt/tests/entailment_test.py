@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from aeon.core.types import AbstractionType
+from aeon.core.types import t_int
+from aeon.frontend.parser import parse_type
+from aeon.typing import entailment as slicer
+from aeon.typing.context import EmptyContext
+from aeon.typing.entailment import entailment
+from aeon.typing.entailment import hypotheses
+from aeon.typing.entailment import relevant_hypotheses
+from aeon.utils.ctx_helpers import build_context
+from aeon.verification.helpers import end
+
+
+def ctx_of(vars: dict[str, str]):
+    ctx = EmptyContext()
+    for (name, ty) in vars.items():
+        ctx = ctx.with_var(name, parse_type(ty))
+    return ctx
+
+
+def test_slices_unrelated_binders():
+    ctx = ctx_of({
+        "a": "{a:Int | a > 0}",
+        "b": "{b:Int | b > a}",
+        "c": "{c:Int | c > 10}",
+        "d": "{d:Int | d == c}",
+    })
+    kept = relevant_hypotheses(hypotheses(ctx), end("b > 0"))
+    assert [name for (name, _, _) in kept] == ["b", "a"]
+
+
+def test_slices_through_functions_if_asked():
+    ctx = build_context({
+        "f": AbstractionType("x", t_int, t_int),
+        "a": parse_type("{a:Int | (f a) > 0}"),
+        "b": parse_type("{b:Int | (f b) > 0}"),
+    })
+    c = end("(f a) > 0")
+    assert len(relevant_hypotheses(hypotheses(ctx), c)) == 1
+    try:
+        slicer.slice_through_functions = True
+        assert len(relevant_hypotheses(hypotheses(ctx), c)) == 2
+    finally:
+        slicer.slice_through_functions = False
+
+
+def test_slicing_preserves_validity():
+    # The contradiction lies in hypotheses unrelated to the goal
+    ctx = ctx_of({
+        "a": "{a:Int | a > 0}",
+        "c": "{c:Int | c > 10}",
+        "d": "{d:Int | d < c && d > c}",
+    })
+    slicer.reset_slice_stats()
+    assert entailment(ctx, end("a < 0"))
+    assert slicer.slice_stats["fallbacks"] == 1
+    assert not entailment(ctx_of({"a": "{a:Int | a > 0}"}), end("a < 0"))
+
+
+def test_slice_stats():
+    ctx = ctx_of({
+        "a": "{a:Int | a > 0}",
+        "c": "{c:Int | c > 10}",
+    })
+    slicer.reset_slice_stats()
+    assert entailment(ctx, end("a > 0"))
+    assert slicer.slice_stats["queries"] == 1
+    assert slicer.slice_stats["sliced"] == 1
+    assert slicer.slice_stats["hypotheses"] == 2
+    assert slicer.slice_stats["kept"] == 1
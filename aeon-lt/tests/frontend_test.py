@@ -22,8 +22,10 @@ from aeon.core.types import t_bool
 from aeon.core.types import t_int
 from aeon.core.types import TypePolymorphism
 from aeon.core.types import TypeVar
+from aeon.frontend.parser import mk_parser
 from aeon.frontend.parser import parse_term
 from aeon.frontend.parser import parse_type
+from aeon.frontend.parser import parser_registry_stats
 from aeon.utils.ast_helpers import false
 from aeon.utils.ast_helpers import i0
 from aeon.utils.ast_helpers import i1
@@ -155,3 +157,22 @@ def test_poly_app():
     one_a = TypeApplication(parse_term("1"), TypeVar("a"))
     e = TypeAbstraction("a", BaseKind(), one_a)
     assert parse_term("(Λa:B => 1[a])[Int]") == TypeApplication(e, t_int)
+
+
+def test_parser_registry_reuses_parsers():
+    mk_parser("type").parse("Int")
+    builds = parser_registry_stats["builds"]
+    hits = parser_registry_stats["hits"]
+
+    t = mk_parser("type").parse("{x:Int | x > 0}")
+    assert t == parse_type("{x:Int | x > 0}")
+    assert parser_registry_stats["builds"] == builds
+    assert parser_registry_stats["hits"] == hits + 2
+
+
+def test_registered_parsers_keep_own_counter():
+    p1 = mk_parser("expression", start_counter=10)
+    p2 = mk_parser("expression")
+    assert "_anf_11" in str(p1.parse("(1 + 2) * 3"))
+    assert p1.counter == 11
+    assert p2.counter == 0
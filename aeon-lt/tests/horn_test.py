@@ -5,6 +5,7 @@ from aeon.core.liquid import LiquidHole
 from aeon.core.liquid import LiquidLiteralBool
 from aeon.core.liquid import LiquidLiteralInt
 from aeon.core.liquid import LiquidVar
+from aeon.core.types import BaseType
 from aeon.core.types import RefinedType
 from aeon.core.types import t_bool
 from aeon.core.types import t_int
@@ -12,7 +13,13 @@ from aeon.typing.context import EmptyContext
 from aeon.typing.context import TypingContext
 from aeon.typing.context import VariableBinder
 from aeon.utils.ctx_helpers import build_context
+from aeon.verification import cache
+from aeon.verification import horn
+from aeon.verification.helpers import conj
+from aeon.verification.helpers import constraint_builder
+from aeon.verification.helpers import end
 from aeon.verification.helpers import get_abs_example
+from aeon.verification.helpers import imp
 from aeon.verification.helpers import parse_liquid
 from aeon.verification.horn import build_initial_assignment
 from aeon.verification.horn import flat
@@ -20,7 +27,9 @@ from aeon.verification.horn import fresh
 from aeon.verification.horn import get_possible_args
 from aeon.verification.horn import merge_assignments
 from aeon.verification.horn import solve
+from aeon.verification.horn import solve_stats
 from aeon.verification.horn import wellformed_horn
+from aeon.verification.horn_z3 import solve_chc
 from aeon.verification.vcs import Conjunction
 from aeon.verification.vcs import Implication
 from aeon.verification.vcs import LiquidConstraint
@@ -90,3 +99,99 @@ def test_solve():
     ex = get_abs_example()
     b = solve(ex)
     assert b == True
+
+
+def chain_example(query: str):
+    # k0 holds for x == 1, k1 is implied by k0 and the query is on k1
+    k0 = LiquidHole("k0", [(LiquidVar("x"), "Int")])
+    k1 = LiquidHole("k1", [(LiquidVar("x"), "Int")])
+    return conj(
+        conj(
+            constraint_builder([("x", t_int)], imp(k1, end(query))),
+            constraint_builder([("x", t_int)], imp(k0, end(k1))),
+        ),
+        constraint_builder([("x", t_int)], imp("x == 1", end(k0))),
+    )
+
+
+def test_solve_chain():
+    previous = cache.validity_cache
+    cache.use_validity_cache(cache.ValidityCache(maxsize=0))
+    try:
+        assert solve(chain_example("x > 0"))
+    finally:
+        cache.use_validity_cache(previous)
+    assert solve_stats["smt_calls"] > 0
+    assert solve_stats["weakenings"] == 2
+
+
+def test_solve_chain_invalid():
+    assert not solve(chain_example("x > 1"))
+
+
+def test_batched_weakening_agrees():
+    previous = cache.validity_cache
+    cache.use_validity_cache(cache.ValidityCache(maxsize=0))
+    try:
+        for c in [get_abs_example(), chain_example("x > 0"),
+                  chain_example("x > 1")]:
+            results = []
+            for batched in [False, True]:
+                horn.batched_weakening = batched
+                results.append((solve(c), solve_stats["smt_calls"]))
+            ((one_by_one, calls), (batched, batched_calls)) = results
+            assert one_by_one == batched
+            assert batched_calls < calls
+    finally:
+        horn.batched_weakening = True
+        cache.use_validity_cache(previous)
+
+
+def test_spacer_agrees():
+    previous = cache.validity_cache
+    cache.use_validity_cache(cache.ValidityCache(maxsize=0))
+    try:
+        for c in [get_abs_example(), chain_example("x > 0"),
+                  chain_example("x > 1")]:
+            assert solve(c, "spacer") == solve(c, "fixpoint")
+        assert solve(chain_example("x > 0"), "spacer")
+        assert solve_stats["chc_calls"] == 1
+        assert solve_stats["chc_fallbacks"] == 0
+    finally:
+        cache.use_validity_cache(previous)
+
+
+def test_spacer_assignment():
+    (valid, assignment) = solve_chc(flat(chain_example("x > 0")))
+    assert valid
+    assert set(assignment) == {"k0", "k1"}
+    # The interpretations are liquid terms over the hole arguments
+    c = chain_example("x > 0")
+    assert horn.smt_valid(horn.apply(assignment, c))
+
+
+def test_spacer_falls_back_on_uninterpreted_sorts():
+    k = LiquidHole("k", [(LiquidVar("d"), "DataSet")])
+    c = conj(
+        constraint_builder([("d", BaseType("DataSet"))], imp(k, end("true"))),
+        constraint_builder([("d", BaseType("DataSet"))], imp("true", end(k))),
+    )
+    previous = cache.validity_cache
+    cache.use_validity_cache(cache.ValidityCache(maxsize=0))
+    try:
+        assert solve(c, "spacer")
+        assert solve_stats["chc_fallbacks"] == 1
+    finally:
+        cache.use_validity_cache(previous)
+
+
+def test_undecided_answers_are_not_definite():
+    from aeon.verification.smt import undecided_stats
+
+    def gives_up(c):
+        undecided_stats["unknown"] += 1
+        return False
+
+    c = get_abs_example()
+    assert horn.decided(gives_up)(c) is None
+    assert horn.decided(lambda c: False)(c) is False
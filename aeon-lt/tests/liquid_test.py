@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import copy
+import pickle
+
 from aeon.core.liquid import LiquidApp
+from aeon.core.liquid import LiquidHole
 from aeon.core.liquid import LiquidLiteralInt
+from aeon.core.liquid import LiquidTerm
 from aeon.core.liquid import LiquidVar
 from aeon.core.substitutions import liquefy
 from aeon.core.terms import Application
@@ -33,3 +38,40 @@ def test_simple_eq():
         [LiquidLiteralInt(2)],
     )
     assert LiquidApp("x", [LiquidLiteralInt(1)]) != LiquidApp("x", [LiquidVar("x2")])
+
+
+def test_terms_are_interned():
+    t = LiquidApp("+", [LiquidVar("x"), LiquidLiteralInt(1)])
+    assert t is LiquidApp("+", [LiquidVar("x"), LiquidLiteralInt(1)])
+    assert t is not LiquidApp("+", [LiquidVar("y"), LiquidLiteralInt(1)])
+    assert pickle.loads(pickle.dumps(t)) is t
+    assert copy.deepcopy(t) is t
+    assert t.free_vars == {"+", "x"}
+    assert t.variables == {"x"}
+
+
+def test_terms_are_immutable():
+    try:
+        lx1.fun = "y"
+        assert False
+    except AttributeError:
+        pass
+
+
+def test_terms_implement_fields():
+    try:
+
+        class LiquidNothing(LiquidTerm):
+            __slots__ = ()
+
+        assert False
+    except TypeError:
+        pass
+
+
+def test_holes_equal_by_name():
+    h1 = LiquidHole("k", [("x", "Int")])
+    h2 = LiquidHole("k", [("y", "Int")])
+    assert h1 == h2 and hash(h1) == hash(h2)
+    assert LiquidApp("!", [h1]) is not LiquidApp("!", [h2])
+    assert LiquidApp("!", [h1]).args[0].argtypes[0][0] == LiquidVar("x")
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from aeon.core.types import t_int
+from aeon.typing.context import EmptyContext
+from aeon.utils.ctx_helpers import build_context
+from aeon.utils.names import NameSupply
+
+
+def test_names_are_not_repeated():
+    names = NameSupply()
+    assert [names.fresh("x") for _ in range(3)] == ["x", "x_1", "x_2"]
+    assert names.fresh("y", numbered=True) == "y_1"
+
+
+def test_bound_names_are_skipped():
+    names = NameSupply()
+    ctx = build_context({"x": t_int, "x_1": t_int})
+    other = build_context({"x_2": t_int})
+    assert names.fresh("x", ctx, other) == "x_3"
+    assert names.fresh("x", ctx, other) == "x_4"
+
+
+def test_separator():
+    names = NameSupply(separator="$")
+    assert names.fresh("x", build_context({"x": t_int})) == "x$1"
+
+
+def test_contexts_share_their_supply():
+    ctx = EmptyContext()
+    first = ctx.with_var("a", t_int).fresh_var()
+    second = ctx.with_var("b", t_int).fresh_var()
+    assert first != second
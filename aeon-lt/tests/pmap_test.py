@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import pickle
+
+from aeon.utils.pmap import PMap
+
+
+class CollidingKey:
+
+    def __init__(self, value: int):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, CollidingKey) and other.value == self.value
+
+    def __hash__(self) -> int:
+        return 42
+
+
+def test_set_is_persistent():
+    m1 = PMap().set("x", 1)
+    m2 = m1.set("y", 2)
+    m3 = m2.set("x", 3)
+    assert dict(m1) == {"x": 1}
+    assert dict(m2) == {"x": 1, "y": 2}
+    assert dict(m3) == {"x": 3, "y": 2}
+    assert "y" not in m1
+    assert m1.get("y") is None
+
+
+def test_many_keys():
+    m = PMap()
+    versions = []
+    for i in range(2000):
+        m = m.set(i, str(i))
+        versions.append(m)
+    assert len(m) == 2000
+    assert all(m[i] == str(i) for i in range(2000))
+    assert len(versions[99]) == 100 and 100 not in versions[99]
+
+
+def test_remove():
+    m = PMap({i: i for i in range(100)})
+    for i in range(0, 100, 2):
+        m = m.remove(i)
+    assert len(m) == 50
+    assert sorted(m) == list(range(1, 100, 2))
+    assert m.remove(0) is m
+
+
+def test_hash_collisions():
+    m = PMap().set(CollidingKey(1), "a").set(CollidingKey(2), "b")
+    assert m[CollidingKey(1)] == "a" and m[CollidingKey(2)] == "b"
+    m = m.remove(CollidingKey(1))
+    assert len(m) == 1 and CollidingKey(1) not in m
+
+
+def test_unchanged_set_returns_same_map():
+    value = object()
+    m = PMap().set("x", value)
+    assert m.set("x", value) is m
+
+
+def test_pickle():
+    m = PMap({f"x{i}": i for i in range(100)})
+    assert pickle.loads(pickle.dumps(m)) == m
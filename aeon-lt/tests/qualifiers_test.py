@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from aeon.core.liquid import LiquidHole
+from aeon.core.liquid import LiquidVar
+from aeon.core.types import BaseType
+from aeon.verification import cache
+from aeon.verification import qualifiers
+from aeon.verification.helpers import conj
+from aeon.verification.helpers import constraint_builder
+from aeon.verification.helpers import end
+from aeon.verification.helpers import imp
+from aeon.verification.helpers import parse_liquid
+from aeon.verification.horn import solve
+from aeon.verification.qualifiers import QualifierLibrary
+
+
+def test_templates_shared_by_signature():
+    library = QualifierLibrary()
+    k1 = LiquidHole("k1", [("x", "Int")])
+    k2 = LiquidHole("k2", [("y", "Int")])
+    assert library.qualifiers(k1) == library.qualifiers(k2)
+    assert len(library.qualifiers(k1)) == 30
+    assert library.stats["signatures"] == 1
+
+
+def test_domain_qualifiers():
+    library = QualifierLibrary()
+    library.register([("d", "DataSet")], "n_rows(d) >= 0")
+    library.register([("d", "DataSet")], "n_rows(d) >= 0")
+    library.generic = False
+    k = LiquidHole("k", [("x", "Int"), ("a", "DataSet"), ("b", "DataSet")])
+    assert library.qualifiers(k) == [
+        parse_liquid("n_rows(_1) >= 0"),
+        parse_liquid("n_rows(_2) >= 0"),
+    ]
+
+
+def test_templates_persisted(tmp_path):
+    path = str(tmp_path / "qualifiers")
+    library = QualifierLibrary(path)
+    k = LiquidHole("k", [("x", "Int"), ("y", "Int")])
+    templates = library.qualifiers(k)
+    library.close()
+
+    library = QualifierLibrary(path)
+    key = f"{library.fingerprint}:{('Int', 'Int')!r}"
+    assert key in library.store
+    assert library.qualifiers(k) == templates
+    library.close()
+
+
+def test_solve_with_domain_qualifier():
+    dataset = BaseType("DataSet")
+    k = LiquidHole("k", [(LiquidVar("d"), "DataSet")])
+    c = conj(
+        constraint_builder([("d", dataset)], imp(k, end("n_rows(d) >= 0"))),
+        constraint_builder([("d", dataset)], imp("n_rows(d) == 3", end(k))),
+    )
+
+    library = QualifierLibrary()
+    previous = (qualifiers.qualifier_library, cache.validity_cache)
+    qualifiers.use_qualifier_library(library)
+    cache.use_validity_cache(cache.ValidityCache(maxsize=0))
+    try:
+        # The generic templates only compare datasets for equality
+        assert not solve(c)
+        library.register([("d", "DataSet")], "n_rows(d) >= 0")
+        assert solve(c)
+        library.generic = False
+        assert solve(c)
+    finally:
+        qualifiers.use_qualifier_library(previous[0])
+        cache.use_validity_cache(previous[1])
+
+
+def test_registering_invalidates_cached_results():
+    dataset = BaseType("DataSet")
+    k = LiquidHole("k", [(LiquidVar("d"), "DataSet")])
+    c = conj(
+        constraint_builder([("d", dataset)], imp(k, end("n_rows(d) >= 0"))),
+        constraint_builder([("d", dataset)], imp("n_rows(d) == 3", end(k))),
+    )
+
+    library = QualifierLibrary()
+    previous = (qualifiers.qualifier_library, cache.validity_cache)
+    qualifiers.use_qualifier_library(library)
+    cache.use_validity_cache(cache.ValidityCache(maxsize=16))
+    try:
+        assert not solve(c)
+        qualifiers.register_qualifier([("d", "DataSet")], "n_rows(d) >= 0")
+        assert solve(c)
+        # The library without the qualifier still gets its own result
+        qualifiers.use_qualifier_library(QualifierLibrary())
+        assert not solve(c)
+    finally:
+        qualifiers.use_qualifier_library(previous[0])
+        cache.use_validity_cache(previous[1])
+
+
+def test_derived_libraries():
+    library = QualifierLibrary()
+    library.register([("d", "DataSet")], "n_rows(d) >= 0")
+    derived = library.derived([([("d", "DataSet")], "n_cols(d) >= 0")])
+    k = LiquidHole("k", [(LiquidVar("d"), "DataSet")])
+    assert len(derived.qualifiers(k)) == len(library.qualifiers(k)) + 1
+    assert derived.templates is library.templates
+    assert derived.state != library.state
+    assert library.derived().state == library.state
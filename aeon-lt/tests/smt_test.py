@@ -5,7 +5,11 @@ from aeon.core.liquid import LiquidLiteralBool
 from aeon.core.liquid import LiquidLiteralInt
 from aeon.core.liquid import LiquidVar
 from aeon.core.types import t_int
+from aeon.verification.smt import flatten
+from aeon.verification.smt import IncrementalSolver
+from aeon.verification.helpers import parse_liquid
 from aeon.verification.smt import smt_valid
+from aeon.verification.smt import smt_valid_goals
 from aeon.verification.vcs import Implication
 from aeon.verification.vcs import LiquidConstraint
 
@@ -20,3 +24,43 @@ example = Implication(
 
 def test_smt_example3():
     assert smt_valid(example)
+
+
+def shared_context(goal):
+    return Implication(
+        "x",
+        t_int,
+        LiquidApp(">", [LiquidVar("x"), LiquidLiteralInt(0)]),
+        Implication(
+            "y",
+            t_int,
+            LiquidApp(">", [LiquidVar("y"), LiquidVar("x")]),
+            LiquidConstraint(goal),
+        ),
+    )
+
+
+def test_smt_incremental_agrees():
+    valid = shared_context(LiquidApp(">", [LiquidVar("y"), LiquidLiteralInt(0)]))
+    invalid = shared_context(LiquidApp(">", [LiquidVar("y"), LiquidLiteralInt(2)]))
+    for c, expected in [(valid, True), (invalid, False)]:
+        assert smt_valid(c, incremental=False) == expected
+        assert smt_valid(c, incremental=True) == expected
+
+
+def test_smt_incremental_reuses_hypotheses():
+    solver = IncrementalSolver()
+    for bound in range(3):
+        solver.valid(list(flatten(shared_context(LiquidApp(">", [LiquidVar("y"), LiquidLiteralInt(bound)])))))
+    assert solver.stats["solver_calls"] == 3
+    assert solver.stats["hypotheses_asserted"] == 2 + 3
+    assert solver.stats["hypotheses_reused"] == 2 * 2
+
+
+def test_smt_valid_goals():
+    goals = [parse_liquid(g) for g in ["x > 0", "x > 2", "x != 0", "x == 2"]]
+    stats = {"smt_calls": 0}
+    valid = smt_valid_goals([("x", t_int)], parse_liquid("x > 1"), goals,
+                            stats)
+    assert valid == [True, False, True, False]
+    assert stats["smt_calls"] <= 3
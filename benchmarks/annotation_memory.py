@@ -0,0 +1,68 @@
+"""Memory benchmark for the annotations layers add to the tree.
+
+Generates a program with many variables declared in the types, state and liquid layers, followed by
+let statements using them, runs each layer on the annotated tree and reports how much memory the
+annotations retain (measured with tracemalloc) and how long each layer took.
+
+Usage: python benchmarks/annotation_memory.py [-n VARIABLES]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aeon-lt"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.Compiler import LayeredCompiler
+from compiler.transformers.CreateAnnotatedTree import make_annotated_tree
+from layers.Layer import Layer
+from layers.LayerImplWrapper import LayerImplWrapper
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYERS = ["types", "state", "liquid"]
+
+
+def generate_program(variables):
+    lines = []
+    for i in range(variables):
+        lines += [f"x{i} :: types :: int", f"x{i} :: state :: {{=>Open}}", f"x{i} :: liquid :: {{v:Int | v > 0}}"]
+    lines.append("")
+    for i in range(variables):
+        lines += [f"let x{i} := {i + 1} in {{", f"    x{i} + 1", "}", ""]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--variables", action="store", type="int", dest="variables", default=300, help="Number of variables")
+    (options, args) = parser.parse_args()
+
+    compiler = LayeredCompiler(os.path.join(BASE_DIR, "layer_implementations"))
+
+    with tempfile.NamedTemporaryFile("w", suffix=".fl", delete=False) as f:
+        f.write(generate_program(options.variables))
+        program = f.name
+
+    try:
+        tree = make_annotated_tree(compiler.parse(program))
+        nodes = sum(1 for _ in tree.iter_subtrees())
+        print(f"Generated program with {options.variables} variables and {nodes} nodes")
+
+        tracemalloc.start()
+        total = 0
+        for layer_id in LAYERS:
+            layer = LayerImplWrapper(os.path.join(BASE_DIR, "layer_implementations"), Layer(layer_id))
+            before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            layer.typecheck(tree)
+            elapsed = time.perf_counter() - start
+            retained = tracemalloc.get_traced_memory()[0] - before
+            total += retained
+            print(f"{layer_id:8s} {retained / 2 ** 20:8.2f} MiB retained {elapsed:8.2f} s")
+        print(f"{'total':8s} {total / 2 ** 20:8.2f} MiB retained")
+        tracemalloc.stop()
+    finally:
+        os.remove(program)
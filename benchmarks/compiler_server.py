@@ -0,0 +1,77 @@
+"""Benchmark of typechecking the example programs through a compiler server.
+
+Starts a compiler server on a temporary Unix socket and, for every example program, measures the latency of a
+typecheck (-t) or run as seen from the command line: once with a fresh main.py process (cold), then R times with a
+main.py client of the server, whose first request also creates the compiler (first) and the rest reuse it (warm).
+
+Usage: python benchmarks/compiler_server.py [-r REPEAT] [-t | --run]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "aeon-lt"))
+sys.path.insert(0, ROOT)
+
+from compiler.CompilerServer import send_request
+
+EXAMPLES = [
+    ("bubble_sort.fl", "use_case_1.py"),
+    ("use_case_1.fl", "use_case_1.py"),
+    ("use_case_2.fl", "use_case_2.py"),
+    ("use_case_2_separate_layers.fl", "use_case_2.py"),
+]
+
+
+def main_py(*arguments):
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), *arguments], env=environment(),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start, completed.returncode
+
+
+def environment():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.join(ROOT, "aeon-lt"), ROOT, env.get("PYTHONPATH", "")])
+    return env
+
+
+def wait_for(socket_path, server):
+    while not os.path.exists(socket_path):
+        if server.poll() is not None:
+            raise RuntimeError("The compiler server exited")
+        time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-r", "--repeat", action="store", type="int", dest="repeat", default=5, help="Number of requests sent to the server per example")
+    parser.add_option("-t", "--typecheck", action="store_true", dest="typecheck", default=True, help="Only typecheck the programs")
+    parser.add_option("--run", action="store_false", dest="typecheck", help="Typecheck and run the programs")
+    (options, args) = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "aeon.sock")
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py"), "--serve", socket_path],
+                                  env=environment(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for(socket_path, server)
+            print(f"{'program':32s} {'cold':>9s} {'first':>9s} {'warm':>9s}")
+            for (program, impls) in EXAMPLES:
+                arguments = ["-f", os.path.join(ROOT, "examples", "code", program),
+                             "-i", os.path.join(ROOT, "examples", "python_impls", impls),
+                             "-l", os.path.join(ROOT, "layer_implementations")]
+                if options.typecheck:
+                    arguments.append("-t")
+                cold, _ = main_py(*arguments)
+                first, _ = main_py("--socket", socket_path, *arguments)
+                warm = [main_py("--socket", socket_path, *arguments)[0] for _ in range(options.repeat - 1)]
+                warm_mean = sum(warm) / len(warm) if warm else float("nan")
+                print(f"{program:32s} {cold * 1000:7.0f}ms {first * 1000:7.0f}ms {warm_mean * 1000:7.0f}ms")
+        finally:
+            send_request(socket_path, {"command": "stop"})
+            server.wait()
@@ -0,0 +1,95 @@
+"""Benchmark of the relevance slicing of typing contexts in aeon.typing.entailment.
+
+Typechecks a program with slicing off and on, with the entailment cache disabled, and reports the number of hypotheses
+sent to the solver before and after slicing, the queries that had to be checked again on the whole context, and the
+time spent solving entailment queries. With -n, the program is a generated pipeline of N data sets, each created and
+trained on in the scope of all the previous ones.
+
+Usage: python benchmarks/context_slicing.py [-f FILE | -n DATASETS] [-i IMPLS] [-l LAYERS]
+"""
+import os
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "aeon-lt"))
+sys.path.insert(0, ROOT)
+
+from aeon.typing import entailment
+from compiler.Compiler import LayeredCompiler
+
+solve_time = 0.0
+
+
+def timed(solve):
+    def timed_solve(*args):
+        global solve_time
+        start = time.perf_counter()
+        try:
+            return solve(*args)
+        finally:
+            solve_time += time.perf_counter() - start
+    return timed_solve
+
+
+HEADER = """
+train :: liquid :: { d:DataSet | (n_rows(d) >= 10 * (n_cols(d))) } -> { m:Model | true }
+create_dataset :: liquid :: { c:Int | (c >= 0) } -> { r:Int | (r >= 0) } -> { d:DataSet | (n_cols(d) == c) && (n_rows(d) == r) }
+"""
+
+
+def generate_pipeline(datasets):
+    lines = [HEADER]
+    for i in range(datasets):
+        indent = "    " * i
+        lines.append(f"{indent}dataset_{i} :: liquid :: {{ d:DataSet | n_rows(d) == {100 + i} }}")
+        lines.append(f"{indent}let dataset_{i} := create_dataset(10, {100 + i}) in {{")
+        lines.append(f"{indent}    model_{i} :: liquid :: {{ m:Model | true }}")
+        lines.append(f"{indent}    let model_{i} := train(dataset_{i}) in {{")
+    lines.append("    " * datasets + "    train(dataset_0)")
+    for i in reversed(range(datasets)):
+        lines.append("    " * i + "    }")
+        lines.append("    " * i + "}")
+    return "\n".join(lines) + "\n"
+
+
+def typecheck(options, slicing):
+    global solve_time
+    entailment.slicing = slicing
+    entailment.reset_slice_stats()
+    solve_time = 0.0
+    compiler = LayeredCompiler(options.layers, options.impls, entailment_cache_size=0)
+    start = time.perf_counter()
+    try:
+        compiler.typecheck(options.filename)
+        outcome = "verified"
+    except Exception as e:
+        outcome = type(e).__name__
+    return time.perf_counter() - start, solve_time, outcome
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-f", "--file", action="store", dest="filename", default=os.path.join(ROOT, "examples", "code", "use_case_2.fl"), help="Program to typecheck")
+    parser.add_option("-i", "--impls", action="store", dest="impls", default=os.path.join(ROOT, "examples", "python_impls", "use_case_2.py"), help="File containing implementations")
+    parser.add_option("-l", "--layers", action="store", dest="layers", default=os.path.join(ROOT, "layer_implementations"), help="Directory containing layers")
+    parser.add_option("-n", "--datasets", action="store", type="int", dest="datasets", default=0, help="Typecheck a generated pipeline of this many data sets")
+    (options, args) = parser.parse_args()
+
+    if options.datasets:
+        # The typechecker recurses on every nested let
+        sys.setrecursionlimit(10000)
+        with tempfile.NamedTemporaryFile("w", suffix=".fl", delete=False) as f:
+            f.write(generate_pipeline(options.datasets))
+        options.filename = f.name
+
+    entailment.solve = timed(entailment.solve)
+
+    for slicing in [False, True]:
+        elapsed, solving, outcome = typecheck(options, slicing)
+        print(f"slicing={str(slicing):5s} typecheck {elapsed:7.2f} s   solving {solving:7.2f} s   {outcome}")
+        if slicing:
+            stats = entailment.slice_stats
+            print(f"{stats['queries']} queries, {stats['sliced']} sliced: {stats['hypotheses']} hypotheses -> {stats['kept']}, {stats['fallbacks']} checked again on the whole context")
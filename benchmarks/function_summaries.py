@@ -0,0 +1,70 @@
+"""Benchmark of reusing function level verification summaries after an edit.
+
+Typechecks a generated program of N annotated helper functions with a fresh typecheck cache, then edits the body of
+one of them and typechecks the program again with the same cache. Only the edited function (and the statements
+outside of functions) should be verified again. Reports the time of both runs and the function summaries reused.
+
+Usage: python benchmarks/function_summaries.py [-n FUNCTIONS] [-i IMPLS] [-l LAYERS]
+"""
+import os
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "aeon-lt"))
+sys.path.insert(0, ROOT)
+
+from compiler.Compiler import LayeredCompiler
+
+
+def generate_helpers(functions, edited=None):
+    lines = []
+    for i in range(functions):
+        increment = i + 2 if i == edited else i + 1
+        lines.append(f"helper_{i} :: liquid :: {{ v:Int | v >= 0 }} -> {{ v:Int | v >= 0 }} -> {{ v:Int | v > 0 }}")
+        lines.append(f"helper_{i} x y {{")
+        lines.append(f"    sum_{i} :: liquid :: {{ v:Int | v >= 0 }}")
+        lines.append(f"    let sum_{i} := x + y in {{")
+        lines.append(f"        result_{i} :: liquid :: {{ v:Int | v > 0 }}")
+        lines.append(f"        let result_{i} := sum_{i} + {increment} in {{")
+        lines.append(f"            result_{i}")
+        lines.append("        }")
+        lines.append("    }")
+        lines.append("}")
+    lines.append("helper_0(1, 2)")
+    return "\n".join(lines) + "\n"
+
+
+def typecheck(options, filename, cache_dir):
+    compiler = LayeredCompiler(options.layers, options.impls, typecheck_cache_dir=cache_dir)
+    start = time.perf_counter()
+    try:
+        compiler.typecheck(filename)
+        outcome = "verified"
+    except Exception as e:
+        outcome = type(e).__name__
+    elapsed = time.perf_counter() - start
+    stats = compiler.function_summary_stats
+    print(f"typecheck {elapsed:7.2f} s   {outcome:10s} {stats['hits']} functions restored, {stats['misses']} verified")
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--functions", action="store", type="int", dest="functions", default=200, help="Number of helper functions in the program")
+    parser.add_option("-i", "--impls", action="store", dest="impls", default=os.path.join(ROOT, "examples", "python_impls", "use_case_2.py"), help="File containing implementations")
+    parser.add_option("-l", "--layers", action="store", dest="layers", default=os.path.join(ROOT, "layer_implementations"), help="Directory containing layers")
+    (options, args) = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "helpers.fl")
+        cache_dir = os.path.join(directory, "cache")
+
+        with open(filename, "w") as f:
+            f.write(generate_helpers(options.functions))
+        typecheck(options, filename, cache_dir)
+
+        with open(filename, "w") as f:
+            f.write(generate_helpers(options.functions, edited=options.functions // 2))
+        typecheck(options, filename, cache_dir)
@@ -0,0 +1,53 @@
+"""Benchmark of the Horn backends of aeon.verification.horn.
+
+Solves the abs example and a chain of N liquid holes (k0 implied by a fact, every k(i) implied by k(i-1) and a query
+on the last hole) with the qualifier fixpoint and with Spacer, Z3's CHC engine, which solves all holes at once.
+Reports the time and outcome of each backend, with the validity cache disabled.
+
+Usage: python benchmarks/horn_backends.py [-n HOLES] [-r REPEAT]
+"""
+import os
+import sys
+import time
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aeon-lt"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aeon.core.liquid import LiquidHole, LiquidVar
+from aeon.core.types import t_int
+from aeon.verification import horn
+from aeon.verification.helpers import conj, constraint_builder, end, get_abs_example, imp
+
+
+def hole(i):
+    return LiquidHole(f"k{i}", [(LiquidVar("x"), "Int")])
+
+
+def generate_chain(holes, query):
+    c = constraint_builder([("x", t_int)], imp(hole(holes - 1), end(query)))
+    for i in reversed(range(1, holes)):
+        c = conj(c, constraint_builder([("x", t_int)], imp(hole(i - 1), end(hole(i)))))
+    return conj(c, constraint_builder([("x", t_int)], imp("x == 1", end(hole(0)))))
+
+
+def measure(name, c, repeat):
+    for backend in horn.backends:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = horn.solve(c, backend)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"{name:16s} {backend:9s} {elapsed * 1000:10.1f} ms  valid={result}")
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--holes", action="store", type="int", dest="holes", default=20, help="Number of holes in the chain")
+    parser.add_option("-r", "--repeat", action="store", type="int", dest="repeat", default=3, help="Number of runs averaged")
+    (options, args) = parser.parse_args()
+
+    horn.cache.validity_cache.maxsize = 0
+
+    measure("abs", get_abs_example(), options.repeat)
+    measure("chain valid", generate_chain(options.holes, "x > 0"), options.repeat)
+    measure("chain invalid", generate_chain(options.holes, "x > 1"), options.repeat)
@@ -0,0 +1,64 @@
+"""Benchmark for the Horn fixpoint of aeon.verification.horn.
+
+Builds a chain of N liquid holes, where k0 is implied by a fact and every k(i) is implied by k(i-1), and a query on
+the last hole. The constraints are listed last hole first, the worst order for a solver that rechecks every
+constraint after each weakening. Compares that solver with the worklist fixpoint, in SMT calls and time.
+
+Usage: python benchmarks/horn_fixpoint.py [-n HOLES]
+"""
+import os
+import sys
+import time
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aeon-lt"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aeon.core.liquid import LiquidHole, LiquidVar
+from aeon.core.types import t_int
+from aeon.verification import horn
+from aeon.verification.helpers import conj, constraint_builder, end, imp
+
+
+def hole(i):
+    return LiquidHole(f"k{i}", [(LiquidVar("x"), "Int")])
+
+
+def generate_constraint(holes):
+    c = constraint_builder([("x", t_int)], imp(hole(holes - 1), end("x >= 0")))
+    for i in reversed(range(1, holes)):
+        c = conj(c, constraint_builder([("x", t_int)], imp(hole(i - 1), end(hole(i)))))
+    return conj(c, constraint_builder([("x", t_int)], imp("x == 1", end(hole(0)))))
+
+
+def recheck_all_fixpoint(cs, assign):
+    # The former fixpoint: recheck every constraint after each weakening
+    while True:
+        horn.solve_stats["iterations"] += len(cs)
+        ncs = [c for c in cs if not horn.counted_smt_valid(horn.apply(assign, c))]
+        if not ncs:
+            return assign
+        assign = {**assign, **horn.weaken(assign, ncs[0])}
+
+
+def measure(name, c):
+    start = time.perf_counter()
+    result = horn.solve(c)
+    elapsed = time.perf_counter() - start
+    stats = horn.solve_stats
+    print(f"{name:12s} {elapsed:8.2f} s {stats['smt_calls']:8d} SMT calls {stats['iterations']:6d} constraint checks  valid={result}")
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--holes", action="store", type="int", dest="holes", default=20, help="Number of holes in the chain")
+    (options, args) = parser.parse_args()
+
+    c = generate_constraint(options.holes)
+    horn.cache.validity_cache.maxsize = 0
+
+    worklist_fixpoint = horn.fixpoint
+    horn.fixpoint = recheck_all_fixpoint
+    measure("recheck all", c)
+    horn.fixpoint = worklist_fixpoint
+    measure("worklist", c)
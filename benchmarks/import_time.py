@@ -0,0 +1,63 @@
+"""Benchmark of the startup imports of typechecking a program without layers.
+
+Runs main.py -t on a program that uses no layer under python -X importtime, R times, and reports the median total
+import time (the cumulative time of the top level imports) and the most expensive top level imports. Fails if the
+total goes over the budget, or if a dependency only needed by some layers or options (z3, igraph, process pools) is
+imported.
+
+Usage: python benchmarks/import_time.py [-r REPEAT] [-b BUDGET_MS] [-f FILE] [-i IMPLS] [-l LAYERS]
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies that programs without layers should not load
+DEFERRED = ["z3", "igraph", "concurrent.futures"]
+
+IMPORT_LINE = re.compile(r"import time:\s*(\d+) \|\s*(\d+) \|( *)(\S+)")
+
+
+def import_times(options):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.join(ROOT, "aeon-lt"), ROOT, env.get("PYTHONPATH", "")])
+    completed = subprocess.run([sys.executable, "-X", "importtime", os.path.join(ROOT, "main.py"), "-t",
+                                "-f", options.filename, "-i", options.impls, "-l", options.layers],
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    # Top level imports are indented by a single space, their cumulative times add up to the total
+    imports = {}
+    for match in IMPORT_LINE.finditer(completed.stderr):
+        imports[match.group(4)] = (int(match.group(2)), len(match.group(3)) == 1)
+    return imports
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-r", "--repeat", action="store", type="int", dest="repeat", default=5, help="Number of runs, the median is reported")
+    parser.add_option("-b", "--budget", action="store", type="float", dest="budget", default=150, help="Total import time (ms) over which the benchmark fails")
+    parser.add_option("-f", "--file", action="store", dest="filename", default=os.path.join(ROOT, "tests", "test_code", "syntax", "assign.fl"), help="Program without layers to typecheck")
+    parser.add_option("-i", "--impls", action="store", dest="impls", default=os.path.join(ROOT, "tests", "implementations.py"), help="File containing implementations")
+    parser.add_option("-l", "--layers", action="store", dest="layers", default=os.path.join(ROOT, "tests", "layer_implementations"), help="Directory containing layers")
+    (options, args) = parser.parse_args()
+
+    runs = [import_times(options) for _ in range(options.repeat)]
+    totals = [sum(cumulative for (cumulative, top_level) in run.values() if top_level) for run in runs]
+    total = statistics.median(totals) / 1000
+
+    last = runs[-1]
+    top_level = sorted(((cumulative, name) for (name, (cumulative, is_top_level)) in last.items() if is_top_level), reverse=True)
+    for (cumulative, name) in top_level[:10]:
+        print(f"{name:40s} {cumulative / 1000:8.1f} ms")
+    print(f"{'total (median of ' + str(options.repeat) + ')':40s} {total:8.1f} ms   budget {options.budget:.0f} ms")
+
+    loaded = [name for name in DEFERRED if name in last]
+    if loaded:
+        print(f"FAIL: imported {', '.join(loaded)}")
+        sys.exit(1)
+    if total > options.budget:
+        print("FAIL: over budget")
+        sys.exit(1)
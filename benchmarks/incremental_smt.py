@@ -0,0 +1,68 @@
+"""Benchmark for incremental SMT solving in the liquid layer.
+
+Generates a program of deeply nested, refined let statements, so that the verification conditions
+of the inner statements share a long prefix of hypotheses, and typechecks it with the incremental
+solver enabled and disabled.
+
+Usage: python benchmarks/incremental_smt.py [-d DEPTH] [-r REPEAT]
+"""
+import os
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aeon-lt"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aeon.verification.smt as smt
+from compiler.Compiler import LayeredCompiler
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def generate_program(depth):
+    lines = ["x0 :: liquid :: {v:Int | v > 0}", "let x0 := 1 in {"]
+    for i in range(1, depth):
+        indent = "    " * i
+        lines += [f"{indent}x{i} :: liquid :: {{v:Int | v > x{i - 1}}}", f"{indent}let x{i} := x{i - 1} + 1 in {{"]
+    lines.append("    " * depth + f"x{depth - 1}")
+    for i in reversed(range(depth)):
+        lines.append("    " * i + "}")
+    return "\n".join(lines) + "\n"
+
+
+def timed_typecheck(compiler, program, incremental, repeat):
+    smt.incremental_mode = incremental
+    best = float("inf")
+    for _ in range(repeat):
+        smt.incremental_solver = smt.IncrementalSolver()
+        start = time.perf_counter()
+        compiler.typecheck(program)
+        best = min(best, time.perf_counter() - start)
+    return best, smt.incremental_solver.stats
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-d", "--depth", action="store", type="int", dest="depth", default=40, help="Nesting depth of the let statements")
+    parser.add_option("-r", "--repeat", action="store", type="int", dest="repeat", default=3, help="Number of runs per mode")
+    (options, args) = parser.parse_args()
+
+    compiler = LayeredCompiler(os.path.join(BASE_DIR, "layer_implementations"))
+
+    with tempfile.NamedTemporaryFile("w", suffix=".fl", delete=False) as f:
+        f.write(generate_program(options.depth))
+        program = f.name
+
+    try:
+        before, _ = timed_typecheck(compiler, program, False, options.repeat)
+        after, stats = timed_typecheck(compiler, program, True, options.repeat)
+        print(f"Solver calls:        {stats['solver_calls']:10d}")
+        print(f"Hypotheses asserted: {stats['hypotheses_asserted']:10d}")
+        print(f"Hypotheses reused:   {stats['hypotheses_reused']:10d}")
+        print(f"Push/pop typecheck:  {before:10.2f} s")
+        print(f"Incremental:         {after:10.2f} s")
+        print(f"Time saved:          {before - after:10.2f} s ({(before - after) / before:.0%})")
+    finally:
+        os.remove(program)
@@ -0,0 +1,105 @@
+"""Benchmark for running programs with the tree-walking SimpleInterpreter and with the ClosureCompiler.
+
+Runs examples/code/bubble_sort.fl on a list of random numbers and a recursive factorial in a program with many global
+variables, and reports the best run time of each runner. The time to compile the program to closures is reported separately.
+
+Usage: python benchmarks/interpreter.py [-n ELEMENTS] [-f FACTORIAL] [-g GLOBALS] [-r REPEAT]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aeon-lt"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.Compiler import LayeredCompiler
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPLEMENTATIONS = """
+from builtins import len
+
+LIST = {elements!r}
+
+def get_list():
+    return list(LIST)
+
+def get_element(ls, idx):
+    return ls[idx]
+
+def set_list_element(ls, idx, value):
+    ls = list(ls)
+    ls[idx] = value
+    return ls
+
+def print(*args):
+    pass
+"""
+
+FACTORIAL = """
+{globals}
+
+fac x {{
+    let cond := (x == 0) in {{
+        if cond then {{
+            1
+        }} else {{
+            x * fac ( x - 1 )
+        }}
+    }}
+}}
+
+fac({n})
+"""
+
+
+def best_of(repeat, run):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def measure(name, compiler, program, repeat):
+    tree = compiler.parse(program)
+
+    interpreted, expected = best_of(repeat, lambda: compiler.interpreter.run(tree))
+    compile_time, compiled = best_of(repeat, lambda: compiler.closure_compiler.compile(tree))
+    closures, result = best_of(repeat, compiled)
+    assert result == expected
+
+    print(f"{name:12s} interpreter {interpreted * 1000:9.1f} ms   closures {closures * 1000:9.1f} ms"
+          f" (compile {compile_time * 1000:6.2f} ms)   speedup {interpreted / closures:6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--elements", action="store", type="int", dest="elements", default=40, help="Number of elements to sort")
+    parser.add_option("-f", "--factorial", action="store", type="int", dest="factorial", default=100, help="Argument of the factorial")
+    parser.add_option("-g", "--globals", action="store", type="int", dest="globals", default=500, help="Number of global variables defined before the factorial")
+    parser.add_option("-r", "--repeat", action="store", type="int", dest="repeat", default=5, help="Number of runs")
+    (options, args) = parser.parse_args()
+
+    # Both runners recurse once (or more) per call of the program
+    sys.setrecursionlimit(100000)
+
+    random.seed(0)
+    elements = [random.randint(0, 1000) for _ in range(options.elements)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        impls = os.path.join(directory, "implementations.py")
+        with open(impls, "w") as f:
+            f.write(IMPLEMENTATIONS.format(elements=elements))
+        factorial = os.path.join(directory, "factorial.fl")
+        with open(factorial, "w") as f:
+            global_variables = "\n".join(f"g{i} := {i}" for i in range(options.globals))
+            f.write(FACTORIAL.format(globals=global_variables, n=options.factorial))
+
+        compiler = LayeredCompiler(os.path.join(BASE_DIR, "layer_implementations"), impls)
+        measure("bubble sort", compiler, os.path.join(BASE_DIR, "examples", "code", "bubble_sort.fl"), options.repeat)
+        measure("factorial", compiler, factorial, options.repeat)
@@ -0,0 +1,56 @@
+"""Benchmark of typechecking a batch of programs with a single compiler.
+
+Typechecks each program N times with the same LayeredCompiler, with the layer module cache enabled and disabled
+(every typecheck executing the layer files again), and reports the mean time per typecheck and the layer modules
+loaded. The default programs use the trivial test layers, whose typecheck costs next to nothing, and the liquid layers
+of the use_case_2 examples.
+
+Usage: python benchmarks/layer_loading.py [-n TYPECHECKS]
+"""
+import os
+import sys
+import time
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "aeon-lt"))
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+sys.path.insert(0, ROOT)
+
+from compiler.Compiler import LayeredCompiler
+from layers import LayerImplWrapper
+
+PROGRAMS = [
+    ("complex_layers.fl", os.path.join(ROOT, "tests", "test_code", "layers", "complex_layers.fl"),
+     os.path.join(ROOT, "tests", "layer_implementations"), os.path.join(ROOT, "tests", "implementations.py")),
+    ("separate_layer_dim_success.fl", os.path.join(ROOT, "examples", "code", "use_case_2", "separate_layer_dim_success.fl"),
+     os.path.join(ROOT, "layer_implementations"), os.path.join(ROOT, "examples", "python_impls", "use_case_2.py")),
+]
+
+
+def measure(name, filename, layers, impls, typechecks, cache_modules):
+    LayerImplWrapper.cache_modules = cache_modules
+    LayerImplWrapper.loaded_layers.clear()
+    LayerImplWrapper.loaded_layers_stats.update(hits=0, loads=0)
+    compiler = LayeredCompiler(layers, impls)
+    start = time.perf_counter()
+    for _ in range(typechecks):
+        compiler.typecheck(filename, raise_on_error=False)
+    elapsed = (time.perf_counter() - start) / typechecks
+    label = "cached" if cache_modules else "uncached"
+    print(f"{name:32s} {label:9s} {elapsed * 1000:8.2f} ms/typecheck   {LayerImplWrapper.loaded_layers_stats['loads']} modules loaded")
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--typechecks", action="store", type="int", dest="typechecks", default=200, help="Number of typechecks per program")
+    (options, args) = parser.parse_args()
+
+    for (name, filename, layers, impls) in PROGRAMS:
+        cwd = os.getcwd()
+        os.chdir(os.path.dirname(filename))
+        try:
+            for cache_modules in (False, True):
+                measure(name, filename, layers, impls, options.typechecks, cache_modules)
+        finally:
+            os.chdir(cwd)
@@ -0,0 +1,98 @@
+"""Benchmark of typechecking layered liquid programs, where every node combines the contexts of other layers.
+
+Typechecks a generated rows/cols/rowcols pipeline of N data sets, each obtained by adding rows to the previous one, in
+the style of examples/code/use_case_2/separate_layer_dim_success.fl. The rowcols layer combines the contexts of the
+rows and cols layers on every node it visits. Reports the typecheck time, the part of it spent combining contexts and
+the peak memory allocated while typechecking, with the entailment cache disabled.
+
+Usage: python benchmarks/layered_types.py [-n DATASETS] [-i IMPLS] [-l LAYERS]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "aeon-lt"))
+sys.path.insert(0, ROOT)
+
+from compiler.Compiler import LayeredCompiler
+from compiler.interpreters import LiquidTypeChecker
+
+combine_time = 0.0
+
+
+def timed_combine_contexts(*args):
+    global combine_time
+    start = time.perf_counter()
+    try:
+        return combine_contexts(*args)
+    finally:
+        combine_time += time.perf_counter() - start
+
+
+combine_contexts = LiquidTypeChecker.combine_contexts
+LiquidTypeChecker.combine_contexts = timed_combine_contexts
+
+HEADER = """
+add_rows :: rows :: { d:DataSet | true } -> {n:Int | n>0} -> { d2:DataSet | (n_rows(d2) == (n_rows(d) + n)) }
+add_rows :: cols :: { d:DataSet | n_cols(d)>0 } -> {n:Int | true} -> { d2:DataSet | (n_cols(d2) == n_cols(d)) }
+add_rows :: rowcols :: { d:DataSet | true } -> {n:Int | n>0} -> { d2:DataSet | true }
+
+train :: rows :: { d:DataSet | true } -> { m:Model | true }
+train :: cols :: { d:DataSet | true } -> { m:Model | true }
+train :: rowcols :: { d:DataSet | (n_rows(d) >= 10 * (n_cols(d))) } -> { m:Model | true }
+
+create_dataset :: rows :: { c:Int | true } -> { r:Int | (r >= 0) } -> { d:DataSet | (n_rows(d) == r) }
+create_dataset :: cols :: { c:Int | (c >=0) } -> { r:Int | true } -> { d:DataSet | (n_cols(d) == c) }
+create_dataset :: rowcols :: { c:Int | true } -> { r:Int | true } -> { d:DataSet | true }
+"""
+
+
+def declare(indent, name):
+    return [f"{indent}{name} :: {layer} :: {{ d:DataSet | true }}" for layer in ["rows", "cols", "rowcols"]]
+
+
+def generate_pipeline(datasets):
+    lines = [HEADER]
+    lines += declare("", "dataset_0")
+    lines.append("let dataset_0 := create_dataset(1, 10) in {")
+    for i in range(1, datasets):
+        indent = "    " * i
+        lines += declare(indent, f"dataset_{i}")
+        lines.append(f"{indent}let dataset_{i} := add_rows(dataset_{i - 1}, 10) in {{")
+    lines.append("    " * datasets + f"train(dataset_{datasets - 1})")
+    for i in reversed(range(datasets)):
+        lines.append("    " * i + "}")
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--datasets", action="store", type="int", dest="datasets", default=20, help="Number of data sets in the pipeline")
+    parser.add_option("-i", "--impls", action="store", dest="impls", default=os.path.join(ROOT, "examples", "python_impls", "use_case_2.py"), help="File containing implementations")
+    parser.add_option("-l", "--layers", action="store", dest="layers", default=os.path.join(ROOT, "layer_implementations"), help="Directory containing layers")
+    (options, args) = parser.parse_args()
+
+    # The typechecker recurses on every nested let
+    sys.setrecursionlimit(10000)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".fl", delete=False) as f:
+        f.write(generate_pipeline(options.datasets))
+
+    compiler = LayeredCompiler(options.layers, options.impls, entailment_cache_size=0)
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        compiler.typecheck(f.name)
+        outcome = "verified"
+    except Exception as e:
+        outcome = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    os.unlink(f.name)
+
+    print(f"{options.datasets} data sets: typecheck {elapsed:7.2f} s   combining contexts {combine_time:6.2f} s   peak memory {peak / 2 ** 20:8.1f} MiB   {outcome}")
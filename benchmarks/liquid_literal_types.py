@@ -0,0 +1,95 @@
+"""Microbenchmark for the types the liquid layer assigns to literals and binary operations.
+
+Generates an arithmetic-heavy .fl program and compares how many `num`/`bin_op` nodes per second
+can be typed by formatting and re-parsing a type string (the old approach) and by building the
+refined types directly.
+
+Usage: python benchmarks/liquid_literal_types.py [-n LETS] [-o OPERATORS] [--typecheck]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aeon-lt"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aeon.core.types import t_int, t_bool, mk_singleton_int, mk_binop_result
+from aeon.frontend.parser import mk_parser
+from compiler.Compiler import LayeredCompiler
+from compiler.transformers.CreateAnnotatedTree import make_annotated_tree
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OPERATORS = ["+", "-", "*"]
+
+
+def generate_program(lets, operators):
+    rng = random.Random(42)
+    lines = ["x :: liquid :: { v:Int | true }", ""]
+    for _ in range(lets):
+        expr = str(rng.randint(0, 100))
+        for _ in range(operators):
+            expr = f"{expr} {rng.choice(OPERATORS)} {rng.randint(0, 100)}"
+        lines += [f"let x := {expr} in {{", "    x", "}", ""]
+    return "\n".join(lines)
+
+
+def string_types(nodes):
+    for node in nodes:
+        if node.data == "num":
+            mk_parser("type").parse("{v:Int | v == " + node.children[0].value + " }")
+        else:
+            op = node.children[1].value
+            mk_parser("type").parse(f"{{ bin_op_result:Int | bin_op_result == ( bin_op_lhs {op} bin_op_rhs ) }}")
+
+
+def builder_types(nodes):
+    for node in nodes:
+        if node.data == "num":
+            mk_singleton_int(int(node.children[0].value))
+        else:
+            op = node.children[1].value
+            mk_binop_result("bin_op_result", t_int, op, "bin_op_lhs", "bin_op_rhs")
+
+
+def throughput(fn, nodes, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(nodes)
+        best = min(best, time.perf_counter() - start)
+    return len(nodes) / best
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--lets", action="store", type="int", dest="lets", default=200, help="Number of let statements")
+    parser.add_option("-o", "--operators", action="store", type="int", dest="operators", default=10, help="Operators per expression")
+    parser.add_option("--typecheck", action="store_true", dest="typecheck", help="Also time a full liquid typecheck")
+    (options, args) = parser.parse_args()
+
+    compiler = LayeredCompiler(os.path.join(BASE_DIR, "layer_implementations"))
+
+    with tempfile.NamedTemporaryFile("w", suffix=".fl", delete=False) as f:
+        f.write(generate_program(options.lets, options.operators))
+        program = f.name
+
+    try:
+        tree = make_annotated_tree(compiler.parse(program))
+        nodes = [node for node in tree.iter_subtrees() if node.data in {"num", "bin_op"}]
+        print(f"Generated program with {len(nodes)} num/bin_op nodes")
+
+        before = throughput(string_types, nodes)
+        after = throughput(builder_types, nodes)
+        print(f"String round-trip: {before:12.0f} nodes/s")
+        print(f"Direct builders:   {after:12.0f} nodes/s")
+        print(f"Speedup:           {after / before:12.1f}x")
+
+        if options.typecheck:
+            start = time.perf_counter()
+            compiler.typecheck(program, raise_on_error=False)
+            print(f"Liquid typecheck:  {time.perf_counter() - start:12.2f} s")
+    finally:
+        os.remove(program)
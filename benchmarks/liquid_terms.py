@@ -0,0 +1,54 @@
+"""Benchmark of the construction, hashing and comparison of liquid terms.
+
+Builds a large set of constraint predicates the way the Horn fixpoint does: the qualifier templates of holes over
+(Int, Int, Int) arguments are filled with the arguments of N holes, drawn from a small pool of variables, and
+conjoined into the assignment of each hole. Reports the time taken, the peak memory allocated (tracemalloc) and the
+number of distinct terms among the predicates.
+
+Usage: python benchmarks/liquid_terms.py [-n HOLES] [-v VARIABLES]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aeon-lt"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aeon.core.liquid import LiquidHole
+from aeon.verification.horn import fill_horn_arguments, merge_assignments
+from aeon.verification.qualifiers import enumerate_templates
+
+
+def build_predicates(holes, variables, templates):
+    predicates = []
+    for i in range(holes):
+        hole = LiquidHole(f"k{i}", [(f"v{(i + j) % variables}", "Int") for j in range(3)])
+        filled = [fill_horn_arguments(hole, q) for q in templates]
+        predicates.extend(filled)
+        predicates.append(merge_assignments(filled))
+    return predicates
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--holes", action="store", type="int", dest="holes", default=200, help="Number of holes")
+    parser.add_option("-v", "--variables", action="store", type="int", dest="variables", default=8, help="Number of variables the holes range over")
+    (options, args) = parser.parse_args()
+
+    # The conjunctions of all the qualifiers of a hole are deep terms
+    sys.setrecursionlimit(10000)
+    templates = enumerate_templates(("Int", "Int", "Int"))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    predicates = build_predicates(options.holes, options.variables, templates)
+    built = time.perf_counter() - start
+    distinct = len(set(predicates))
+    elapsed = time.perf_counter() - start
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{len(templates)} templates, {len(predicates)} predicates, {distinct} distinct")
+    print(f"build {built:8.2f} s   build + dedup {elapsed:8.2f} s   peak memory {peak / 2 ** 20:8.1f} MiB")
@@ -0,0 +1,66 @@
+"""Benchmark of checking the function bodies of liquid layers in parallel.
+
+Typechecks a generated program of N small annotated helper functions, each binding a few values in its body, with the
+function bodies checked one after another and then by a pool of J processes for every J given. Reports the typecheck
+time of each run, with the entailment cache disabled.
+
+Usage: python benchmarks/parallel_fun_defs.py [-n FUNCTIONS] [-j JOBS,JOBS...] [-i IMPLS] [-l LAYERS]
+"""
+import os
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "aeon-lt"))
+sys.path.insert(0, ROOT)
+
+from compiler.Compiler import LayeredCompiler
+
+
+def generate_helpers(functions):
+    lines = []
+    for i in range(functions):
+        lines.append(f"helper_{i} :: liquid :: {{ v:Int | v >= 0 }} -> {{ v:Int | v >= 0 }} -> {{ v:Int | v > 0 }}")
+        lines.append(f"helper_{i} x y {{")
+        lines.append(f"    sum_{i} :: liquid :: {{ v:Int | v >= 0 }}")
+        lines.append(f"    let sum_{i} := x + y in {{")
+        lines.append(f"        result_{i} :: liquid :: {{ v:Int | v > 0 }}")
+        lines.append(f"        let result_{i} := sum_{i} + {i + 1} in {{")
+        lines.append(f"            result_{i}")
+        lines.append("        }")
+        lines.append("    }")
+        lines.append("}")
+    lines.append("helper_0(1, 2)")
+    return "\n".join(lines) + "\n"
+
+
+def typecheck(options, filename, fun_def_jobs):
+    compiler = LayeredCompiler(options.layers, options.impls, entailment_cache_size=0, fun_def_jobs=fun_def_jobs)
+    start = time.perf_counter()
+    try:
+        compiler.typecheck(filename)
+        outcome = "verified"
+    except Exception as e:
+        outcome = type(e).__name__
+    return time.perf_counter() - start, outcome
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--functions", action="store", type="int", dest="functions", default=200, help="Number of helper functions in the program")
+    parser.add_option("-j", "--jobs", action="store", dest="jobs", default=f"2,{max(2, os.cpu_count())}", help="Comma separated numbers of processes checking the function bodies")
+    parser.add_option("-i", "--impls", action="store", dest="impls", default=os.path.join(ROOT, "examples", "python_impls", "use_case_2.py"), help="File containing implementations")
+    parser.add_option("-l", "--layers", action="store", dest="layers", default=os.path.join(ROOT, "layer_implementations"), help="Directory containing layers")
+    (options, args) = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".fl", delete=False) as f:
+        f.write(generate_helpers(options.functions))
+
+    elapsed, outcome = typecheck(options, f.name, 0)
+    print(f"{'sequential':12s} typecheck {elapsed:7.2f} s   {outcome}")
+    for jobs in [int(j) for j in options.jobs.split(",")]:
+        elapsed, outcome = typecheck(options, f.name, jobs)
+        print(f"{f'{jobs} jobs':12s} typecheck {elapsed:7.2f} s   {outcome}")
+    os.unlink(f.name)
@@ -0,0 +1,110 @@
+"""Benchmark for the time it takes to get from source code to a tree that is ready to be typechecked.
+
+Compares the former four passes (parse with inline RemoveTokens, RemoveTokens, CreateAnnotatedTree and CollectLayers,
+on the grammar that still produced newline nodes) with the single pass of BuildTree on a generated program. Reports the parse-to-ready latency, the number of tree nodes
+allocated and the memory allocated (tracemalloc peak) per source line.
+
+Usage: python benchmarks/parse_pipeline.py [-n FUNCTIONS] [-r REPEAT]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aeon-lt"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lark
+
+from compiler.transformers.BuildTree import BuildTree
+from compiler.transformers.CollectLayers import CollectLayers
+from compiler.transformers.CreateAnnotatedTree import CreateAnnotatedTree
+from compiler.transformers.RemoveTokens import RemoveTokens
+
+GRAMMAR_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "compiler", "grammar_file.lark")
+
+
+def generate_program(functions):
+    lines = []
+    for i in range(functions):
+        lines += [f"f{i} :: types :: int -> int", f"f{i} :: liquid :: {{v:Int | v > 0}} -> {{v:Int | v > 1}}",
+                  f"f{i} x {{", f"    y :: types :: int", f"    let y := x + {i} in {{", "        y * 2 - 1", "    }", "}",
+                  f"f{i}({i + 1})", ""]
+    return "\n".join(lines)
+
+
+def make_parser(transformer, keep_newlines=False):
+    with open(GRAMMAR_FILE) as f:
+        grammar = f.read()
+    if keep_newlines:
+        # The grammar as it was before newlines were dropped while parsing
+        grammar = grammar.replace("%import common.NEWLINE -> _NEWLINE", "%import common.NEWLINE")
+        grammar = grammar.replace("_NEWLINE", "NEWLINE").replace("_newline", "newline")
+    return lark.Lark(grammar, parser="lalr", debug=True, propagate_positions=True, transformer=transformer)
+
+
+def four_passes(parser, source):
+    tree = parser.parse(source)
+    tree = RemoveTokens(["newline"]).transform(tree)
+    tree = CreateAnnotatedTree().transform(tree)
+    CollectLayers().transform(tree)
+    return tree
+
+
+def single_pass(builder):
+    def run(parser, source):
+        builder.reset()
+        return parser.parse(source)
+    return run
+
+
+class count_nodes:
+    """Counts the lark.Tree nodes created while active."""
+
+    def __enter__(self):
+        self.count = 0
+        self.original = lark.Tree.__init__
+
+        def counting_init(tree, *args, **kwargs):
+            self.count += 1
+            self.original(tree, *args, **kwargs)
+
+        lark.Tree.__init__ = counting_init
+        return self
+
+    def __exit__(self, *args):
+        lark.Tree.__init__ = self.original
+
+
+def measure(name, parser, build, source, lines, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build(parser, source)
+        best = min(best, time.perf_counter() - start)
+
+    with count_nodes() as counter:
+        build(parser, source)
+
+    tracemalloc.start()
+    build(parser, source)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"{name:12s} {best * 1000:9.1f} ms {counter.count / lines:8.2f} nodes/line {peak / lines:10.0f} bytes/line")
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--functions", action="store", type="int", dest="functions", default=500, help="Number of generated functions")
+    parser.add_option("-r", "--repeat", action="store", type="int", dest="repeat", default=5, help="Number of runs")
+    (options, args) = parser.parse_args()
+
+    source = generate_program(options.functions)
+    lines = source.count("\n") + 1
+    print(f"Generated program with {lines} lines")
+
+    builder = BuildTree()
+    measure("four passes", make_parser(RemoveTokens(["newline"]), keep_newlines=True), four_passes, source, lines, options.repeat)
+    measure("single pass", make_parser(builder), single_pass(builder), source, lines, options.repeat)
@@ -0,0 +1,61 @@
+"""Benchmark for the elimination of qualifiers in horn.weaken.
+
+Solves the Horn constraints of aeon-lt/tests/horn_test.py (the abs example, with a hole over two integers) and of
+chains of holes over one, two and three integers, checking the candidate qualifiers of a hole one SMT query at a
+time and in batches on a single solver. Reports the number of solver calls and the time of each mode.
+
+Usage: python benchmarks/qualifier_elimination.py [-n HOLES]
+"""
+import os
+import sys
+import time
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aeon-lt"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aeon.core.liquid import LiquidHole, LiquidVar
+from aeon.core.types import t_int
+from aeon.verification import horn
+from aeon.verification.helpers import conj, constraint_builder, end, get_abs_example, imp
+
+VARIABLES = ["x", "y", "z"]
+
+
+def hole(i, arity):
+    return LiquidHole(f"k{i}", [(LiquidVar(v), "Int") for v in VARIABLES[:arity]])
+
+
+def chain_example(holes, arity):
+    # k0 holds when all variables are 1, every hole implies the next one and the last one implies a query
+    binders = [(v, t_int) for v in VARIABLES[:arity]]
+    c = constraint_builder(binders, imp(hole(holes - 1, arity), end("x >= 0")))
+    for i in reversed(range(1, holes)):
+        c = conj(c, constraint_builder(binders, imp(hole(i - 1, arity), end(hole(i, arity)))))
+    fact = " && ".join(f"({v} == 1)" for v in VARIABLES[:arity])
+    return conj(c, constraint_builder(binders, imp(fact, end(hole(0, arity)))))
+
+
+def measure(name, c):
+    results = []
+    for batched in (False, True):
+        horn.batched_weakening = batched
+        start = time.perf_counter()
+        valid = horn.solve(c)
+        results.append((time.perf_counter() - start, horn.solve_stats["smt_calls"], valid))
+    ((t1, calls1, valid1), (t2, calls2, valid2)) = results
+    assert valid1 == valid2
+    print(f"{name:22s} one by one {calls1:6d} calls {t1:7.2f} s   batched {calls2:6d} calls {t2:7.2f} s"
+          f"   {calls1 / calls2:5.1f}x fewer calls")
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--holes", action="store", type="int", dest="holes", default=10, help="Number of holes in the chains")
+    (options, args) = parser.parse_args()
+
+    horn.cache.validity_cache.maxsize = 0
+
+    measure("abs example", get_abs_example())
+    for arity in (1, 2, 3):
+        measure(f"chain of {options.holes}, arity {arity}", chain_example(options.holes, arity))
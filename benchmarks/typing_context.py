@@ -0,0 +1,41 @@
+"""Benchmark of aeon.typing.context.
+
+Extends a typing context with N variables, looking up a variable bound near the start of the context and asking for
+a fresh variable after every extension, as the liquid layer does while checking a long sequence of statements.
+
+Usage: python benchmarks/typing_context.py [-n VARIABLES]
+"""
+import os
+import sys
+import time
+from optparse import OptionParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aeon-lt"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aeon.core.types import t_int
+from aeon.typing.context import EmptyContext
+
+
+def build_context(variables):
+    ctx = EmptyContext()
+    for i in range(variables):
+        ctx = ctx.with_var(f"x_{i}", t_int)
+        assert ctx.type_of("x_0") == t_int
+        ctx.fresh_var()
+    return ctx
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--variables", action="store", type="int", dest="variables", default=2000, help="Number of variables in the context")
+    (options, args) = parser.parse_args()
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * options.variables))
+
+    start = time.perf_counter()
+    ctx = build_context(options.variables)
+    built = time.perf_counter() - start
+    hash(ctx)
+    elapsed = time.perf_counter() - start
+    print(f"{options.variables} variables: build {built * 1000:10.1f} ms   build + hash {elapsed * 1000:10.1f} ms")
@@ -0,0 +1,68 @@
+"""Benchmark of discharging the verification conditions of liquid layers in two phases.
+
+Typechecks a generated program of N independent data set pipelines, each created and trained on, first checking every
+subtyping obligation as soon as it is generated, then collecting them all and discharging them with a pool of J
+processes for every J given. Reports the typecheck time of each mode, with the entailment cache disabled.
+
+Usage: python benchmarks/vc_discharge.py [-n PIPELINES] [-j JOBS,JOBS...] [-i IMPLS] [-l LAYERS]
+"""
+import os
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "aeon-lt"))
+sys.path.insert(0, ROOT)
+
+from compiler.Compiler import LayeredCompiler
+
+HEADER = """
+add_rows :: liquid :: { d:DataSet | n_cols(d) > 0 } -> {n:Int | n>0} -> { d2:DataSet | (n_rows(d2) == (n_rows(d) + n)) && (n_cols(d2) == n_cols(d)) }
+train :: liquid :: { d:DataSet | (n_rows(d) >= 10 * (n_cols(d))) } -> { m:Model | true }
+create_dataset :: liquid :: { c:Int | (c >= 0) } -> { r:Int | (r >= 0) } -> { d:DataSet | (n_cols(d) == c) && (n_rows(d) == r) }
+"""
+
+
+def generate_pipelines(pipelines):
+    lines = [HEADER]
+    for i in range(pipelines):
+        lines.append(f"dataset_{i} :: liquid :: {{ d:DataSet | n_cols(d) == 10 }}")
+        lines.append(f"let dataset_{i} := create_dataset(10, {50 + i}) in {{")
+        lines.append(f"    bigger_{i} :: liquid :: {{ d:DataSet | n_rows(d) >= 100 }}")
+        lines.append(f"    let bigger_{i} := add_rows(dataset_{i}, 50) in {{")
+        lines.append(f"        train(bigger_{i})")
+        lines.append("    }")
+        lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def typecheck(options, filename, vc_jobs):
+    compiler = LayeredCompiler(options.layers, options.impls, entailment_cache_size=0, vc_jobs=vc_jobs)
+    start = time.perf_counter()
+    try:
+        compiler.typecheck(filename)
+        outcome = "verified"
+    except Exception as e:
+        outcome = type(e).__name__
+    return time.perf_counter() - start, outcome
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--pipelines", action="store", type="int", dest="pipelines", default=100, help="Number of data set pipelines in the program")
+    parser.add_option("-j", "--jobs", action="store", dest="jobs", default=f"1,{os.cpu_count()}", help="Comma separated numbers of processes discharging the verification conditions")
+    parser.add_option("-i", "--impls", action="store", dest="impls", default=os.path.join(ROOT, "examples", "python_impls", "use_case_2.py"), help="File containing implementations")
+    parser.add_option("-l", "--layers", action="store", dest="layers", default=os.path.join(ROOT, "layer_implementations"), help="Directory containing layers")
+    (options, args) = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".fl", delete=False) as f:
+        f.write(generate_pipelines(options.pipelines))
+
+    elapsed, outcome = typecheck(options, f.name, 0)
+    print(f"{'eager':12s} typecheck {elapsed:7.2f} s   {outcome}")
+    for jobs in [int(j) for j in options.jobs.split(",")]:
+        elapsed, outcome = typecheck(options, f.name, jobs)
+        print(f"{f'{jobs} job(s)':12s} typecheck {elapsed:7.2f} s   {outcome}")
+    os.unlink(f.name)
@@ -0,0 +1,245 @@
+import operator
+
+# Marks a slot whose variable has not been assigned (yet)
+_UNDEFINED = object()
+
+BINARY_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+}
+
+
+class Scope:
+    """Maps the variables of a function body (or of the program) to slots of its frame."""
+    def __init__(self):
+        self.slots = dict()
+
+    def slot(self, identifier):
+        if not identifier in self.slots:
+            self.slots[identifier] = len(self.slots)
+        return self.slots[identifier]
+
+    @property
+    def size(self):
+        return len(self.slots)
+
+
+class CompiledFunction:
+    """A function definition whose body has been lowered to a closure."""
+    def __init__(self, name, args, arg_slots, body, scope, defines_functions, functions):
+        self.name = name
+        self.args = args
+        self.arg_slots = arg_slots
+        self.body = body
+        self.scope = scope
+        # Functions defined in the body are only visible for the duration of the call
+        self.defines_functions = defines_functions
+        self.functions = functions
+
+    def __call__(self, fun_args):
+        frame = [_UNDEFINED] * self.scope.size
+        for slot, fun_arg in zip(self.arg_slots, fun_args):
+            frame[slot] = fun_arg
+
+        if not self.defines_functions:
+            return self.body(frame)
+
+        old_functions = self.functions.copy()
+        result = self.body(frame)
+        self.functions.clear()
+        self.functions.update(old_functions)
+
+        return result
+
+
+class CompiledProgram:
+    """A program lowered to closures, ready to be run any number of times."""
+    def __init__(self, body, scope, functions):
+        self.body = body
+        self.scope = scope
+        self.functions = functions
+        self.variables = dict()
+
+    def __call__(self):
+        # Empty variable and function context before running the program
+        self.functions.clear()
+        frame = [_UNDEFINED] * self.scope.size
+
+        result = self.body(frame)
+
+        self.variables = {identifier: frame[slot] for identifier, slot in self.scope.slots.items() if frame[slot] is not _UNDEFINED}
+        return result
+
+
+class ClosureCompiler:
+    """Lowers a checked program tree into nested Python closures.
+
+    Every node is compiled once into a function taking the frame of the enclosing function body. Variables are resolved
+    to slots of that frame at compile time and operators to their implementation, so running the program does not
+    dispatch on tree nodes or copy the variable context on function calls. The semantics and error messages are the
+    ones of SimpleInterpreter.
+    """
+    def __init__(self, external_functions=None):
+        self.external_functions = external_functions
+
+    def compile(self, tree):
+        functions = dict()
+        scope = Scope()
+        body = self.__compile_block(tree.children, scope, functions)
+
+        return CompiledProgram(body, scope, functions)
+
+    def __compile(self, tree, scope, functions):
+        compile_node = getattr(self, f"_compile_{tree.data}", None)
+        if compile_node is None:
+            raise RuntimeError(f"Cannot compile node '{tree.data}'")
+
+        return compile_node(tree, scope, functions)
+
+    def __compile_block(self, statements, scope, functions):
+        statements = tuple(self.__compile(statement, scope, functions) for statement in statements)
+
+        if len(statements) == 1:
+            return statements[0]
+
+        def block(frame):
+            result = None
+            for statement in statements:
+                result = statement(frame)
+            return result
+
+        return block
+
+    def _compile_block(self, tree, scope, functions):
+        return self.__compile_block(tree.children, scope, functions)
+
+    def _compile_num(self, tree, scope, functions):
+        value = int(tree.children[0])
+        return lambda frame: value
+
+    def _compile_true(self, tree, scope, functions):
+        return lambda frame: True
+
+    def _compile_false(self, tree, scope, functions):
+        return lambda frame: False
+
+    def _compile_custom_expr(self, tree, scope, functions):
+        value = tree.children[0].value.strip("\"'")
+        return lambda frame: value
+
+    def _compile_layer(self, tree, scope, functions):
+        return lambda frame: None
+
+    def _compile_ident(self, tree, scope, functions):
+        identifier = tree.children[0].value
+        slot = scope.slot(identifier)
+
+        def ident(frame):
+            value = frame[slot]
+            if value is _UNDEFINED:
+                raise RuntimeError(f"Identifier '{identifier}' not defined")
+            return value
+
+        return ident
+
+    def _compile_assign(self, tree, scope, functions):
+        slot = scope.slot(tree.children[0].children[0].value)
+        value = self.__compile(tree.children[1], scope, functions)
+
+        def assign(frame):
+            frame[slot] = value(frame)
+
+        return assign
+
+    def _compile_if_stmt(self, tree, scope, functions):
+        condition = self.__compile(tree.children[0], scope, functions)
+        then_block = self.__compile(tree.children[1], scope, functions)
+
+        if len(tree.children) > 2:
+            else_block = self.__compile(tree.children[2], scope, functions)
+        else:
+            else_block = lambda frame: None
+
+        def if_stmt(frame):
+            if condition(frame):
+                return then_block(frame)
+            return else_block(frame)
+
+        return if_stmt
+
+    def _compile_let_stmt(self, tree, scope, functions):
+        slot = scope.slot(tree.children[0].children[0].value)
+        value = self.__compile(tree.children[1], scope, functions)
+        body = self.__compile(tree.children[2], scope, functions)
+
+        def let_stmt(frame):
+            # Restore the current value of ident (or leave it undefined) after the let construct
+            old_value = frame[slot]
+            frame[slot] = value(frame)
+            result = body(frame)
+            frame[slot] = old_value
+            return result
+
+        return let_stmt
+
+    def _compile_bin_op(self, tree, scope, functions):
+        lhs = self.__compile(tree.children[0], scope, functions)
+        rhs = self.__compile(tree.children[2], scope, functions)
+        op = tree.children[1].value
+
+        if not op in BINARY_OPERATORS:
+            def unknown_op(frame):
+                lhs(frame)
+                rhs(frame)
+                raise RuntimeError(f"Unknown operator '{op}'")
+            return unknown_op
+
+        apply = BINARY_OPERATORS[op]
+        return lambda frame: apply(lhs(frame), rhs(frame))
+
+    def _compile_fun_call(self, tree, scope, functions):
+        fun_id = tree.children[0].value
+        args = tuple(self.__compile(child, scope, functions) for child in tree.children[1:])
+        external_functions = self.external_functions
+
+        def fun_call(frame):
+            fun_args = [arg(frame) for arg in args]
+
+            fun_def = functions.get(fun_id)
+            if fun_def is None:
+                if getattr(external_functions, fun_id, None):
+                    try:
+                        return getattr(external_functions, fun_id)(*fun_args)
+                    except Exception:
+                        raise RuntimeError(f"Error calling external function '{fun_id}'")
+                raise RuntimeError(f"Function '{fun_id}' not defined")
+
+            return fun_def(fun_args)
+
+        return fun_call
+
+    def _compile_fun_def(self, tree, scope, functions):
+        fun_id = tree.children[0].value
+        arg_identifiers = [child.value for child in tree.children[1:-1]]
+
+        # The body only sees the arguments of the function, so it gets a scope (and frame) of its own
+        fun_scope = Scope()
+        arg_slots = [fun_scope.slot(arg) for arg in arg_identifiers]
+        body = self.__compile(tree.children[-1], fun_scope, functions)
+        defines_functions = any(node.data == "fun_def" for node in tree.children[-1].iter_subtrees())
+
+        fun_def = CompiledFunction(fun_id, arg_identifiers, arg_slots, body, fun_scope, defines_functions, functions)
+
+        def define(frame):
+            if fun_id in functions:
+                raise RuntimeError(f"Function '{fun_id}' already defined")
+            functions[fun_id] = fun_def
+
+        return define
@@ -1,39 +1,60 @@
 import graphlib
 import os.path
+import sys
 from enum import Enum
 from warnings import warn
 
 import lark
 from pathlib import Path
-from termcolor import colored
+
+from aeon.verification.cache import ValidityCache, use_validity_cache
 
 from compiler.Exceptions import LayerException
-from compiler.transformers.RemoveTokens import RemoveTokens
+from compiler.transformers.BuildTree import BuildTree
 from layers.Layer import Layer
 from layers.LayerImplWrapper import LayerImplWrapper
 
 from compiler.transformers.CollectLayers import CollectLayers
 from compiler.interpreters.CheckCF import CheckCF
-from compiler.transformers.CreateAnnotatedTree import CreateAnnotatedTree as AnnotateTree
+from compiler.transformers.CreateAnnotatedTree import CreateAnnotatedTree as AnnotateTree, AnnotatedTree, \
+    annotation_snapshot, annotation_changes, apply_annotation_changes
 from compiler.Interpreters import SimpleInterpreter
+from compiler.ClosureCompiler import ClosureCompiler
+from compiler.TypecheckCache import TypecheckCache, CachedLayerResult, FunctionSummaries
 
 
 class LayerVerificationState(Enum):
     UNPROCESSED = 0 # Layer has not been processed yet
-    VERIFYING = 1   # Unused at the moment. Used for parallel verification
+    VERIFYING = 1   # Layer is being verified by a worker process
     SUCCESS = 2     # Layer has been successfully verified
     FAILURE = 3     # Layer has failed verification
     BLOCKED = 4     # Layer has been blocked by a layer that failed verification
     CYCLE = 5       # Layer is part of a cycle
     CYCLE_BLOCKED = 6   # Layer is blocked by a layer that is part of a cycle
 
+def _warn_implicit_layer(layer_id):
+    warn(f"Layer {layer_id} was not loaded during CollectLayers, but is required by at least one other layer. Loading it now.")
+
+def _verify_layer(layer_base_dir, layer, tree):
+    """Typechecks a single layer in a worker process and returns the annotations it added to the tree."""
+    layer_handle = LayerImplWrapper(layer_base_dir, layer)
+    snapshot = annotation_snapshot(tree)
+    layer_handle.typecheck(tree)
+    return annotation_changes(tree, snapshot)
+
 class LayeredCompiler:
-    def __init__(self, layer_base_dir, implementations_file=None):
+    def __init__(self, layer_base_dir, implementations_file=None, entailment_cache_size=4096, entailment_cache_path=None, jobs=1, typecheck_cache_dir=None, horn_backend="fixpoint", vc_jobs=0, fun_def_jobs=0):
 
         self.layer_states = dict()
         self.layer_errors = dict()
         self.layer_base_dir = Path(layer_base_dir)
         self.cycle = set()
+        # The last parsed tree and the layers collected while parsing it
+        self.parsed_tree = None
+        self.parsed_layers = dict()
+        self.parsed_source = None
+        # Number of worker processes used to verify independent layers in parallel
+        self.jobs = jobs
 
         if implementations_file is None:
             self.implementations_file = None
@@ -47,13 +68,58 @@ class LayeredCompiler:
 
         # Build path for grammar file
         grammar_file = os.path.dirname(os.path.realpath(__file__)) + "/grammar_file.lark"
-        self.parser = lark.Lark.open(grammar_file
-                                     , parser= "lalr"
-                                     , debug=True
-                                     , propagate_positions=True
-                                     , transformer=RemoveTokens(["newline"]))
+        self.grammar_file = grammar_file
+        # The tree is built and its layers are collected in a single pass while parsing
+        self.tree_builder = BuildTree()
+        # Built on the first parse
+        self.__parser = None
         self.layers = dict()
+        # Layer graphs built for each set of layers used by a program, with the modules they were built from
+        self.layer_graphs = dict()
         self.interpreter = SimpleInterpreter(self.implementations_file)
+        self.closure_compiler = ClosureCompiler(self.interpreter.external_functions)
+
+        # Validity results of entailment checks, shared by all layers and typechecks of this compiler
+        self.entailment_cache = ValidityCache(entailment_cache_size, entailment_cache_path)
+        # Backend solving the Horn constraints of entailment checks ("fixpoint" or "spacer")
+        self.horn_backend = horn_backend
+        # Processes discharging the verification conditions of each liquid layer, 0 to check them as they are generated
+        self.vc_jobs = vc_jobs
+        # Processes checking the function bodies of each liquid layer, in parallel with the rest of the program
+        self.fun_def_jobs = fun_def_jobs
+
+        # Verification results of layers, persisted across runs
+        self.typecheck_cache = TypecheckCache(typecheck_cache_dir) if typecheck_cache_dir is not None else None
+        # Cache keys of the layers of the current typecheck
+        self.layer_keys = dict()
+        self.program_key = None
+        # Verification results of single functions, for the layers that are not restored as a whole
+        self.function_summaries = None
+
+    @property
+    def parser(self):
+        if self.__parser is None:
+            # Lark keeps the analysed grammar in its cache directory, so that other processes load it instead of
+            # building the LALR tables again
+            self.__parser = lark.Lark.open(self.grammar_file
+                                           , parser= "lalr"
+                                           , debug=True
+                                           , propagate_positions=True
+                                           , transformer=self.tree_builder
+                                           , cache=True)
+        return self.__parser
+
+    @property
+    def entailment_cache_stats(self):
+        return self.entailment_cache.stats
+
+    @property
+    def typecheck_cache_stats(self):
+        return self.typecheck_cache.stats if self.typecheck_cache is not None else None
+
+    @property
+    def function_summary_stats(self):
+        return self.function_summaries.stats if self.function_summaries is not None else None
 
     def typecheck(self, input_file, check_cf=True, verbose=False, raise_on_error=True):
         tree = self.parse(input_file)
@@ -66,7 +132,9 @@ class LayeredCompiler:
         return True
 
     def __typecheck(self, tree, check_cf=True, raise_on_error=True):
-        tree = AnnotateTree().transform(tree)
+        if not isinstance(tree, AnnotatedTree):
+            tree = AnnotateTree().transform(tree)
+        use_validity_cache(self.entailment_cache)
 
         if check_cf:
             cf_check = CheckCF(self.interpreter.external_functions_names)
@@ -74,13 +142,30 @@ class LayeredCompiler:
 
         layer_graph = self.build_layer_graph(tree)
 
+        # Options changing the outcome of verification (e.g. the Horn backend) are part of the cache keys
+        options = (self.horn_backend, "two-phase" if self.vc_jobs else "eager",
+                   "parallel-bodies" if self.fun_def_jobs > 1 else "sequential-bodies")
+
+        # Layers that are verified again can still reuse the results of the functions that did not change
+        if self.typecheck_cache is not None:
+            layer_versions = {layer_id: self.typecheck_cache.layer_version(self.layers[layer_id]) for layer_id in self.layers}
+            self.function_summaries = FunctionSummaries(self.typecheck_cache, layer_versions, options)
+        self.__configure_loaded_checkers()
+
+        # Results can only be looked up for trees parsed from a source we know
+        self.layer_keys = dict()
+        self.program_key = None
+        if self.typecheck_cache is not None and tree is self.parsed_tree:
+            self.program_key = self.typecheck_cache.program_key(self.parsed_source, self.grammar_file, *options)
+        self.layer_graph = layer_graph
+
         self.layer_states = {layer_id: LayerVerificationState.UNPROCESSED for layer_id in layer_graph}
         # Store the processing states for all layers
         for layer_id in layer_graph:
             self.layer_states.update({layer_id: LayerVerificationState.UNPROCESSED for layer_id in layer_graph[layer_id]})
 
         # We use graphlib to process layers in topological order
-        # Currently this is not yet parallelized, but in the future we might want to do that
+        # With more than one job, independent layers are verified in parallel
 
         topological_sorter = graphlib.TopologicalSorter(layer_graph)
 
@@ -95,17 +180,67 @@ class LayeredCompiler:
             for layer_id in e.args[1]:
                 self.layer_states[layer_id] = LayerVerificationState.CYCLE
 
+        if self.jobs > 1:
+            self.__verify_parallel(topological_sorter, tree, raise_on_error)
+        else:
+            self.__verify_sequential(topological_sorter, tree, raise_on_error)
+
+        # There might be unparsed layers, which are blocked due to failed dependencies
+        for layer_id in self.layer_states:
+            if self.layer_states[layer_id] == LayerVerificationState.FAILURE:
+                # We mark the node as done, so we can mark all nodes that depend on it as blocked
+                topological_sorter.done(layer_id)
+                while topological_sorter.is_active():
+                    processed_one = False
+                    for node in topological_sorter.get_ready():
+                        processed_one = True
+                        self.layer_states[node] = LayerVerificationState.BLOCKED
+                        topological_sorter.done(node)
+
+                    if not processed_one:
+                        break
+
+        # All layers that are still unprocessed are blocked because they depend on a layer that is part of a cycle
+        for layer_id in self.layer_states:
+            if self.layer_states[layer_id] == LayerVerificationState.UNPROCESSED:
+                self.layer_states[layer_id] = LayerVerificationState.CYCLE_BLOCKED
+
+        # Return true iff all layers are successfully verified
+        return all([self.layer_states[layer_id] == LayerVerificationState.SUCCESS for layer_id in self.layer_states])
+
+    def __configure_loaded_checkers(self):
+        """Passes the solver and liquid checking options on to the modules the layers of the program imported.
+
+        The Horn solver (and z3 with it) and the liquid typechecker are only loaded by the layers using them, so
+        that programs without such layers start up without them.
+        """
+        horn = sys.modules.get("aeon.verification.horn")
+        if horn is not None:
+            horn.use_horn_backend(self.horn_backend)
+
+        liquid = sys.modules.get("compiler.interpreters.LiquidTypeChecker")
+        if liquid is not None:
+            liquid.use_vc_jobs(self.vc_jobs)
+            liquid.use_fun_def_jobs(self.fun_def_jobs)
+            liquid.use_function_summaries(self.function_summaries)
+
+    def __verify_sequential(self, topological_sorter, tree, raise_on_error):
         while topological_sorter.is_active():
             processed_one = False
             for node in topological_sorter.get_ready():
                 processed_one = True
                 assert self.layer_states[node] == LayerVerificationState.UNPROCESSED
+                if self.__restore_layer(node, tree, topological_sorter, raise_on_error):
+                    continue
                 layer_handle = self.layers[node]
+                snapshot = annotation_snapshot(tree) if self.program_key is not None else None
                 try:
                     tree = layer_handle.typecheck(tree)
                     topological_sorter.done(node)
                     self.layer_states[node] = LayerVerificationState.SUCCESS
+                    self.__store_layer(node, None, tree, snapshot)
                 except Exception as e:
+                    self.__store_layer(node, e, tree, snapshot)
                     if raise_on_error:
                         raise LayerException(node,e)
                     self.layer_states[node] = LayerVerificationState.FAILURE
@@ -117,52 +252,121 @@ class LayeredCompiler:
             if not processed_one:
                 break
 
-        # There might be unparsed layers, which are blocked due to failed dependencies
-        for layer_id in self.layer_states:
-            if self.layer_states[layer_id] == LayerVerificationState.FAILURE:
-                # We mark the node as done, so we can mark all nodes that depend on it as blocked
-                topological_sorter.done(layer_id)
+    def __verify_parallel(self, topological_sorter, tree, raise_on_error):
+        # Every layer that is ready is sent to the pool together with a copy of the tree.
+        # The workers send back the annotations their layer added, which are merged into the tree
+        # before the layers depending on it are dispatched.
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        running = {}
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            try:
                 while topological_sorter.is_active():
-                    processed_one = False
+                    restored = False
                     for node in topological_sorter.get_ready():
-                        processed_one = True
-                        self.layer_states[node] = LayerVerificationState.BLOCKED
-                        topological_sorter.done(node)
-
-                    if not processed_one:
+                        assert self.layer_states[node] == LayerVerificationState.UNPROCESSED
+                        if self.__restore_layer(node, tree, topological_sorter, raise_on_error):
+                            restored = True
+                            continue
+                        self.layer_states[node] = LayerVerificationState.VERIFYING
+                        future = executor.submit(_verify_layer, self.layer_base_dir, self.layers[node].layer, tree)
+                        running[future] = node
+
+                    # Nodes depending on a failed node never become ready, so we stop once nothing is running
+                    # Layers restored from the cache may have made other layers ready though
+                    if not running:
+                        if restored:
+                            continue
                         break
 
-        # All layers that are still unprocessed are blocked because they depend on a layer that is part of a cycle
-        for layer_id in self.layer_states:
-            if self.layer_states[layer_id] == LayerVerificationState.UNPROCESSED:
-                self.layer_states[layer_id] = LayerVerificationState.CYCLE_BLOCKED
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        node = running.pop(future)
+                        try:
+                            changes = future.result()
+                            apply_annotation_changes(tree, changes)
+                            topological_sorter.done(node)
+                            self.layer_states[node] = LayerVerificationState.SUCCESS
+                            self.__store_result(node, CachedLayerResult(LayerVerificationState.SUCCESS, None, changes))
+                        except Exception as e:
+                            self.__store_result(node, CachedLayerResult(LayerVerificationState.FAILURE, e, []))
+                            if raise_on_error:
+                                raise LayerException(node,e)
+                            self.layer_states[node] = LayerVerificationState.FAILURE
+                            self.layer_errors[node] = LayerException(node,e)
+            except BaseException:
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+
+    def __layer_key(self, layer_id):
+        # The key of a layer depends on the keys of the layers that run before it
+        if not layer_id in self.layer_keys:
+            dependency_keys = {dependency: self.__layer_key(dependency) for dependency in self.layer_graph[layer_id]}
+            self.layer_keys[layer_id] = self.typecheck_cache.layer_key(self.program_key, self.layers[layer_id], dependency_keys)
+        return self.layer_keys[layer_id]
+
+    def __restore_layer(self, layer_id, tree, topological_sorter, raise_on_error):
+        """Restores the verification result of a layer from the typecheck cache, returns whether there was one."""
+        if self.program_key is None:
+            return False
+
+        result = self.typecheck_cache.lookup(self.__layer_key(layer_id))
+        if result is None:
+            return False
+
+        apply_annotation_changes(tree, result.changes)
+        if result.state == LayerVerificationState.SUCCESS:
+            topological_sorter.done(layer_id)
+            self.layer_states[layer_id] = LayerVerificationState.SUCCESS
+        else:
+            if raise_on_error:
+                raise LayerException(layer_id, result.error)
+            self.layer_states[layer_id] = LayerVerificationState.FAILURE
+            self.layer_errors[layer_id] = LayerException(layer_id, result.error)
+        return True
 
-        # Return true iff all layers are successfully verified
-        return all([self.layer_states[layer_id] == LayerVerificationState.SUCCESS for layer_id in self.layer_states])
+    def __store_layer(self, layer_id, error, tree, snapshot):
+        if self.program_key is None:
+            return
+
+        state = LayerVerificationState.SUCCESS if error is None else LayerVerificationState.FAILURE
+        self.__store_result(layer_id, CachedLayerResult(state, error, annotation_changes(tree, snapshot)))
+
+    def __store_result(self, layer_id, result):
+        if self.program_key is not None:
+            self.typecheck_cache.store(self.__layer_key(layer_id), result)
 
     def build_layer_graph(self, tree):
-        lv = CollectLayers()
-        lv.transform(tree)
+        if tree is self.parsed_tree:
+            collected_layers = self.parsed_layers
+        else:
+            lv = CollectLayers()
+            lv.transform(tree)
+            collected_layers = lv.layers
+
+        layer_graph = self.__cached_layer_graph(collected_layers)
+        if layer_graph is not None:
+            return layer_graph
 
         layer_graph = {}
         self.layers = {}
         implicit_layers = set()
 
-        for layer_id in lv.layers:
-            self.layers[layer_id] = LayerImplWrapper(self.layer_base_dir, lv.layers[layer_id])
+        for layer_id in collected_layers:
+            self.layers[layer_id] = LayerImplWrapper(self.layer_base_dir, collected_layers[layer_id])
 
             required_layers = self.layers[layer_id].depends_on()
             layer_graph[layer_id] = required_layers
-            implicit_layers.update(required_layers - set(lv.layers.keys()))
+            implicit_layers.update(required_layers - set(collected_layers.keys()))
 
             required_layers = self.layers[layer_id].run_before()
             for layer in required_layers:
                 layer_graph[layer].add(layer_id)
 
-            implicit_layers.update(required_layers - set(lv.layers.keys()))
+            implicit_layers.update(required_layers - set(collected_layers.keys()))
 
             implied_layers = self.layers[layer_id].run_before()
-            implicit_layers.update(implied_layers - set(lv.layers.keys()))
+            implicit_layers.update(implied_layers - set(collected_layers.keys()))
             for implied_layer in implied_layers:
                 if implied_layer not in layer_graph:
                     layer_graph[implied_layer] = set()
@@ -171,8 +375,7 @@ class LayeredCompiler:
         while len(implicit_layers) > 0:
             layer_id = implicit_layers.pop()
             if not layer_id in self.layers:
-                warn(
-                    f"Layer {layer_id} was not loaded during CollectLayers, but is required by at least one other layer. Loading it now.")
+                _warn_implicit_layer(layer_id)
                 self.layers[layer_id] = LayerImplWrapper(self.layer_base_dir, Layer(layer_id))
                 required_layers = self.layers[layer_id].depends_on()
                 layer_graph[layer_id] = required_layers
@@ -181,9 +384,32 @@ class LayeredCompiler:
                 required_layers = self.layers[layer_id].run_before()
                 for layer in required_layers:
                     layer_graph[layer].add(layer_id)
-                implicit_layers.update(required_layers - set(lv.layers.keys()))
+                implicit_layers.update(required_layers - set(collected_layers.keys()))
+
+        modules = {layer_id: self.layers[layer_id].module for layer_id in self.layers}
+        self.layer_graphs[frozenset(collected_layers)] = ({layer_id: set(layer_graph[layer_id]) for layer_id in layer_graph}, modules)
         return layer_graph
 
+    def __cached_layer_graph(self, collected_layers):
+        """Returns the layer graph built last time for the same layers, if none of their modules changed since."""
+        cached = self.layer_graphs.get(frozenset(collected_layers))
+        if cached is None:
+            return None
+
+        layer_graph, modules = cached
+        layers = {}
+        for layer_id in modules:
+            layers[layer_id] = LayerImplWrapper(self.layer_base_dir, collected_layers.get(layer_id) or Layer(layer_id))
+            if layers[layer_id].module is not modules[layer_id]:
+                # Its dependencies may have changed
+                return None
+
+        for layer_id in modules:
+            if layer_id not in collected_layers:
+                _warn_implicit_layer(layer_id)
+        self.layers = layers
+        return {layer_id: set(layer_graph[layer_id]) for layer_id in layer_graph}
+
     def parse(self, input_file):
         # Reset layer errors and states since these belong to the last typecheck
         self.layer_errors = dict()
@@ -191,10 +417,14 @@ class LayeredCompiler:
         self.cycle = set()
 
         with open(os.path.abspath(input_file)) as f:
-            tree = self.parser.parse(f.read())
+            source = f.read()
+
+        self.tree_builder.reset()
+        tree = self.parser.parse(source)
 
-        Remover = RemoveTokens(["newline"])
-        tree = Remover.transform(tree)
+        self.parsed_source = source
+        self.parsed_tree = tree
+        self.parsed_layers = self.tree_builder.layers
 
         return tree
 
@@ -206,12 +436,18 @@ class LayeredCompiler:
             exit(1)
 
         return tree
-    def run(self, program):
+    def run(self, program, compiled=False):
         tree = self.compile(program)
 
+        # Compiled programs run as Python closures instead of walking the tree
+        if compiled:
+            return self.closure_compiler.compile(tree)()
+
         return self.interpreter.run(tree)
 
     def print_layer_states(self):
+        from termcolor import colored
+
         print("The following layers were processed:")
         for layer_id in self.layer_states:
             state = self.layer_states[layer_id]
@@ -0,0 +1,101 @@
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+import traceback
+
+# Requests and responses are JSON objects, one per line:
+#   {"command": "typecheck" | "run" | "stop", "file": ..., "layers": ..., "impls": ..., "options": {...}, "compiled": ...}
+#   {"status": exit code, "output": stdout, "errors": stderr, "result": str of the program result or null}
+# Paths are absolute, options are the keyword arguments of LayeredCompiler
+
+
+def send_request(socket_path, request):
+    """Sends a request to the compiler server listening at socket_path and returns its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        with connection.makefile("rwb") as stream:
+            stream.write(json.dumps(request).encode() + b"\n")
+            stream.flush()
+            return json.loads(stream.readline())
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        response = self.server.handle_request(request)
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class CompilerServer(socketserver.UnixStreamServer):
+    """Typechecks and runs programs sent over a Unix socket, keeping its compilers warm between requests.
+
+    A compiler is created for each combination of layers, implementations and options it is asked for, and kept
+    with its parser, layers, solvers and caches for the next requests. Requests are handled one at a time, since
+    compilers (and the working directory programs run in) are not shared safely between threads.
+    """
+
+    def __init__(self, socket_path):
+        # The compiler (and z3, igraph and lark with it) is loaded by the server only, clients stay light
+        from compiler.Compiler import LayeredCompiler
+        self.compiler_class = LayeredCompiler
+        self.socket_path = socket_path
+        self.compilers = dict()
+        # A socket left behind by a server that did not stop cleanly would make binding fail
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super(CompilerServer, self).__init__(socket_path, _RequestHandler)
+
+    def server_close(self):
+        super(CompilerServer, self).server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def compiler_for(self, request):
+        options = request.get("options", {})
+        key = (request["layers"], request.get("impls"), json.dumps(options, sort_keys=True))
+        if key not in self.compilers:
+            self.compilers[key] = self.compiler_class(request["layers"], request.get("impls"), **options)
+        return self.compilers[key]
+
+    def handle_request(self, request):
+        command = request["command"]
+        if command == "stop":
+            # shutdown waits for serve_forever to return, so it cannot be called from the thread serving requests
+            threading.Thread(target=self.shutdown).start()
+            return {"status": 0, "output": "", "errors": "", "result": None}
+
+        output = io.StringIO()
+        errors = io.StringIO()
+        result = None
+        status = 0
+        cwd = os.getcwd()
+        try:
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+                compiler = self.compiler_for(request)
+                # Programs run from their own directory, as with main.py
+                os.chdir(os.path.dirname(request["file"]))
+                if command == "typecheck":
+                    compiler.typecheck(request["file"], verbose=True, raise_on_error=False)
+                elif command == "run":
+                    result = str(compiler.run(request["file"], compiled=request.get("compiled", False)))
+                else:
+                    raise ValueError(f"Unknown command '{command}'")
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            errors.write(traceback.format_exc())
+            status = 1
+        finally:
+            os.chdir(cwd)
+
+        return {"status": status, "output": output.getvalue(), "errors": errors.getvalue(), "result": result}
+
+
+def serve(socket_path):
+    """Serves requests at socket_path until a stop request arrives."""
+    with CompilerServer(socket_path) as server:
+        server.serve_forever()
@@ -22,6 +22,19 @@ class TypecheckException(SyntaxError):
         self.lineno = line
         self.offset = column
 
+    def __reduce__(self):
+        # Subclasses take different constructor arguments, so they are rebuilt from their state instead.
+        # This allows typecheck errors to be sent back from layers verified in another process.
+        return _restore_typecheck_exception, (self.__class__, self.args, self.lineno, self.offset, self.__dict__)
+
+def _restore_typecheck_exception(cls, args, line, column, state):
+    exception = cls.__new__(cls)
+    SyntaxError.__init__(exception, *args)
+    exception.lineno = line
+    exception.offset = column
+    exception.__dict__.update(state)
+    return exception
+
 class WrongArgumentCountException(TypecheckException):
     """Exception that will be raised when a function is called with the wrong number of arguments.
     """
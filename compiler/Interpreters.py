@@ -1,4 +1,5 @@
 import importlib
+import inspect
 from collections import namedtuple
 import lark
 from pathlib import Path
@@ -7,10 +8,26 @@ import sys
 FunctionDefinition = namedtuple("FunctionDefinition", ["name", "args", "body"])
 
 class SimpleInterpreter(lark.visitors.Interpreter):
+    """Tree-walking interpreter for programs.
+
+    Nodes are evaluated with an explicit stack instead of recursive calls of visit: the methods for nodes with
+    subexpressions are generators that yield the subtrees they need and receive their values. The depth of the
+    programs that can be run is therefore not bound by Python's recursion limit.
+
+    Every function call gets a frame of its own holding only its arguments. The frame of the caller is kept on a
+    stack and reinstated when the call returns, so the cost of setting up a call does not depend on the size of
+    the variable or function context.
+    """
     def __init__(self, implementation_file = None):
         # Variables and functions are stored in dictionaries for access by our interpreter
+        # The variables are the ones of the current frame, the frames of the callers are kept in a stack
         self.variables = dict()
         self.functions = dict()
+        self.frames = []
+        # Functions defined in the current frame, they are removed when the frame is left
+        self.defined_functions = []
+        # The method evaluating each kind of node, and whether it is a generator waiting for the values of subtrees
+        self.node_visitors = dict()
 
         # Load external functions from implementation file
         if implementation_file:
@@ -26,6 +43,7 @@ class SimpleInterpreter(lark.visitors.Interpreter):
 
             self.external_functions_names = [name for name in dir(self.external_functions) if callable(getattr(self.external_functions, name))]
         else:
+            self.external_functions = None
             self.external_functions_names = []
 
         super().__init__()
@@ -34,9 +52,64 @@ class SimpleInterpreter(lark.visitors.Interpreter):
         # Empty variable and function context before running a new program
         self.variables = dict()
         self.functions = dict()
+        self.frames = []
+        self.defined_functions = []
 
         # Return the value of the last expression in the program
         return self.visit(tree)[-1]
+
+    def _visit_tree(self, tree):
+        return self.__node_visitor(tree.data)[0](tree)
+
+    def __node_visitor(self, data):
+        # The method evaluating each kind of node is looked up once
+        node_visitor = self.node_visitors.get(data)
+        if node_visitor is None:
+            f = getattr(self, data)
+            # Whether the node waits for subtrees depends on its method, not on its value, which can be any object
+            # (e.g. a generator returned by an external function)
+            suspends = inspect.isgeneratorfunction(getattr(f, 'base_func', f))
+            if getattr(f, 'visit_wrapper', None) is not None:
+                node_visitor = (lambda tree: f.visit_wrapper(f, tree.data, tree.children, tree.meta), suspends)
+            else:
+                node_visitor = (f, suspends)
+            self.node_visitors[data] = node_visitor
+        return node_visitor
+
+    def visit(self, tree):
+        # Evaluations waiting for the value of a subtree
+        suspended = []
+        visit_node, suspends = self.__node_visitor(tree.data)
+        result = visit_node(tree)
+
+        while True:
+            if suspends:
+                # Start evaluating the node
+                suspended.append(result)
+                value = None
+            elif suspended:
+                value = result
+            else:
+                return result
+
+            try:
+                subtree = suspended[-1].send(value)
+            except StopIteration as stop:
+                suspended.pop()
+                result = stop.value
+                suspends = False
+                continue
+
+            visit_node, suspends = self.__node_visitor(subtree.data)
+            result = visit_node(subtree)
+
+    def __default__(self, tree):
+        result = []
+        for child in tree.children:
+            result.append((yield child) if isinstance(child, lark.Tree) else child)
+
+        return result
+
     def num(self, tree):
         return int(tree.children[0])
 
@@ -48,23 +121,23 @@ class SimpleInterpreter(lark.visitors.Interpreter):
 
     def assign(self, tree):
         identifier = tree.children[0].children[0].value
-        value = self.visit(tree.children[1])
+        value = yield tree.children[1]
 
         self.variables[identifier] = value
     def if_stmt(self, tree):
 
-        condition = self.visit(tree.children[0])
+        condition = yield tree.children[0]
 
         if condition:
-            return self.visit(tree.children[1])
+            return (yield tree.children[1])
 
         if len(tree.children) > 2:
-            return self.visit(tree.children[2])
+            return (yield tree.children[2])
 
     def let_stmt(self, tree):
 
         identifier = tree.children[0].children[0].value
-        value = self.visit(tree.children[1])
+        value = yield tree.children[1]
 
         # Store the current value of ident and restore it after the let construct
         restore_val = False
@@ -75,7 +148,7 @@ class SimpleInterpreter(lark.visitors.Interpreter):
 
         self.variables[identifier] = value
 
-        result = self.visit(tree.children[2])
+        result = yield tree.children[2]
 
         self.variables.pop(identifier)
 
@@ -85,8 +158,8 @@ class SimpleInterpreter(lark.visitors.Interpreter):
         return result
 
     def bin_op(self, tree):
-        lhs = self.visit(tree.children[0])
-        rhs = self.visit(tree.children[2])
+        lhs = yield tree.children[0]
+        rhs = yield tree.children[2]
 
         op = tree.children[1].value
 
@@ -123,7 +196,9 @@ class SimpleInterpreter(lark.visitors.Interpreter):
     def fun_call(self, tree):
         fun_id = tree.children[0].value
 
-        fun_args = [self.visit(child) for child in tree.children[1:]]
+        fun_args = []
+        for child in tree.children[1:]:
+            fun_args.append((yield child))
 
         if not fun_id in self.functions.keys():
             if getattr(self.external_functions, fun_id, None):
@@ -134,26 +209,19 @@ class SimpleInterpreter(lark.visitors.Interpreter):
             raise RuntimeError(f"Function '{fun_id}' not defined")
 
         fun_def = self.functions[fun_id]
-        arg_identifiers = fun_def.args
-
 
-        old_variables = self.variables.copy()
+        # The function body only sees its arguments, the frame of the caller is reinstated after the call
+        self.frames.append((self.variables, self.defined_functions))
+        self.variables = dict(zip(fun_def.args, fun_args))
         # It might happen that a function definition is nested in another function definition
         # In this case, we need to make sure that after the function call, this function definition is not accessible anymore
-        old_functions = self.functions.copy()
-
-        self.variables.clear()
-
-        for arg_ident,fun_arg in zip(arg_identifiers, fun_args):
-            self.variables[arg_ident] = fun_arg
-
-        # Add the function argument to the variable context
+        self.defined_functions = []
 
-        result = self.visit(fun_def.body)
+        result = yield fun_def.body
 
-        # Restore old variable context
-        self.variables = old_variables.copy()
-        self.functions = old_functions.copy()
+        for nested_fun_id in self.defined_functions:
+            self.functions.pop(nested_fun_id)
+        (self.variables, self.defined_functions) = self.frames.pop()
 
         return result
     def fun_def(self, tree):
@@ -167,11 +235,12 @@ class SimpleInterpreter(lark.visitors.Interpreter):
             raise RuntimeError(f"Function '{fun_id}' already defined")
 
         self.functions[fun_id] = FunctionDefinition(fun_id, arg_identifiers, fun_body)
+        self.defined_functions.append(fun_id)
 
     def block(self, tree):
         result = None
         for child in tree.children:
-            result = self.visit(child)
+            result = yield child
 
         return result
     def ident(self, tree):
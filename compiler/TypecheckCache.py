@@ -0,0 +1,217 @@
+import hashlib
+import os
+import pickle
+import sys
+import sysconfig
+import tempfile
+import time
+from collections import namedtuple
+from pathlib import Path
+from types import ModuleType
+
+import lark
+
+from layers.LayerImplWrapper import RACY_WINDOW_NS
+
+# Bump when the layout of the cached entries changes
+CACHE_VERSION = 1
+
+# The result of verifying a layer: its LayerVerificationState, the exception it raised and the annotations it added
+CachedLayerResult = namedtuple("CachedLayerResult", ["state", "error", "changes"])
+
+_INSTALLED_PATHS = tuple({Path(sysconfig.get_paths()[name]) for name in ("stdlib", "platstdlib", "purelib", "platlib")})
+
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def _is_installed(path):
+    return any(path.is_relative_to(installed) for installed in _INSTALLED_PATHS)
+
+
+def subtree_digest(tree):
+    """Hashes the shape and the tokens of a subtree, leaving out their positions and the annotations of the nodes."""
+    parts = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, lark.Tree):
+            parts.append(f"{node.data}/{len(node.children)}")
+            stack.extend(reversed(node.children))
+        elif isinstance(node, lark.Token):
+            parts.append(f"{node.type}:{node}")
+        else:
+            parts.append(repr(node))
+    return _digest(*parts)
+
+
+def _referenced_modules(module):
+    for value in vars(module).values():
+        if isinstance(value, ModuleType):
+            yield value
+        else:
+            referenced = sys.modules.get(getattr(value, "__module__", None) or "")
+            if referenced is not None:
+                yield referenced
+
+
+def layer_source_files(layer_handle):
+    """Returns the implementation file of a layer and the files of the project modules it refers to, transitively.
+
+    Modules of the standard library and of installed packages are left out, they do not change between runs.
+    """
+    files = set()
+    seen = {id(layer_handle.module)}
+    pending = [layer_handle.module]
+    while pending:
+        module = pending.pop()
+        files.add(Path(module.__file__).resolve())
+        for referenced in _referenced_modules(module):
+            path = getattr(referenced, "__file__", None)
+            if id(referenced) in seen or path is None or _is_installed(Path(path).resolve()):
+                continue
+            seen.add(id(referenced))
+            pending.append(referenced)
+    return sorted(files)
+
+
+class TypecheckCache:
+    """Content addressed store of layer verification results.
+
+    The key of a layer combines the hashes of the program source, the grammar, the files implementing the layer and
+    the keys of the layers it depends on in the layer graph. Editing a layer (or adding a dependency to it) thus
+    invalidates the results of all the layers that run after it, while the other layers can still be restored.
+    Entries are pickled to one file per key in the cache directory.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        # Digest of each file, with the state of the file (modification time and size) and the time it was hashed
+        self.file_digests = dict()
+        # Source files of each loaded layer module, which is only executed again if its file changes
+        self.source_files = dict()
+
+    def file_digest(self, path):
+        """Hashes a file, again only if it changed since it was last hashed.
+
+        A compiler is kept across typechecks (e.g. by a compiler server), and the files it hashes can be edited in
+        between. Files hashed too soon after they were written to tell by their state are hashed again, as layer
+        modules are loaded again (see RACY_WINDOW_NS).
+        """
+        stat = os.stat(path)
+        state = (stat.st_mtime_ns, stat.st_size)
+        entry = self.file_digests.get(path)
+        if entry is not None and entry[0] == state and entry[2] > stat.st_mtime_ns + RACY_WINDOW_NS:
+            return entry[1]
+        now = time.time_ns()
+        with open(path, "rb") as f:
+            digest = _digest(f.read())
+        self.file_digests[path] = (state, digest, now)
+        return digest
+
+    def program_key(self, source, grammar_file, *options):
+        # Options changing the outcome of verification (e.g. the Horn backend) are part of the key
+        return _digest(str(CACHE_VERSION), self.file_digest(Path(grammar_file)), source, *options)
+
+    def layer_version(self, layer_handle):
+        """Hashes the files implementing a layer."""
+        parts = []
+        if layer_handle.module not in self.source_files:
+            self.source_files[layer_handle.module] = layer_source_files(layer_handle)
+        for path in self.source_files[layer_handle.module]:
+            parts += [str(path), self.file_digest(path)]
+        return _digest(*parts)
+
+    def layer_key(self, program_key, layer_handle, dependency_keys):
+        parts = [program_key, layer_handle.layer.name, self.layer_version(layer_handle)]
+        for layer_id in sorted(dependency_keys):
+            parts += [layer_id, dependency_keys[layer_id]]
+        return _digest(*parts)
+
+    def __entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.pickle"
+
+    def load(self, key):
+        """Returns the entry stored for a key, or None, without counting a hit or a miss."""
+        path = self.__entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            # Missing or unreadable entries (e.g. of classes that no longer exist) are recomputed
+            return None
+
+    def lookup(self, key):
+        result = self.load(key)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return result
+
+    def store(self, key, result):
+        try:
+            data = pickle.dumps(result)
+        except Exception:
+            # Results referring to objects that cannot be pickled are not cached
+            return False
+
+        path = self.__entry_path(key)
+        path.parent.mkdir(exist_ok=True)
+        # Write to a temporary file first, so a concurrent run never reads a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return True
+
+    @property
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class FunctionSummaries:
+    """Function level verification results of the layers of a typecheck, kept in a TypecheckCache.
+
+    The summary of a function is the set of annotations a layer added to its body when verifying it. It is keyed by
+    the body, the signatures the layer (and the layers it depends on) gave to the function and its callees, the
+    version of the layer (the hashes of its files) and the options of the typecheck (those of its program_key, plus
+    the entailment options and qualifiers the layer adds to the parts of the key). Only bodies that verify are summarized, so errors always come from
+    a fresh check, with the positions of the current source.
+    """
+    def __init__(self, cache, layer_versions, options=()):
+        self.cache = cache
+        # Hash of the files implementing each layer
+        self.layer_versions = layer_versions
+        self.options = tuple(options)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, layer_id, *parts):
+        return _digest("function", str(CACHE_VERSION), *self.options, layer_id, self.layer_versions.get(layer_id, ""),
+                       *parts)
+
+    def lookup(self, key):
+        changes = self.cache.load(key)
+        if changes is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return changes
+
+    def store(self, key, changes):
+        return self.cache.store(key, changes)
+
+    @property
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
@@ -1,5 +1,5 @@
-from collections import Counter
-from copy import copy, deepcopy
+from collections import Counter, namedtuple
+from copy import copy
 import typing as tp
 
 import lark
@@ -7,14 +7,21 @@ import lark
 from aeon.core.liquid import LiquidVar, liquid_free_vars, LiquidApp
 from aeon.core.substitutions import substitution_in_type, substitution_in_liquid
 from aeon.core.terms import Var
-from aeon.core.types import t_int, t_bool, t_string, RefinedType
+from aeon.core.types import t_int, t_bool, t_string, RefinedType, mk_singleton_int, mk_singleton_bool, mk_binop_result
 from aeon.frontend.parser import mk_parser
-from aeon.typing.context import EmptyContext, VariableBinder, TypingContext
-from aeon.typing.entailment import entailment
+from aeon.typing import entailment as entailment_checks
+from aeon.typing.context import EmptyContext, TypeBinder, VariableBinder, TypingContext
+from aeon.typing.entailment import entailment, hypotheses, hypotheses_entail
+from aeon.utils.names import NameSupply
+from aeon.utils.pmap import PMap
+from aeon.verification import horn
+from aeon.verification import qualifiers as qualifier_libraries
 from aeon.verification.sub import sub
 from aeon.verification.vcs import Conjunction
 from compiler.Exceptions import TypecheckException, WrongArgumentCountException, FeatureNotSupportedError
-from compiler.transformers.CreateAnnotatedTree import AnnotatedTree, make_annotated_tree
+from compiler.transformers.CreateAnnotatedTree import AnnotatedTree, make_annotated_tree, annotation_snapshot, \
+    annotation_changes, apply_annotation_changes
+from compiler.TypecheckCache import FunctionSummaries, subtree_digest
 
 class LiquidSubtypeException(TypecheckException):
     """Exception that will be raised when during liquid typechecking a subtype check fails.
@@ -62,45 +69,174 @@ class LiquidFunctionDefinitionError(TypecheckException):
         super().__init__(f"Function definition for {fun_name}:\rInvalid refinement at index {argument_idx}: {argument_idx}. (References non-unique variable {duplicate_var})", line, column)
         pass
 
-def make_name_unique(name :str, context :TypingContext) -> str:
+class LiquidVerificationErrors(TypecheckException):
+    """Exception that will be raised when several subtype checks fail during two-phase liquid typechecking.
+
+    Attributes:
+        errors -- the LiquidSubtypeException of every failed check, in the order of the program, followed by the
+                  error that stopped the walk if there was one
+    """
+    def __init__(self, errors: tp.List[TypecheckException]):
+        self.errors = errors
+
+        super().__init__(f"{len(errors)} liquid type errors:\n" + "\n".join(e.msg for e in errors), errors[0].lineno, errors[0].offset)
+        pass
+
+# Number of processes checking the verification conditions of a liquid layer, see use_vc_jobs
+vc_jobs = 0
+# Number of processes checking the function bodies of a liquid layer, see use_fun_def_jobs
+fun_def_jobs = 0
+# Verification summaries of the functions of the current typecheck, see use_function_summaries
+function_summaries = None
+
+# A subtyping obligation of a liquid layer, with what is needed to report it if it does not hold
+VerificationCondition = namedtuple("VerificationCondition", ["context", "constraint", "message", "type_actual", "type_expected", "line", "column"])
+
+def use_vc_jobs(jobs: int):
+    """Sets how liquid layers check their verification conditions.
+
+    With 0 jobs, every subtype check is discharged as soon as it is generated, and typechecking stops at the first
+    one that fails. Otherwise layers typecheck in two phases: the whole tree is walked once, collecting the
+    verification conditions, which are then discharged by that many processes (each with its own Z3 context), and all
+    the failures are reported at once.
+    """
+    global vc_jobs
+    assert jobs >= 0, "The number of jobs cannot be negative"
+    vc_jobs = jobs
+
+def use_fun_def_jobs(jobs: int):
+    """Sets how many processes liquid layers send their function bodies to.
+
+    Function bodies are checked in a context of their own, so they are independent of the rest of the program. With
+    more than one job, every function definition met while walking the tree is sent to a pool of that many processes,
+    and the annotations of its body are merged back (and its errors raised) in the order of the program.
+    """
+    global fun_def_jobs
+    assert jobs >= 0, "The number of jobs cannot be negative"
+    fun_def_jobs = jobs
+
+def use_function_summaries(summaries: tp.Optional[FunctionSummaries]):
+    """Makes liquid layers reuse the annotations of the function bodies that verified in a previous run (None to
+    verify all of them)."""
+    global function_summaries
+    function_summaries = summaries
+
+def pack_body_changes(changes, fun_types):
+    """Leaves the function types in scope out of the annotation changes of a function body.
+
+    Every node of the body points to them, and they are as large as the program, so they are set again by
+    unpack_body_changes instead of being sent to other processes or cached with the body.
+    """
+    kept = [(index, entry, value) for index, entry, value in changes if value is not fun_types]
+    scoped = [(index, entry) for index, entry, value in changes if value is fun_types]
+    return kept, scoped
+
+def unpack_body_changes(packed, fun_types):
+    kept, scoped = packed
+    return kept + [(index, entry, fun_types) for index, entry in scoped]
+
+def _check_fun_body(layer_identifier, layer_dependencies, qualifiers, backend, body, ctx, types, fun_types):
+    """Checks a function body in a worker process (see worker_pool) and returns the annotations it added to it
+    (packed)."""
+    # Function definitions nested in the body are checked by this process
+    use_fun_def_jobs(0)
+    horn.use_horn_backend(backend)
+    layer = LiquidLayer(layer_identifier, layer_dependencies, qualifiers=qualifiers)
+    snapshot = annotation_snapshot(body)
+    layer.visit_fun_body(body, ctx, types, fun_types)
+    return pack_body_changes(annotation_changes(body, snapshot), fun_types)
+
+def worker_pool(jobs: int):
+    """Returns a pool of that many processes forked from this one.
+
+    Workers check with the qualifier library, slicing options and validity cache (and its store) set up in this
+    process, which they inherit instead of being sent, so they are not started with spawn or forkserver.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork"))
+
+def _discharge(query):
+    hyps, constraint, backend = query
+    return hypotheses_entail(hyps, constraint, backend)
+
+def discharge(vcs: tp.List[VerificationCondition], jobs: int = 1) -> tp.List[LiquidSubtypeException]:
+    """Checks verification conditions, with a pool of processes if there is more than one job.
+
+    Returns the LiquidSubtypeException of every condition that does not hold.
+    """
+    # Workers are sent the hypotheses of the contexts, which are flat, instead of the chains of binders
+    queries = [(hypotheses(vc.context), vc.constraint, horn.horn_backend) for vc in vcs]
+    if jobs > 1 and len(queries) > 1:
+        with worker_pool(jobs) as executor:
+            results = list(executor.map(_discharge, queries, chunksize=max(1, len(queries) // (jobs * 4))))
+    else:
+        results = [_discharge(query) for query in queries]
+
+    return [LiquidSubtypeException(vc.message, vc.type_actual, vc.type_expected, vc.context, vc.line, vc.column)
+            for vc, valid in zip(vcs, results) if not valid]
+
+def raise_subtype_failures(failures: tp.List[LiquidSubtypeException], error: tp.Optional[TypecheckException] = None):
+    """Raises the failure if there is one, or LiquidVerificationErrors with all of them, in the order of the program.
+
+    The error that stopped the walk, if any, comes after the failures collected before it (and is raised alone if
+    there are none).
+    """
+    failures = sorted(failures, key=lambda e: (e.lineno, e.offset))
+    if error is not None:
+        failures += error.errors if isinstance(error, LiquidVerificationErrors) else [error]
+    if len(failures) == 1:
+        raise failures[0]
+    if failures:
+        raise LiquidVerificationErrors(failures)
+
+def make_name_unique(name :str, context :TypingContext, names: NameSupply = None) -> str:
     """Makes a name unique by appending a number to it.
 
     Args:
         name (str): The name to make unique
         context (TypingContext): The context in which the name should be unique
+        names (NameSupply): The supply the name is drawn from, it is never drawn twice from the same supply
 
     Returns:
         str: The unique name
     """
-    if context.type_of(name) is not None:
-        p = 1
-        while context.type_of(f"{name}_{p}") is not None:
-            p += 1
-        name = f"{name}_{p}"
+    if names is None:
+        names = NameSupply()
 
-    return name
+    return names.fresh(name, context)
 
-def substitute_refinement_names(fun_types: tp.List[RefinedType]):
+def substitute_in_refinement(refined_type: RefinedType, new_name: str, original_name: str) -> RefinedType:
+    """Renames a variable in the refinement of a type, returning the type itself if the variable does not occur in it"""
+    return refined_type.with_refinement(substitution_in_liquid(refined_type.refinement, LiquidVar(new_name), original_name))
+
+def substitute_refinement_names(fun_types: tp.List[RefinedType]) -> tp.List[RefinedType]:
+    # Types are immutable, the renamed argument types are returned in a new list (with the return type unchanged)
+    fun_types = list(fun_types)
     ref_var_names = [var.name for var in fun_types[:-1]]
     ref_var_names_cnt = Counter(ref_var_names)
     # We rename the variables in the refinements of the arguments
     for idx, name in enumerate(ref_var_names):
-        fun_types[idx].name = f"$arg{idx}"
-        fun_types[idx].refinement = substitution_in_liquid(fun_types[idx].refinement, LiquidVar(f"$arg{idx}"), name)
+        fun_types[idx] = RefinedType(f"$arg{idx}", fun_types[idx].type, fun_types[idx].refinement)
+        fun_types[idx] = substitute_in_refinement(fun_types[idx], f"$arg{idx}", name)
         if ref_var_names_cnt[name] == 1:
             for i in range(idx + 1, len(ref_var_names)):
-                fun_types[i].refinement = substitution_in_liquid(fun_types[i].refinement, LiquidVar(f"$arg{idx}"), name)
+                fun_types[i] = substitute_in_refinement(fun_types[i], f"$arg{idx}", name)
+    return fun_types
 
-def substitute_argument_names(arg_names: tp.List[str], arg_types: tp.List[RefinedType]):
+def substitute_argument_names(arg_names: tp.List[str], arg_types: tp.List[RefinedType]) -> tp.List[RefinedType]:
+    arg_types = list(arg_types)
     for i in range(len(arg_names)):
         ref_name = arg_types[i].name
         for j in range(i + 1, len(arg_names)):
-            arg_types[j].refinement = substitution_in_liquid(arg_types[j].refinement, LiquidVar(arg_names[i]), ref_name)
+            arg_types[j] = substitute_in_refinement(arg_types[j], arg_names[i], ref_name)
+    return arg_types
 
 
-def rename_variable(context, original_name, fun_identifier, all_arg_names, remaining_args):
+def rename_variable(context, original_name, fun_identifier, all_arg_names, remaining_args, names: NameSupply = None):
     free_var_name = f"{fun_identifier}_{original_name}"
-    free_var_name = make_name_unique(free_var_name, context)
+    free_var_name = make_name_unique(free_var_name, context, names)
 
     if all_arg_names.count(original_name) == 1:
         for i in range(len(remaining_args)):
@@ -108,73 +244,207 @@ def rename_variable(context, original_name, fun_identifier, all_arg_names, remai
     return free_var_name, remaining_args
 
 def rename_in_context(context: TypingContext, original_name, new_name):
+    # Contexts are immutable, the renamed context is rebuilt
     if not isinstance(context, VariableBinder):
-        return
-
-    if context.name == original_name:
-        context.name = new_name
+        return context
 
+    name = new_name if context.name == original_name else context.name
 
     assert isinstance(context.type, RefinedType)
-    context.type.refinement = substitution_in_liquid(context.type.refinement, LiquidVar(new_name), original_name)
+    renamed_type = substitute_in_refinement(context.type, new_name, original_name)
+    renamed_prev = rename_in_context(context.prev, original_name, new_name)
 
-    rename_in_context(context.prev, original_name, new_name)
+    # Binders the renaming does not touch are shared with the original context
+    if renamed_prev is context.prev and name == context.name and renamed_type is context.type:
+        return context
+    return VariableBinder(renamed_prev, name, renamed_type)
 
-def fresh_in_both(context_1: TypingContext, context_2: TypingContext):
+def fresh_in_both(context_1: TypingContext, context_2: TypingContext, names: NameSupply = None, *avoid: TypingContext):
     original_name = context_1.name
-    fresh_name = original_name
+    if names is None:
+        names = NameSupply()
 
-    while context_1.type_of(fresh_name) or context_2.type_of(fresh_name):
-
-        if context_1.type_of(fresh_name):
-            fresh_name = make_name_unique(fresh_name, context_1)
-
-        if context_2.type_of(fresh_name):
-            fresh_name = make_name_unique(fresh_name, context_2)
+    # The name is also kept apart from the variables bound in the contexts to avoid
+    fresh_name = names.fresh(original_name, context_1, context_2, *avoid)
 
     return original_name, fresh_name
 
 
-def combine_recursive(rec_ctx_1: TypingContext, rec_ctx_2: TypingContext):
+def combine_recursive(rec_ctx_1: TypingContext, rec_ctx_2: TypingContext, names: NameSupply = None, whole_ctx_2: TypingContext = None):
+    # Contexts are immutable, so the variables of rec_ctx_2 are renamed in a rebuilt copy of it (the third result)
+    if whole_ctx_2 is None:
+        # Fresh names must not capture variables of rec_ctx_2 that are renamed later
+        whole_ctx_2 = rec_ctx_2
+
     if isinstance(rec_ctx_2, EmptyContext):
-        return rec_ctx_1, []
+        return rec_ctx_1, [], rec_ctx_2
 
     # Start with the recursive call, since we want to rename the variables in the copy context
-    rec_ctx_1, renamings = combine_recursive(rec_ctx_1, rec_ctx_2.prev)
+    rec_ctx_1, renamings, renamed_prev = combine_recursive(rec_ctx_1, rec_ctx_2.prev, names, whole_ctx_2)
 
     if isinstance(rec_ctx_2, VariableBinder):
-        original_name, fresh_name = fresh_in_both(rec_ctx_2, rec_ctx_1)
+        original_name, fresh_name = fresh_in_both(VariableBinder(renamed_prev, rec_ctx_2.name, rec_ctx_2.type), rec_ctx_1, names, whole_ctx_2)
 
-        rec_ctx_2.name = fresh_name
-        rec_ctx_2.type.refinement = substitution_in_liquid(rec_ctx_2.type.refinement, LiquidVar(fresh_name), original_name)
+        renamed_type = substitute_in_refinement(rec_ctx_2.type, fresh_name, original_name)
 
         for name, renaming in renamings:
-            rec_ctx_2.type.refinement = substitution_in_liquid(rec_ctx_2.type.refinement, LiquidVar(renaming), name)
+            renamed_type = substitute_in_refinement(renamed_type, renaming, name)
 
-        rec_ctx_1 = rec_ctx_1.with_var(fresh_name, rec_ctx_2.type)
+        rec_ctx_1 = rec_ctx_1.with_var(fresh_name, renamed_type)
         renamings.append((original_name, fresh_name))
+        return rec_ctx_1, renamings, VariableBinder(renamed_prev, fresh_name, renamed_type)
 
-    return rec_ctx_1, renamings
-def combine_contexts(original_context: TypingContext, additional_context: TypingContext, refined_type: RefinedType):
-    copy_context = deepcopy(additional_context)
-
-    original_context, _ = combine_recursive(original_context, copy_context)
+    return rec_ctx_1, renamings, TypeBinder(renamed_prev, rec_ctx_2.type_name, rec_ctx_2.type_kind)
+def combine_contexts(original_context: TypingContext, additional_context: TypingContext, refined_type: RefinedType, names: NameSupply = None):
+    # Neither context is modified, the renamed types of additional_context are new values
+    original_context, _, _ = combine_recursive(original_context, additional_context, names)
 
     return original_context
 
 class LiquidLayer(lark.visitors.Interpreter):
-    def __init__(self, layer_identifier: str= "liquid", additional_contexts: tp.Set[str] = set()):
-        self.__types = {}
-        self.__fun_types = {}
-        self.__ctx = EmptyContext()
+    def __init__(self, layer_identifier: str= "liquid", additional_contexts: tp.Set[str] = set(), names: NameSupply = None, qualifiers=()):
+        # Fresh variable names of this typecheck, shared by all the contexts it builds
+        self.__names = names if names is not None else NameSupply()
+        # Variables of the contexts of other layers are renamed apart with names of their own. Drawing them from
+        # self.__names would shift the names of this layer away from the ones the other layers used for the same
+        # nodes, which their refinements refer to.
+        self.__combined_names = NameSupply(separator="$")
+        # Persistent maps, shared with the annotated nodes instead of copied into each of them
+        self.__types = PMap()
+        self.__fun_types = PMap()
+        self.__ctx = EmptyContext(self.__names)
         self.__layer_identifier = layer_identifier
         self.__layer_dependencies = additional_contexts
+        # Domain qualifiers, as (params, qualifier) pairs, tried when inferring refinements in this layer only
+        self.__qualifiers = list(qualifiers)
+        # Verification conditions collected during a two-phase typecheck, None when they are checked right away
+        self.__vcs = None
+        # Pool checking the function bodies, with the bodies sent to it and their results in the order of the program
+        self.__fun_def_pool = None
+        self.__fun_bodies = []
+        self.__visiting = False
+        # Summaries of the bodies checked in two phases, stored once their verification conditions are discharged
+        self.__pending_summaries = []
         pass
 
     def visit(self, tree):
         assert isinstance(tree, AnnotatedTree)
 
-        return super().visit(tree)
+        if self.__visiting:
+            return super().visit(tree)
+
+        # The outermost visit collects the verification conditions and the function bodies sent to the pool, and
+        # waits for them once the whole tree has been walked
+        self.__visiting = True
+        previous_library = qualifier_libraries.qualifier_library
+        if self.__qualifiers:
+            qualifier_libraries.use_qualifier_library(previous_library.derived(self.__qualifiers))
+        self.__vcs = [] if vc_jobs > 0 else None
+        self.__fun_bodies = []
+        self.__pending_summaries = []
+        if fun_def_jobs > 1:
+            self.__fun_def_pool = worker_pool(fun_def_jobs)
+        try:
+            error = None
+            try:
+                result = super().visit(tree)
+            except TypecheckException as e:
+                error = e
+            except Exception:
+                self.__join_fun_bodies(False)
+                raise
+            # The bodies sent to the pool and the conditions collected come before the error in the program, so their
+            # failures are raised first (or reported with it, in two phases)
+            failures = self.__join_fun_bodies(self.__vcs is not None)
+            if self.__vcs is not None:
+                failures += discharge(self.__vcs, vc_jobs)
+            if not failures and error is None:
+                for key, changes in self.__pending_summaries:
+                    function_summaries.store(key, changes)
+        finally:
+            if self.__fun_def_pool is not None:
+                self.__fun_def_pool.shutdown(wait=True, cancel_futures=True)
+            self.__fun_def_pool = None
+            self.__vcs = None
+            self.__pending_summaries = []
+            self.__visiting = False
+            qualifier_libraries.use_qualifier_library(previous_library)
+        raise_subtype_failures(failures, error)
+        return result
+
+    def __join_fun_bodies(self, collect_failures):
+        # Failed subtype checks of the bodies are returned when all failures are reported at once, other errors are
+        # raised right away
+        failures = []
+        for body, fun_types, future, summary_key in self.__fun_bodies:
+            try:
+                packed = future.result()
+                apply_annotation_changes(body, unpack_body_changes(packed, fun_types))
+                # The worker discharged the verification conditions of the body, so it verified
+                if summary_key is not None:
+                    function_summaries.store(summary_key, packed)
+            except LiquidVerificationErrors as e:
+                if not collect_failures:
+                    raise
+                failures += e.errors
+            except LiquidSubtypeException as e:
+                if not collect_failures:
+                    raise
+                failures.append(e)
+        self.__fun_bodies = []
+        return failures
+
+    def visit_fun_body(self, body, ctx, types, fun_types):
+        """Checks the body of a function definition in the given context, with the given identifier types in scope."""
+        # Save the current context
+        old_ctx = self.__ctx
+        old_fun_types = self.__fun_types
+        old_types = self.__types
+        old_names = self.__names
+
+        self.__ctx = ctx
+        self.__types = types
+        self.__fun_types = fun_types
+        # Fresh names are drawn from the supply of the context of the body
+        self.__names = ctx.root.names
+
+        # Visit the body of the function
+        self.visit(body)
+
+        # Restore the old context
+        self.__ctx = old_ctx
+        self.__fun_types = old_fun_types
+        self.__types = old_types
+        self.__names = old_names
+
+    def __summary_key(self, tree, fun_identifier):
+        # The body only depends on the types of the function and of its callees in this layer, and on the annotations
+        # of the layers it depends on
+        body = tree.children[-1]
+        callees = sorted({node.children[0].value for node in body.iter_subtrees() if node.data == "fun_call"})
+        parts = [subtree_digest(tree), repr(tree.get_layer_annotation(self.__layer_identifier, fun_identifier, "function_type"))]
+        # And on how its subtype checks are solved: the Horn backend, the slicing of their contexts and the qualifiers
+        # of the layer (installed by the outermost visit)
+        parts += [horn.horn_backend, repr((entailment_checks.slicing, entailment_checks.slice_through_functions)),
+                  qualifier_libraries.qualifier_library.state]
+        parts += [f"{callee}:{self.__fun_types.get(callee)!r}" for callee in callees]
+        for layer in sorted(self.__layer_dependencies):
+            parts += [layer, repr(tree.get_layer_annotation(layer, fun_identifier, "function_type"))]
+            parts += [repr(node.get_layer_annotation(layer, "liquid", "type")) for node in body.iter_subtrees_topdown()]
+        return function_summaries.key(self.__layer_identifier, *parts)
+
+    def __check_subtype(self, context, type_actual, type_expected, message, tree):
+        c = sub(type_actual, type_expected)
+
+        if self.__vcs is not None:
+            self.__vcs.append(VerificationCondition(context, c, message, type_actual, type_expected, tree.meta.line, tree.meta.column))
+        elif not entailment(context, c):
+            raise LiquidSubtypeException(message,
+                                         type_actual,
+                                         type_expected,
+                                         context,
+                                         tree.meta.line,
+                                         tree.meta.column)
     def _visit_tree(self, tree: AnnotatedTree):
         assert isinstance(tree, AnnotatedTree)
         self.__annotate(tree)
@@ -199,27 +469,23 @@ class LiquidLayer(lark.visitors.Interpreter):
             other_ctx = tree.get_layer_annotation(layer, "liquid", "context")
 
             # We combine the contexts
-            ctx = combine_contexts(ctx, other_ctx, refined_type)
+            ctx = combine_contexts(ctx, other_ctx, refined_type, self.__combined_names)
 
             # We rename the variables in the refinement of the other layer
             other_refinement = substitution_in_liquid(other_type.refinement, LiquidVar(refined_type.name), other_type.name)
             # In the end we combine the refined predicate with the other predicate
-            refined_type.refinement = LiquidApp("&&",[refined_type.refinement, other_refinement])
+            refined_type = refined_type.with_refinement(LiquidApp("&&",[refined_type.refinement, other_refinement]))
         
         # We add a layer annotation to the tree that can be used by other liquid layers
         tree.add_layer_annotation(self.__layer_identifier, "liquid", "type", refined_type)
-        # tree.add_layer_annotation(self.__layer_identifier, "liquid", "context", ctx)
 
         return refined_type, ctx
 
     def __annotate(self, tree):
         assert isinstance(tree, AnnotatedTree)
 
-        for identifier in self.__types:
-            tree.add_layer_annotation(self.__layer_identifier, identifier, "type", self.__types[identifier])
-
-        for fun_identifier in self.__fun_types:
-            tree.add_layer_annotation(self.__layer_identifier, fun_identifier, "function_type", self.__fun_types[fun_identifier])
+        tree.set_layer_scope(self.__layer_identifier, "type", self.__types)
+        tree.set_layer_scope(self.__layer_identifier, "function_type", self.__fun_types)
 
         tree.add_layer_annotation(self.__layer_identifier, "liquid", "context", self.__ctx)
 
@@ -275,21 +541,21 @@ class LiquidLayer(lark.visitors.Interpreter):
                     if refinement_var_counts[var] > 1:
                         raise LiquidFunctionDefinitionError(identifier, ref, i, var, tree.meta.line, tree.meta.column)
 
-            self.__fun_types[identifier] = refinement_types
+            self.__fun_types = self.__fun_types.set(identifier, refinement_types)
         else:
-            self.__types[identifier] = refinement_types[0]
+            self.__types = self.__types.set(identifier, refinement_types[0])
 
 
 
     def num(self, tree):
-        return mk_parser("type").parse("{v:Int | v == "+tree.children[0].value+" }"), tree.get_layer_annotation(self.__layer_identifier, "liquid", "context")
+        return mk_singleton_int(int(tree.children[0].value)), tree.get_layer_annotation(self.__layer_identifier, "liquid", "context")
 
     def true(self, tree):
-        return mk_parser("type").parse("{v:Bool | v }")\
+        return mk_singleton_bool(True)\
             , tree.get_layer_annotation(self.__layer_identifier, "liquid", "context")
 
     def false(self, tree):
-        return mk_parser("type").parse("{v:Bool | v }")\
+        return mk_singleton_bool(False)\
                , tree.get_layer_annotation(self.__layer_identifier, "liquid", "context")
 
     def bin_op(self, tree):
@@ -297,31 +563,33 @@ class LiquidLayer(lark.visitors.Interpreter):
 
         lhs_type, ctx = self.visit(tree.children[0])
 
-        lhs_name = make_name_unique("bin_op_lhs", ctx)
+        lhs_name = make_name_unique("bin_op_lhs", ctx, self.__names)
         self.__ctx = ctx.with_var(lhs_name, lhs_type)
 
         rhs_type, ctx = self.visit(tree.children[2])
 
-        rhs_name = make_name_unique("bin_op_rhs", ctx)
+        rhs_name = make_name_unique("bin_op_rhs", ctx, self.__names)
         ctx = ctx.with_var(rhs_name, rhs_type)
         self.__ctx = ctx
 
         # Limitation: We only support integer operations
         if not (lhs_type.type == t_int and rhs_type.type == t_int):
             raise TypecheckException("Expected both operands to be integers", tree.meta.line, tree.meta.column)
-        name = make_name_unique("bin_op_result", ctx)
+        name = make_name_unique("bin_op_result", ctx, self.__names)
 
         if op in {"+", "-", "*"}:
-            return_base_type = "Int"
-
-        if op in {"==", "!=", "<", ">", "<=", ">="}:
-            return_base_type = "Bool"
+            return_base_type = t_int
+        elif op in {"==", "!=", "<", ">", "<=", ">="}:
+            return_base_type = t_bool
+        else:
+            raise TypecheckException(f"Operator '{op}' is not supported on operands of type {lhs_type.type} and {rhs_type.type}", tree.meta.line, tree.meta.column)
 
-        return mk_parser("type").parse(f"{{ {name}:{return_base_type} | {name} == ( {lhs_name} {op} {rhs_name} ) }}"), ctx
+        return mk_binop_result(name, return_base_type, op, lhs_name, rhs_name), ctx
     def fun_call(self, tree):
         fun_identifier = tree.children[0].value
 
-        expected_arg_types = tree.get_layer_annotation(self.__layer_identifier, fun_identifier, "function_type")
+        # The argument types are renamed below, so we work on a copy of the list shared with the other nodes
+        expected_arg_types = copy(tree.get_layer_annotation(self.__layer_identifier, fun_identifier, "function_type"))
 
         if expected_arg_types is None:
             raise LiquidTypeUndefinedError(fun_identifier, tree.meta.line, tree.meta.column)
@@ -341,15 +609,7 @@ class LiquidLayer(lark.visitors.Interpreter):
         # Check that the types of the arguments are correct
         for i in range(actual_num_args):
             arg_type, context = self.visit(tree.children[i+1])
-            c = sub(arg_type, expected_arg_types[i])
-
-            if not entailment(context, c):
-                raise LiquidSubtypeException( f"Error in function call to {fun_identifier}, argument {i+1}",
-                                             arg_type,
-                                             expected_arg_types[i],
-                                             context,
-                                             tree.meta.line,
-                                             tree.meta.column)
+            self.__check_subtype(context, arg_type, expected_arg_types[i], f"Error in function call to {fun_identifier}, argument {i+1}", tree)
 
             # We need to add the type of the argument to the context
             # As other refinements may reference it
@@ -358,7 +618,7 @@ class LiquidLayer(lark.visitors.Interpreter):
 
             original_name = expected_arg_types[i].name
             free_var_name, expected_arg_types[i+1:] = rename_variable(context, original_name, fun_identifier,
-                                                                      all_arg_names , expected_arg_types[i+1:])
+                                                                      all_arg_names , expected_arg_types[i+1:], self.__names)
 
             context = context.with_var(free_var_name, arg_type)
             self.__ctx = context
@@ -370,9 +630,8 @@ class LiquidLayer(lark.visitors.Interpreter):
 
         # First check if we have a type definition for the function
         fun_identifier = tree.children[0].value
-        # We want to explicitly copy the function type, as we will modify it
-        # If we wouldn't copy it this would have implications when calling the function
-        fun_type = deepcopy(tree.get_layer_annotation(self.__layer_identifier, fun_identifier, "function_type"))
+        # The renamings below return new types, the function type used by calls is left as is
+        fun_type = tree.get_layer_annotation(self.__layer_identifier, fun_identifier, "function_type")
 
         if fun_type is None:
             raise LiquidTypeUndefinedError(fun_identifier, tree.meta.line, tree.meta.column)
@@ -386,29 +645,44 @@ class LiquidLayer(lark.visitors.Interpreter):
                                               tree.meta.line,
                                               tree.meta.column)
 
-        # Save the current context
-        old_ctx = copy(self.__ctx)
-        old_fun_types = copy(self.__fun_types)
-        old_types = copy(self.__types)
-
         # Function definitions cannot access variables from the outer scope
-        self.__ctx = EmptyContext()
-        self.__types = {}
+        # Their fresh names come from a supply of their own, so they do not depend on the rest of the program either
+        ctx = EmptyContext(NameSupply())
+        types = PMap()
 
-        substitute_refinement_names(fun_type)
-        substitute_argument_names(arg_names, fun_type)
+        fun_type = substitute_refinement_names(fun_type)
+        fun_type = substitute_argument_names(arg_names, fun_type)
 
         for i in range(len(arg_names)):
-            self.__ctx = VariableBinder(self.__ctx, arg_names[i], fun_type[i])
-            self.__types[arg_names[i]] = fun_type[i]
-
-        # Visit the body of the function
-        self.visit(tree.children[-1])
-
-        # Restore the old context
-        self.__ctx = old_ctx
-        self.__fun_types = old_fun_types
-        self.__types = old_types
+            ctx = VariableBinder(ctx, arg_names[i], fun_type[i])
+            types = types.set(arg_names[i], fun_type[i])
+
+        body = tree.children[-1]
+        summary_key = None
+        if function_summaries is not None:
+            summary_key = self.__summary_key(tree, fun_identifier)
+            packed = function_summaries.lookup(summary_key)
+            if packed is not None:
+                # Nothing the body depends on changed since it last verified
+                apply_annotation_changes(body, unpack_body_changes(packed, self.__fun_types))
+                return
+
+        if self.__fun_def_pool is None:
+            snapshot = annotation_snapshot(body) if summary_key is not None else None
+            self.visit_fun_body(body, ctx, types, self.__fun_types)
+            if summary_key is not None:
+                packed = pack_body_changes(annotation_changes(body, snapshot), self.__fun_types)
+                if self.__vcs is not None:
+                    # The verification conditions of the body are only discharged at the end of the walk
+                    self.__pending_summaries.append((summary_key, packed))
+                else:
+                    function_summaries.store(summary_key, packed)
+        else:
+            # The body only depends on the types in scope, so it is checked by another process while we walk on
+            future = self.__fun_def_pool.submit(_check_fun_body, self.__layer_identifier, self.__layer_dependencies,
+                                                self.__qualifiers, horn.horn_backend, body, ctx, types,
+                                                self.__fun_types)
+            self.__fun_bodies.append((body, self.__fun_types, future, summary_key))
 
     def let_stmt(self, tree):
         ident = tree.children[0].children[0].value
@@ -422,18 +696,11 @@ class LiquidLayer(lark.visitors.Interpreter):
 
 
         # Save the current context
-        old_ctx = copy(self.__ctx)
-        old_fun_types = copy(self.__fun_types)
-        old_types = copy(self.__types)
+        old_ctx = self.__ctx
+        old_fun_types = self.__fun_types
+        old_types = self.__types
 
-        c = sub(type_actual, type_expected)
-        if not entailment(context, c):
-            raise LiquidSubtypeException(f"Error during assigning identifier '{ident}' in let statement",
-                                         type_actual,
-                                         type_expected,
-                                         context,
-                                         tree.meta.line,
-                                         tree.meta.column)
+        self.__check_subtype(context, type_actual, type_expected, f"Error during assigning identifier '{ident}' in let statement", tree)
 
         self.__ctx = context.with_var(ident, type_actual)
 
@@ -0,0 +1,36 @@
+import lark
+
+from compiler.transformers.CreateAnnotatedTree import AnnotatedTree
+from layers.Layer import Layer
+
+
+class BuildTree(lark.Transformer):
+    """Builds the annotated tree of a program in a single pass.
+
+    Meant to be used as the inline transformer of the LALR parser. It creates AnnotatedTree nodes directly and
+    collects the layer refinements while parsing, so the tree does not need to be transformed again by
+    CreateAnnotatedTree and CollectLayers. Newlines are already dropped by the grammar.
+    """
+    def __init__(self):
+        super().__init__()
+        self.layers = dict()
+
+    def reset(self):
+        # Layers belong to the program being parsed
+        self.layers = dict()
+
+    def __default__(self, data, children, meta):
+        if data.startswith("_"):
+            # Inlined rules are expanded into their parent by the parser, they never end up in the tree
+            return lark.Tree(data, children, meta)
+
+        if data == "layer":
+            ident = children[0].children[0].value
+            layer_ident = children[1].children[0].value
+            refinement = children[2].value
+
+            if not layer_ident in self.layers:
+                self.layers[layer_ident] = Layer(layer_ident)
+            self.layers[layer_ident].add_refinement(ident, refinement)
+
+        return AnnotatedTree(data, children, meta)
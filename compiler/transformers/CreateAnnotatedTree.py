@@ -9,6 +9,7 @@ class AnnotatedTree(lark.Tree):
     def __init__(self, data: str, children: 'List[Branch[_Leaf_T]]', meta: Optional[Meta] = None):
         super().__init__(data, children, meta)
         self.__annotations = dict()
+        self.__scopes = dict()
 
     def update_layer_annotations(self, layer_identifier: str, identifier: str, values: dict):
         if layer_identifier not in self.__annotations:
@@ -18,30 +19,59 @@ class AnnotatedTree(lark.Tree):
         self.__annotations[layer_identifier][identifier].update(copy(values))
 
     def add_layer_annotation(self, layer_identifier: str, identifier: str, key: str, value):
+        """Annotates this node with a value for a layer.
+
+        The value is stored as is, not copied, as the types and contexts of the layers are persistent. It must never
+        be mutated afterwards.
+        """
         if layer_identifier not in self.__annotations:
             self.__annotations[layer_identifier] = dict()
         if identifier not in self.__annotations[layer_identifier]:
             self.__annotations[layer_identifier][identifier] = dict()
 
-        self.__annotations[layer_identifier][identifier][key] = copy(value)
+        self.__annotations[layer_identifier][identifier][key] = value
+
+    def set_layer_scope(self, layer_identifier: str, key: str, scope):
+        """Points this node to the scope of a layer that was live when the node was visited.
+
+        The scope is a persistent map (see aeon.utils.pmap) from identifiers to their value for `key`.
+        It is shared with other nodes instead of copied, so it must never be mutated afterwards.
+        Explicit annotations added with add_layer_annotation take precedence over the scope.
+        """
+        if layer_identifier not in self.__scopes:
+            self.__scopes[layer_identifier] = dict()
+
+        self.__scopes[layer_identifier][key] = scope
 
     def get_all_layer_annotations(self, layer_id: str, identifier: str):
-        if layer_id not in self.__annotations:
-            return {}
+        values = {key: scope[identifier] for key, scope in self.__scopes.get(layer_id, {}).items() if identifier in scope}
 
-        return self.__annotations[layer_id][identifier]
+        if layer_id in self.__annotations:
+            values.update(self.__annotations[layer_id].get(identifier, {}))
+
+        return values
 
     def get_layer_annotation(self, layer_id: str, identifier: str, key: str):
-        if layer_id not in self.__annotations:
-            return None
+        if layer_id in self.__annotations:
+            values = self.__annotations[layer_id].get(identifier)
+            if values is not None and key in values:
+                return values[key]
+
+        if layer_id in self.__scopes and key in self.__scopes[layer_id]:
+            return self.__scopes[layer_id][key].get(identifier)
 
-        if identifier not in self.__annotations[layer_id]:
-            return None
+        return None
 
-        if key not in self.__annotations[layer_id][identifier]:
-            return None
+    def iter_layer_annotations(self):
+        for layer_id, identifiers in self.__annotations.items():
+            for identifier, values in identifiers.items():
+                for key, value in values.items():
+                    yield layer_id, identifier, key, value
 
-        return self.__annotations[layer_id][identifier][key]
+    def iter_layer_scopes(self):
+        for layer_id, scopes in self.__scopes.items():
+            for key, scope in scopes.items():
+                yield layer_id, key, scope
 
 
 class CreateAnnotatedTree(lark.Transformer):
@@ -51,3 +81,41 @@ class CreateAnnotatedTree(lark.Transformer):
 def make_annotated_tree(tree):
     transformer = CreateAnnotatedTree()
     return transformer.transform(tree)
+
+_missing = object()
+
+def _annotation_entries(node):
+    # Annotations are keyed by (layer, identifier, key), scopes by (layer, key)
+    for layer_id, identifier, key, value in node.iter_layer_annotations():
+        yield (layer_id, identifier, key), value
+    for layer_id, key, scope in node.iter_layer_scopes():
+        yield (layer_id, key), scope
+
+def annotation_snapshot(tree):
+    """Records the annotation values and scopes of every node, in pre-order.
+
+    The values themselves are kept (not their ids), so that an overwritten value cannot be mistaken for an
+    unchanged one if its id is reused.
+    """
+    return [dict(_annotation_entries(node)) for node in tree.iter_subtrees_topdown() if isinstance(node, AnnotatedTree)]
+
+def annotation_changes(tree, snapshot):
+    """Returns the annotations that were added or replaced since the snapshot was taken.
+
+    Nodes are identified by their pre-order index, so the changes can be applied to a copy of the tree.
+    """
+    changes = []
+    nodes = [node for node in tree.iter_subtrees_topdown() if isinstance(node, AnnotatedTree)]
+    for index, (node, before) in enumerate(zip(nodes, snapshot)):
+        for entry, value in _annotation_entries(node):
+            if before.get(entry, _missing) is not value:
+                changes.append((index, entry, value))
+    return changes
+
+def apply_annotation_changes(tree, changes):
+    nodes = [node for node in tree.iter_subtrees_topdown() if isinstance(node, AnnotatedTree)]
+    for index, entry, value in changes:
+        if len(entry) == 2:
+            nodes[index].set_layer_scope(*entry, value)
+        else:
+            nodes[index].add_layer_annotation(*entry, value)
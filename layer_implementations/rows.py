@@ -1,7 +1,10 @@
 from compiler.interpreters import LiquidTypeChecker
 
+# Candidate refinements for inferred dataset types, only tried by this layer
+QUALIFIERS = [([("d", "DataSet")], "n_rows(d) >= 0")]
+
 def typecheck(tree):
-    liquid_checker = LiquidTypeChecker.LiquidLayer(layer_identifier="rows")
+    liquid_checker = LiquidTypeChecker.LiquidLayer(layer_identifier="rows", qualifiers=QUALIFIERS)
     liquid_checker.visit(tree)
 
     return tree
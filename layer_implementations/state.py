@@ -1,9 +1,9 @@
 import re
-from collections import defaultdict
 from copy import copy
 
 import lark.visitors
 
+from aeon.utils.pmap import PMap
 from compiler.Exceptions import TypecheckException, WrongArgumentCountException
 from compiler.transformers.CreateAnnotatedTree import AnnotatedTree
 
@@ -60,18 +60,16 @@ class StateError(TypecheckException):
         super().__init__(msg, line, column)
 class StateLayer(lark.visitors.Interpreter):
     def __init__(self):
-        self.__states = defaultdict(set)
-        self.__function_states = dict()
+        # Both maps are persistent and shared with the annotated nodes, so the sets stored in them are never mutated
+        self.__states = PMap()
+        self.__function_states = PMap()
 
     def __annotate_states(self, tree):
         if not isinstance(tree, AnnotatedTree):
             tree = AnnotatedTree(tree.data, tree.children, tree.meta)
 
-        for identifier in self.__states:
-            tree.add_layer_annotation("state", identifier, "state", self.__states[identifier])
-
-        for fun_identifier in self.__function_states:
-            tree.add_layer_annotation("state",fun_identifier, "function_state",self.__function_states[fun_identifier])
+        tree.set_layer_scope("state", "state", self.__states)
+        tree.set_layer_scope("state", "function_state", self.__function_states)
 
     def layer(self, tree):
         identifier = tree.children[0].children[0].value
@@ -94,14 +92,14 @@ class StateLayer(lark.visitors.Interpreter):
                     f"Identifier {identifier} does not have the required state.", tree.meta.line, tree.meta.column)
             state = copy(state)
             arg_state.apply_state_transitions(state)
-            self.__states[identifier] = state
+            self.__states = self.__states.set(identifier, state)
 
         else:
             # This is a definition for a function
             # Special handling for functions without arguments:
             if len(states) == 2 and states[0] == "":
                 states = states[1:]
-            self.__function_states[identifier] = [ArgumentState(s) for s in states]
+            self.__function_states = self.__function_states.set(identifier, [ArgumentState(s) for s in states])
 
     def fun_call(self, tree):
         fun_identifier = tree.children[0].value
@@ -125,7 +123,7 @@ class StateLayer(lark.visitors.Interpreter):
             self.__function_states[fun_identifier][i].apply_state_transitions(new_state)
             # If the argument is an identifier, we need to update the state
             if isinstance(arg, AnnotatedTree) and arg.data == "ident":
-                self.__states[arg.children[0].value] = new_state
+                self.__states = self.__states.set(arg.children[0].value, new_state)
 
         # Return the states of the last argument which corresponds to the return value
         return self.__function_states[fun_identifier][-1].required_states
@@ -136,7 +134,7 @@ class StateLayer(lark.visitors.Interpreter):
         return state if state else set()
 
     def assign(self, tree):
-        self.__states[tree.children[0].children[0].value] = self.visit(tree.children[1])
+        self.__states = self.__states.set(tree.children[0].children[0].value, self.visit(tree.children[1]))
 
     def fun_def(self, tree):
         fun_identifier = tree.children[0].value
@@ -145,11 +143,11 @@ class StateLayer(lark.visitors.Interpreter):
         # Check if the function has a state definition
 
         # We need to restore the states after the function definition
-        old_states = self.__states.copy()
-        old_function_states = self.__function_states.copy()
+        old_states = self.__states
+        old_function_states = self.__function_states
 
         # We reset the states to the default values
-        self.__states = defaultdict(set)
+        self.__states = PMap()
 
         if fun_identifier in self.__function_states:
             # Check that the number of arguments matches
@@ -162,14 +160,14 @@ class StateLayer(lark.visitors.Interpreter):
 
             # Add the states of the arguments to the function definition
             for i, arg in enumerate(arg_names):
-                self.__states[arg] = self.__function_states[fun_identifier][i].required_states
+                self.__states = self.__states.set(arg, self.__function_states[fun_identifier][i].required_states)
 
         # Visit the function body
         self.visit(tree.children[-1])
 
         # Restore the old states
-        self.__states = old_states.copy()
-        self.__function_states = old_function_states.copy()
+        self.__states = old_states
+        self.__function_states = old_function_states
 
     def block(self, tree):
         return self.visit_children(tree)
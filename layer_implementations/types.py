@@ -1,6 +1,7 @@
 import lark
 
 from compiler.Exceptions import TypecheckException, WrongArgumentCountException
+from aeon.utils.pmap import PMap
 from compiler.transformers.CreateAnnotatedTree import AnnotatedTree
 
 
@@ -10,18 +11,15 @@ def depends_on():
 def typecheck(tree):
     class TypeAnnotator(lark.visitors.Interpreter):
         def __init__(self):
-            self.variable_types = dict()
-            self.function_types = dict()
+            self.variable_types = PMap()
+            self.function_types = PMap()
 
         def __annotate_types(self, tree):
             if not isinstance(tree, AnnotatedTree):
                 tree = AnnotatedTree(tree.data,tree.children,tree.meta)
 
-            for var_type in self.variable_types:
-                tree.add_layer_annotation("types",var_type,"type",self.variable_types[var_type])
-
-            for fun_type in self.function_types:
-                tree.add_layer_annotation("types",fun_type,"fun_type",self.function_types[fun_type])
+            tree.set_layer_scope("types","type",self.variable_types)
+            tree.set_layer_scope("types","fun_type",self.function_types)
 
         def layer(self, tree):
             self.__annotate_types(tree)
@@ -43,9 +41,9 @@ def typecheck(tree):
                 # Special handling for functions without arguments
                 if annotated_type[0] == '':
                     annotated_type = annotated_type[1:]
-                self.function_types[identifier] = annotated_type
+                self.function_types = self.function_types.set(identifier, annotated_type)
             else:
-                self.variable_types[identifier] = annotated_type
+                self.variable_types = self.variable_types.set(identifier, annotated_type)
 
             if tree.get_layer_annotation(layer_name,identifier,dict_key) is not None:
                 raise TypecheckException(f"Type for identifier"
@@ -68,17 +66,17 @@ def typecheck(tree):
                 raise WrongArgumentCountException(fun_identifier,len(expected_arg_types),len(arg_names), tree.meta.line, tree.meta.column)
 
             # Store the old variable types as local variables may shadow global variables
-            old_frame = self.variable_types.copy()
-            old_function_frame = self.function_types.copy()
+            old_frame = self.variable_types
+            old_function_frame = self.function_types
 
-            self.variable_types.clear()
+            self.variable_types = PMap()
             for i in range(len(expected_arg_types)):
-                self.variable_types[arg_names[i]] = [expected_arg_types[i]]
+                self.variable_types = self.variable_types.set(arg_names[i], [expected_arg_types[i]])
 
             self.visit(tree.children[-1])
 
-            self.variable_types = old_frame.copy()
-            self.function_types = old_function_frame.copy()
+            self.variable_types = old_frame
+            self.function_types = old_function_frame
 
         def __default__(self, tree):
             self.__annotate_types(tree)
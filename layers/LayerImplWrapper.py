@@ -1,9 +1,66 @@
+import hashlib
 import importlib.util
+import os
 import sys
+import time
+from collections import namedtuple
 
 from layers.Layer import Layer
 from pathlib import Path
 
+# Reuse the modules of layers whose implementation file did not change, instead of executing it for every typecheck
+cache_modules = True
+
+# Timestamps of some file systems are only updated every few milliseconds (or seconds), so a file rewritten shortly
+# after it was loaded can keep its modification time. Such files have their contents compared as well.
+RACY_WINDOW_NS = 2_000_000_000
+
+# A loaded layer module, the dependencies it declares, and the state and digest of its file when it was last checked
+LoadedLayer = namedtuple("LoadedLayer", ["module", "depends_on", "run_before", "mtime_ns", "size", "digest", "checked_ns"])
+
+loaded_layers = dict()
+loaded_layers_stats = {"hits": 0, "loads": 0}
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=20).digest()
+
+
+def _load_layer_module(full_path, module_name):
+    """Returns the loaded layer for an implementation file, executing it only if it changed since it was loaded."""
+    stat = full_path.stat()
+    now = time.time_ns()
+    loaded = loaded_layers.get(full_path) if cache_modules else None
+    if loaded is not None:
+        if (stat.st_mtime_ns, stat.st_size) == (loaded.mtime_ns, loaded.size) and loaded.checked_ns > stat.st_mtime_ns + RACY_WINDOW_NS:
+            loaded_layers_stats["hits"] += 1
+            return loaded
+        digest = _file_digest(full_path)
+        if digest == loaded.digest:
+            # Only touched (or checked too soon to tell), the contents are the same
+            loaded_layers_stats["hits"] += 1
+            loaded = loaded._replace(mtime_ns=stat.st_mtime_ns, size=stat.st_size, checked_ns=now)
+            loaded_layers[full_path] = loaded
+            return loaded
+    else:
+        digest = _file_digest(full_path)
+
+    spec = importlib.util.spec_from_file_location(module_name, full_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    loaded_layers_stats["loads"] += 1
+
+    # The declared dependencies are resolved once per load, callers get copies they may change
+    depends_on = frozenset(getattr(module, "depends_on", lambda : set())())
+    run_before = frozenset(getattr(module, "run_before", lambda : set())())
+    loaded = LoadedLayer(module, depends_on, run_before, stat.st_mtime_ns, stat.st_size, digest, now)
+    if cache_modules:
+        loaded_layers[full_path] = loaded
+    return loaded
+
+
 class LayerImplWrapper:
     def __init__(self,
                  layer_base_dir,
@@ -20,12 +77,12 @@ class LayerImplWrapper:
             raise FileNotFoundError(f"No implementation file (tried to load file '{full_path}') found for layer '{layer.name}'")
 
         module_name = f"layers.{self.layer.name}"
-        spec = importlib.util.spec_from_file_location(module_name, full_path)
-        self.module = importlib.util.module_from_spec(spec)
+        loaded = _load_layer_module(Path(os.path.abspath(full_path)), module_name)
+        self.module = loaded.module
+        # Layers of another base directory may have been loaded under the same name since
         sys.modules[module_name] = self.module
-        spec.loader.exec_module(self.module)
 
-        self.depends_on = getattr(self.module, "depends_on", lambda : set())
+        self.depends_on = lambda : set(loaded.depends_on)
         self.typecheck = getattr(self.module, "typecheck")
         self.parse_type = getattr(self.module, "parse_type", lambda x: x)
-        self.run_before = getattr(self.module, "run_before", lambda : set())
+        self.run_before = lambda : set(loaded.run_before)
@@ -1,8 +1,7 @@
 import os
+import sys
 from optparse import OptionParser
 
-from compiler.Compiler import LayeredCompiler
-
 if __name__ == "__main__":
     parser = OptionParser()
 
@@ -10,9 +9,35 @@ if __name__ == "__main__":
     parser.add_option("-t","--typecheck", action="store_true", dest="typecheck", help="Only typecheck the program")
     parser.add_option("-i","--impls", action="store", dest="impls", help="File containing implementations")
     parser.add_option("-l","--layers", action="store", dest="layers", help="Directory containing layers")
+    parser.add_option("-c","--compiled", action="store_true", dest="compiled", help="Compile the program to Python closures before running it")
+    parser.add_option("-j","--jobs", action="store", type="int", dest="jobs", default=1, help="Number of layers verified in parallel")
+    parser.add_option("--entailment-cache-size", action="store", type="int", dest="entailment_cache_size", default=4096, help="Number of entailment results kept in memory")
+    parser.add_option("--typecheck-cache", action="store", dest="typecheck_cache", help="Directory in which layer verification results are cached across runs")
+    parser.add_option("--entailment-cache", action="store", dest="entailment_cache", help="File in which entailment results are persisted across runs")
+    parser.add_option("--horn-backend", action="store", type="choice", choices=["fixpoint", "spacer"], dest="horn_backend", default="fixpoint", help="Solver of Horn constraints: fixpoint (liquid inference) or spacer (Z3's CHC engine)")
+    parser.add_option("--vc-jobs", action="store", type="int", dest="vc_jobs", default=0, help="Check liquid layers in two phases, discharging their verification conditions with this many processes and reporting all failures (0 stops at the first failure)")
+    parser.add_option("--fun-jobs", action="store", type="int", dest="fun_def_jobs", default=0, help="Number of processes checking the function bodies of liquid layers in parallel")
+    parser.add_option("--serve", action="store", dest="serve", help="Start a compiler server listening on this Unix socket, which keeps parsers, layers, solvers and caches warm between requests")
+    parser.add_option("--socket", action="store", dest="socket", help="Send the request to the compiler server listening on this Unix socket")
+    parser.add_option("--stop", action="store_true", dest="stop", help="Stop the compiler server listening on the socket given with --socket")
 
     (options, args) = parser.parse_args()
 
+    # The server module is only loaded when it is used, like the compiler
+    if options.serve is not None:
+        from compiler.CompilerServer import serve
+
+        serve(os.path.abspath(options.serve))
+        sys.exit(0)
+
+    if options.stop:
+        if options.socket is None:
+            parser.error("No socket given")
+        from compiler.CompilerServer import send_request
+
+        send_request(os.path.abspath(options.socket), {"command": "stop"})
+        sys.exit(0)
+
     if options.filename is None:
         parser.error("No filename given")
 
@@ -22,18 +47,48 @@ if __name__ == "__main__":
     if options.layers is None:
         parser.error("No layers directory given")
 
-    compiler = LayeredCompiler(os.path.abspath(options.layers), os.path.abspath(options.impls))
+    entailment_cache = os.path.abspath(options.entailment_cache) if options.entailment_cache else None
+    typecheck_cache = os.path.abspath(options.typecheck_cache) if options.typecheck_cache else None
+    compiler_options = {"entailment_cache_size": options.entailment_cache_size,
+                        "entailment_cache_path": entailment_cache,
+                        "jobs": options.jobs,
+                        "typecheck_cache_dir": typecheck_cache,
+                        "horn_backend": options.horn_backend,
+                        "vc_jobs": options.vc_jobs,
+                        "fun_def_jobs": options.fun_def_jobs}
+
+    file = os.path.abspath(options.filename)
+
+    if options.socket is not None:
+        from compiler.CompilerServer import send_request
+
+        # The server typechecks or runs the program with a warm compiler, we only print what it reports
+        response = send_request(os.path.abspath(options.socket), {"command": "typecheck" if options.typecheck else "run",
+                                                                  "file": file,
+                                                                  "layers": os.path.abspath(options.layers),
+                                                                  "impls": os.path.abspath(options.impls),
+                                                                  "options": compiler_options,
+                                                                  "compiled": bool(options.compiled)})
+        sys.stdout.write(response["output"])
+        sys.stderr.write(response["errors"])
+        if response["status"] == 0 and response["result"] is not None:
+            print(f"Program returned: {response['result']}")
+        sys.exit(response["status"])
+
+    # Imported here so that clients of a compiler server do not pay for loading the compiler
+    from compiler.Compiler import LayeredCompiler
+
+    compiler = LayeredCompiler(os.path.abspath(options.layers), os.path.abspath(options.impls), **compiler_options)
 
     cwd = os.getcwd()
 
-    file = os.path.abspath(options.filename)
     os.chdir(os.path.dirname(os.path.abspath(options.filename)))
 
     try:
         if options.typecheck:
             compiler.typecheck(file, verbose=True, raise_on_error=False)
         else:
-            result = compiler.run(file)
+            result = compiler.run(file, compiled=options.compiled)
             print(f"Program returned: {result}")
     finally:
         os.chdir(cwd)
@@ -37,3 +37,9 @@ def append(ls, val):
 
 def create_list(n: int):
     return list(range(n))
+
+def generate(n: int):
+    return (i for i in range(n))
+
+def total(values):
+    return sum(values)
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from compiler.CompilerServer import CompilerServer, send_request
+from utils import full_path
+
+
+class TestCompilerServer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.directory.name, "aeon.sock")
+        self.server = CompilerServer(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        send_request(self.socket_path, {"command": "stop"})
+        self.thread.join()
+        self.server.server_close()
+        self.assertFalse(os.path.exists(self.socket_path))
+        self.directory.cleanup()
+
+    def request(self, command, file_path, **arguments):
+        return send_request(self.socket_path, {"command": command,
+                                               "file": full_path(file_path),
+                                               "layers": full_path("/layer_implementations"),
+                                               "impls": full_path("/implementations.py"),
+                                               **arguments})
+
+    def test_typecheck(self):
+        response = self.request("typecheck", "/test_code/layers/single_layer_def.fl")
+        self.assertEqual(0, response["status"])
+        self.assertIn("All layers were successfully verified.", response["output"])
+
+    def test_run(self):
+        response = self.request("run", "/test_code/factorial.fl")
+        self.assertEqual(0, response["status"])
+        self.assertIsNotNone(response["result"])
+        self.assertEqual(response, self.request("run", "/test_code/factorial.fl", compiled=True))
+
+    def test_compilers_are_reused(self):
+        self.request("typecheck", "/test_code/layers/single_layer_def.fl")
+        self.request("typecheck", "/test_code/layers/single_layer_def.fl")
+        self.request("typecheck", "/test_code/layers/single_layer_def.fl", options={"jobs": 2})
+        self.assertEqual(2, len(self.server.compilers))
+
+    def test_errors_are_reported(self):
+        response = self.request("typecheck", "/test_code/missing.fl")
+        self.assertEqual(1, response["status"])
+        self.assertIn("FileNotFoundError", response["errors"])
+
+        # The server keeps serving after a failed request
+        response = self.request("typecheck", "/test_code/layers/single_layer_def.fl")
+        self.assertEqual(0, response["status"])
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from utils import full_path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Typechecks a program in a fresh interpreter and prints the heavy dependencies it loaded
+LOADED_MODULES = """
+import sys
+from compiler.Compiler import LayeredCompiler
+compiler = LayeredCompiler(sys.argv[1], sys.argv[2])
+compiler.typecheck(sys.argv[3])
+print(" ".join(name for name in ("z3", "igraph", "concurrent.futures") if name in sys.modules))
+"""
+
+
+def loaded_modules(file_path, layers_path="/layer_implementations"):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.join(ROOT, "aeon-lt"), ROOT])
+    completed = subprocess.run([sys.executable, "-c", LOADED_MODULES, full_path(layers_path),
+                                full_path("/implementations.py"), full_path(file_path)],
+                               env=env, capture_output=True, text=True, check=True)
+    return completed.stdout.split()
+
+
+class TestImports(unittest.TestCase):
+
+    def test_programs_without_layers_do_not_load_solvers(self):
+        self.assertEqual([], loaded_modules("/test_code/syntax/assign.fl"))
+
+    def test_liquid_layer_loads_solver(self):
+        self.assertIn("z3", loaded_modules("/test_code/liquid/bin_op_add.fl", "/../layer_implementations"))
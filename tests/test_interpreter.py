@@ -1,6 +1,7 @@
 import os
 import unittest
 
+from compiler.ClosureCompiler import ClosureCompiler
 from compiler.Interpreters import SimpleInterpreter
 from utils import parse_file, get_compiler, full_path
 
@@ -189,3 +190,86 @@ class TestInterpreter(unittest.TestCase):
         result = compiler.run(full_path("/test_code/syntax/factorial.fl"))
 
         self.assertEqual(result, 120)
+
+    def test_recursion_deeper_than_python_limit(self):
+        compiler = get_compiler()
+        tree = compiler.parse(full_path("/test_code/syntax/deep_recursion.fl"))
+
+        self.assertEqual(compiler.interpreter.run(tree), 0)
+        self.assertEqual(compiler.interpreter.frames, [])
+
+    def test_nested_function_scoped_to_call(self):
+        compiler = get_compiler()
+        tree = compiler.parse(full_path("/test_code/syntax/nested_fun_def.fl"))
+
+        # The second call of outer can define inner again
+        self.assertEqual(compiler.interpreter.run(tree), 3)
+        self.assertEqual(list(compiler.interpreter.functions.keys()), ["outer"])
+
+    def test_external_function_returning_generator(self):
+        compiler = get_compiler()
+        tree = compiler.parse(full_path("/test_code/syntax/generator_call.fl"))
+
+        # The generator is a value passed on to the next call, not a node waiting for subtrees
+        self.assertEqual(compiler.interpreter.run(tree), 6)
+
+class TestClosureCompiler(unittest.TestCase):
+    def compile_file(self, file_path):
+        compiler = get_compiler()
+        tree = compiler.parse(full_path(file_path))
+
+        return ClosureCompiler(compiler.interpreter.external_functions).compile(tree)
+
+    def test_assign(self):
+        program = self.compile_file("/test_code/syntax/assign.fl")
+
+        self.assertEqual(program(), None)
+        self.assertEqual(program.variables, {"x": True, "y": True, "z": 42})
+
+    def test_constants(self):
+        program = self.compile_file("/test_code/syntax/constants.fl")
+
+        self.assertEqual(program(), False)
+
+    def test_let_restores_variable(self):
+        program = self.compile_file("/test_code/syntax/let_stmt.fl")
+
+        # y is not defined in the program
+        with self.assertRaises(RuntimeError) as context:
+            program()
+        self.assertEqual(str(context.exception), "Identifier 'y' not defined")
+        self.assertEqual(program.variables, {})
+
+    def test_unknown_operator(self):
+        program = self.compile_file("/test_code/typechecking/bin_ops.fl")
+
+        with self.assertRaises(RuntimeError) as context:
+            program()
+        self.assertEqual(str(context.exception), "Unknown operator '&&'")
+
+    def test_nested_function_out_of_scope(self):
+        program = self.compile_file("/test_code/control_flow/function_access_out_of_scope.fl")
+
+        with self.assertRaises(RuntimeError) as context:
+            program()
+        self.assertEqual(str(context.exception), "Function 'innerFunction' not defined")
+
+    def test_nested_function_redefinition(self):
+        program = self.compile_file("/test_code/control_flow/nested_function_redefinition.fl")
+
+        with self.assertRaises(RuntimeError) as context:
+            program()
+        self.assertEqual(str(context.exception), "Function 'function' already defined")
+
+    def test_nested_function_definition(self):
+        # The inner function is only defined for the duration of each call
+        program = self.compile_file("/test_code/syntax/nested_fun_def.fl")
+
+        self.assertEqual(program(), 3)
+        self.assertEqual(list(program.functions.keys()), ["outer"])
+
+    def test_recursion(self):
+        compiler = get_compiler()
+
+        self.assertEqual(compiler.run(full_path("/test_code/syntax/factorial.fl"), compiled=True), 120)
+        self.assertEqual(compiler.run(full_path("/test_code/syntax/function_name_as_arg.fl"), compiled=True), 120)
@@ -1,7 +1,11 @@
+import os
+import tempfile
 import unittest
 from graphlib import CycleError
 
-from compiler.Compiler import LayerVerificationState
+from compiler.Compiler import LayeredCompiler, LayerVerificationState
+from compiler.TypecheckCache import layer_source_files
+from layers import LayerImplWrapper
 from utils import get_compiler, full_path, call_order
 
 class TestLayerDefinitions(unittest.TestCase):
@@ -147,3 +151,251 @@ class TestLayerDependencies(unittest.TestCase):
         self.assertEqual(LayerVerificationState.BLOCKED, compiler.layer_states["blockedLayerC"])
         self.assertEqual(LayerVerificationState.CYCLE_BLOCKED, compiler.layer_states["dependOnCycleA"])
 
+
+class TestParallelLayerVerification(unittest.TestCase):
+
+    def test_complex_layers(self):
+        compiler = get_compiler(jobs=2)
+        src_file = full_path("/test_code/layers/complex_layers.fl")
+
+        compiler.typecheck(src_file, raise_on_error=False)
+
+        self.assertEqual(LayerVerificationState.SUCCESS, compiler.layer_states["A"])
+        self.assertEqual(LayerVerificationState.SUCCESS, compiler.layer_states["B"])
+        self.assertEqual(LayerVerificationState.SUCCESS, compiler.layer_states["C"])
+        self.assertEqual(LayerVerificationState.SUCCESS, compiler.layer_states["D"])
+        self.assertEqual(LayerVerificationState.CYCLE, compiler.layer_states["cycleA"])
+        self.assertEqual(LayerVerificationState.CYCLE, compiler.layer_states["cycleB"])
+        self.assertEqual(LayerVerificationState.FAILURE, compiler.layer_states["failLayerA"])
+        self.assertEqual(LayerVerificationState.BLOCKED, compiler.layer_states["blockedLayerB"])
+        self.assertEqual(LayerVerificationState.BLOCKED, compiler.layer_states["blockedLayerC"])
+        self.assertEqual(LayerVerificationState.CYCLE_BLOCKED, compiler.layer_states["dependOnCycleA"])
+
+    def test_circular_dependency(self):
+        compiler = get_compiler(jobs=2)
+        src_file = full_path("/test_code/layers/create_cycle.fl")
+
+        with self.assertRaises(CycleError):
+            compiler.typecheck(src_file)
+
+    def test_dependent_layer_sees_annotations(self):
+        # rowcols can only be verified with the annotations added by rows and cols
+        compiler = get_compiler(full_path("/../examples/python_impls/use_case_2.py"),
+                                full_path("/../layer_implementations"), jobs=2)
+
+        compiler.typecheck(full_path("/../examples/code/use_case_2/separate_layer_dim_success.fl"))
+        self.assertEqual({"rows", "cols", "rowcols"}, set(compiler.layer_states))
+        self.assertTrue(all(state == LayerVerificationState.SUCCESS for state in compiler.layer_states.values()))
+
+        compiler.typecheck(full_path("/../examples/code/use_case_2/separate_layer_dim_fail.fl"), raise_on_error=False)
+        self.assertEqual(LayerVerificationState.SUCCESS, compiler.layer_states["rows"])
+        self.assertEqual(LayerVerificationState.SUCCESS, compiler.layer_states["cols"])
+        self.assertEqual(LayerVerificationState.FAILURE, compiler.layer_states["rowcols"])
+        self.assertEqual("LiquidSubtypeException", compiler.layer_errors["rowcols"].original_exception.__class__.__name__)
+
+
+CACHED_LAYER = """
+from utils import call_order
+
+def depends_on():
+    return {dependencies}
+
+def typecheck(tree):
+    call_order.append("{name}")
+    tree.add_layer_annotation("{name}", "x", "checked", {value})
+    return tree
+"""
+
+FAILING_LAYER = """
+def typecheck(tree):
+    raise Exception("Layer F failed")
+"""
+
+class TestTypecheckCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.layer_dir = os.path.join(self.directory.name, "layers")
+        self.cache_dir = os.path.join(self.directory.name, "cache")
+        os.mkdir(self.layer_dir)
+
+        # B depends on A, which depends on C
+        self.write_layer("A", {"C"})
+        self.write_layer("B", {"A"})
+        self.write_layer("C", set())
+        with open(os.path.join(self.layer_dir, "F.py"), "w") as f:
+            f.write(FAILING_LAYER)
+
+        self.src_file = os.path.join(self.directory.name, "program.fl")
+        with open(self.src_file, "w") as f:
+            f.write("x::B:: ...\n\nx := 42\nx")
+
+        call_order.clear()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_layer(self, name, dependencies, value=1):
+        with open(os.path.join(self.layer_dir, f"{name}.py"), "w") as f:
+            f.write(CACHED_LAYER.format(name=name, dependencies=dependencies or "set()", value=value))
+
+    def typecheck(self, jobs=1):
+        compiler = LayeredCompiler(self.layer_dir, typecheck_cache_dir=self.cache_dir, jobs=jobs)
+        compiler.typecheck(self.src_file, raise_on_error=False)
+        return compiler
+
+    def test_unchanged_layers_are_restored(self):
+        self.typecheck()
+        self.assertEqual(call_order, ["C", "A", "B"])
+
+        call_order.clear()
+        compiler = self.typecheck()
+
+        self.assertEqual(call_order, [])
+        self.assertEqual(compiler.typecheck_cache_stats, {"hits": 3, "misses": 0})
+        self.assertTrue(all(state == LayerVerificationState.SUCCESS for state in compiler.layer_states.values()))
+        self.assertEqual(compiler.parsed_tree.get_layer_annotation("B", "x", "checked"), 1)
+
+    def test_changed_layer_invalidates_dependent_layers(self):
+        self.typecheck()
+
+        call_order.clear()
+        self.write_layer("A", {"C"}, value=2)
+        compiler = self.typecheck()
+
+        self.assertEqual(call_order, ["A", "B"])
+        self.assertEqual(compiler.parsed_tree.get_layer_annotation("A", "x", "checked"), 2)
+
+    def test_changed_dependency_closure_invalidates_layer(self):
+        self.typecheck()
+
+        # C now depends on D, so the closure of the dependencies of B changes while B and A are unchanged
+        call_order.clear()
+        self.write_layer("D", set())
+        self.write_layer("C", {"D"})
+        self.typecheck()
+
+        self.assertEqual(call_order, ["D", "C", "A", "B"])
+
+    def test_changed_source_invalidates_layers(self):
+        self.typecheck()
+
+        call_order.clear()
+        with open(self.src_file, "a") as f:
+            f.write("\nx")
+        self.typecheck()
+
+        self.assertEqual(call_order, ["C", "A", "B"])
+
+    def test_parallel_results_are_cached(self):
+        compiler = self.typecheck(jobs=2)
+        self.assertEqual(compiler.typecheck_cache_stats, {"hits": 0, "misses": 3})
+
+        call_order.clear()
+        compiler = self.typecheck()
+
+        self.assertEqual(call_order, [])
+        self.assertEqual(compiler.typecheck_cache_stats, {"hits": 3, "misses": 0})
+        self.assertEqual(compiler.parsed_tree.get_layer_annotation("B", "x", "checked"), 1)
+
+    def test_layer_files_include_indirect_modules(self):
+        compiler = LayeredCompiler(full_path("/../layer_implementations"))
+        compiler.parse(full_path("/../examples/code/use_case_2/separate_layer_rows_success.fl"))
+        compiler.build_layer_graph(compiler.parsed_tree)
+
+        # rows.py only refers to the liquid typechecker, which reaches the solver through other modules
+        files = {os.path.relpath(path, full_path("/..")) for path in layer_source_files(compiler.layers["rows"])}
+        for module in ["horn.py", "smt.py", "sub.py"]:
+            self.assertIn(os.path.join("aeon-lt", "aeon", "verification", module), files)
+        self.assertIn(os.path.join("aeon-lt", "aeon", "typing", "entailment.py"), files)
+
+    def test_edited_layer_is_verified_again_by_the_same_compiler(self):
+        compiler = LayeredCompiler(self.layer_dir, typecheck_cache_dir=self.cache_dir)
+        compiler.typecheck(self.src_file, raise_on_error=False)
+
+        # The layer is edited right after it was verified, possibly keeping its modification time
+        with open(os.path.join(self.layer_dir, "C.py"), "w") as f:
+            f.write(FAILING_LAYER)
+        compiler.typecheck(self.src_file, raise_on_error=False)
+
+        self.assertEqual(compiler.layer_states["C"], LayerVerificationState.FAILURE)
+        self.assertEqual(compiler.layer_states["B"], LayerVerificationState.BLOCKED)
+
+    def test_failure_is_restored(self):
+        with open(self.src_file, "w") as f:
+            f.write("x::F:: ...\n\nx := 42\nx")
+
+        self.typecheck()
+        compiler = self.typecheck()
+
+        self.assertEqual(compiler.typecheck_cache_stats, {"hits": 1, "misses": 0})
+        self.assertEqual(compiler.layer_states["F"], LayerVerificationState.FAILURE)
+        self.assertEqual(str(compiler.layer_errors["F"]), "Layer 'F' failed with error: Layer F failed")
+
+
+class TestLayerModuleCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.layer_dir = os.path.join(self.directory.name, "layers")
+        os.mkdir(self.layer_dir)
+
+        self.write_layer("A", set())
+        self.write_layer("B", {"A"})
+
+        self.src_file = os.path.join(self.directory.name, "program.fl")
+        with open(self.src_file, "w") as f:
+            f.write("x::B:: ...\n\nx := 42\nx")
+
+        self.compiler = LayeredCompiler(self.layer_dir)
+        call_order.clear()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_layer(self, name, dependencies, value=1):
+        with open(os.path.join(self.layer_dir, f"{name}.py"), "w") as f:
+            f.write(CACHED_LAYER.format(name=name, dependencies=dependencies or "set()", value=value))
+
+    def test_unchanged_modules_are_reused(self):
+        self.compiler.typecheck(self.src_file)
+        module = self.compiler.layers["B"].module
+
+        loads = LayerImplWrapper.loaded_layers_stats["loads"]
+        self.compiler.typecheck(self.src_file)
+
+        self.assertIs(module, self.compiler.layers["B"].module)
+        self.assertEqual(loads, LayerImplWrapper.loaded_layers_stats["loads"])
+        self.assertEqual(1, len(self.compiler.layer_graphs))
+        self.assertEqual(call_order, ["A", "B", "A", "B"])
+
+    def test_touched_modules_are_reused(self):
+        self.compiler.typecheck(self.src_file)
+        module = self.compiler.layers["A"].module
+
+        path = os.path.join(self.layer_dir, "A.py")
+        os.utime(path, ns=(0, 0))
+        self.compiler.typecheck(self.src_file)
+
+        self.assertIs(module, self.compiler.layers["A"].module)
+
+    def test_changed_modules_are_loaded_again(self):
+        self.compiler.typecheck(self.src_file)
+
+        # Same size and, on coarse file systems, possibly the same modification time
+        self.write_layer("A", set(), value=2)
+        self.compiler.typecheck(self.src_file)
+
+        self.assertEqual(self.compiler.parsed_tree.get_layer_annotation("A", "x", "checked"), 2)
+
+    def test_changed_dependencies_update_layer_graph(self):
+        self.compiler.typecheck(self.src_file)
+        self.assertEqual({"A": set(), "B": {"A"}}, self.compiler.layer_graph)
+
+        self.write_layer("C", set())
+        self.write_layer("A", {"C"})
+        call_order.clear()
+        self.compiler.typecheck(self.src_file)
+
+        self.assertEqual({"A": {"C"}, "B": {"A"}, "C": set()}, self.compiler.layer_graph)
+        self.assertEqual(call_order, ["C", "A", "B"])
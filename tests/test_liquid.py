@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 import pytest
@@ -7,6 +9,8 @@ from aeon.core.types import RefinedType, t_int
 from aeon.frontend.parser import parse_type
 from aeon.typing.context import EmptyContext
 from aeon.utils.ctx_helpers import build_context
+from aeon.verification import qualifiers
+from compiler.Compiler import LayeredCompiler
 from compiler.Exceptions import LayerException
 from compiler.interpreters.LiquidTypeChecker import substitute_argument_names, substitute_refinement_names, \
     rename_variable
@@ -56,6 +60,111 @@ class TestLiquidLayer(unittest.TestCase):
         self.assertEqual(type_actual, e.type_actual)
         self.assertEqual(type_expected, e.type_expected)
 
+    def test_multiple_failures_eager(self):
+        compiler = get_compiler(layer_path="layer_implementations")
+        src_file = full_path("/test_code/liquid/multiple_failures.fl")
+
+        with self.assertRaises(LayerException) as context:
+            compiler.typecheck(src_file)
+
+        # Typechecking stops at the first failure
+        e = context.exception.original_exception
+        self.assertEqual("LiquidSubtypeException", e.__class__.__name__)
+        self.assertEqual(4, e.lineno)
+
+    def test_multiple_failures_two_phase(self):
+        for vc_jobs in [1, 2]:
+            compiler = get_compiler(layer_path="layer_implementations", vc_jobs=vc_jobs)
+            src_file = full_path("/test_code/liquid/multiple_failures.fl")
+
+            with self.assertRaises(LayerException) as context:
+                compiler.typecheck(src_file)
+
+            e = context.exception.original_exception
+            self.assertEqual("LiquidVerificationErrors", e.__class__.__name__)
+            self.assertEqual([(4, 1), (6, 5)], [(error.lineno, error.offset) for error in e.errors])
+            self.assertEqual(parse_type("{v:Int | v == 3}"), e.errors[1].type_actual)
+            self.assertEqual(parse_type("{c:Int | c > 5}"), e.errors[1].type_expected)
+
+    def test_two_phase_failures_before_other_error(self):
+        src_file = full_path("/test_code/liquid/failure_before_undefined.fl")
+
+        compiler = get_compiler(layer_path="layer_implementations")
+        with self.assertRaises(LayerException) as context:
+            compiler.typecheck(src_file, check_cf=False)
+        self.assertEqual("LiquidSubtypeException", context.exception.original_exception.__class__.__name__)
+
+        # The failures collected before the error are reported with it
+        for fun_def_jobs in [0, 2]:
+            compiler = get_compiler(layer_path="layer_implementations", vc_jobs=1, fun_def_jobs=fun_def_jobs)
+            with self.assertRaises(LayerException) as context:
+                compiler.typecheck(src_file, check_cf=False)
+            e = context.exception.original_exception
+            self.assertEqual("LiquidVerificationErrors", e.__class__.__name__)
+            self.assertEqual(["LiquidSubtypeException", "LiquidTypeUndefinedError"], [error.__class__.__name__ for error in e.errors])
+            self.assertEqual([(4, 1), (5, 5)], [(error.lineno, error.offset) for error in e.errors])
+
+    def test_two_phase_single_failure(self):
+        compiler = get_compiler(layer_path="layer_implementations", vc_jobs=2)
+        src_file = full_path("/test_code/liquid/simple_assignment_fail.fl")
+
+        with self.assertRaises(LayerException) as context:
+            compiler.typecheck(src_file)
+
+        e = context.exception.original_exception
+        self.assertEqual("LiquidSubtypeException", e.__class__.__name__)
+        self.assertEqual(4, e.lineno)
+
+    def test_two_phase_correct_file(self):
+        compiler = get_compiler(layer_path="layer_implementations", vc_jobs=2)
+        self.assertTrue(compiler.typecheck(full_path("/test_code/liquid/fun_def_multiple_args.fl")))
+
+    def test_parallel_fun_defs_same_results(self):
+        for file in ["fun_def.fl", "fun_def_fail_inner.fl", "fun_def_fail_oncall.fl", "fun_def_multiple_args.fl",
+                     "fun_def_multiple_args_fail.fl", "fun_def_multiple_args_fail_oncall.fl"]:
+            src_file = full_path(f"/test_code/liquid/{file}")
+            outcomes = []
+            annotations = []
+            for fun_def_jobs in [0, 2]:
+                compiler = get_compiler(layer_path="layer_implementations", fun_def_jobs=fun_def_jobs)
+                try:
+                    compiler.typecheck(src_file)
+                    outcomes.append(None)
+                except LayerException as e:
+                    outcomes.append((e.original_exception.__class__, e.original_exception.lineno))
+                # The annotations of the bodies checked by other processes are merged back into the tree (unless they fail)
+                annotations.append([sorted((layer_id, identifier, key) for layer_id, identifier, key, _ in node.iter_layer_annotations())
+                                    for node in compiler.parsed_tree.iter_subtrees_topdown()])
+            self.assertEqual(outcomes[0], outcomes[1], file)
+            if outcomes[0] is None:
+                self.assertEqual(annotations[0], annotations[1], file)
+
+    def test_parallel_fun_defs_failures_in_order(self):
+        src_file = full_path("/test_code/liquid/multiple_fun_def_failures.fl")
+
+        compiler = get_compiler(layer_path="layer_implementations", fun_def_jobs=2)
+        with self.assertRaises(LayerException) as context:
+            compiler.typecheck(src_file)
+        e = context.exception.original_exception
+        self.assertEqual("LiquidSubtypeException", e.__class__.__name__)
+        self.assertEqual(4, e.lineno)
+
+        compiler = get_compiler(layer_path="layer_implementations", vc_jobs=1, fun_def_jobs=2)
+        with self.assertRaises(LayerException) as context:
+            compiler.typecheck(src_file)
+        e = context.exception.original_exception
+        self.assertEqual("LiquidVerificationErrors", e.__class__.__name__)
+        self.assertEqual([(4, 5), (12, 5)], [(error.lineno, error.offset) for error in e.errors])
+
+    def test_annotations_share_contexts(self):
+        compiler = get_compiler(layer_path="layer_implementations")
+        self.assertTrue(compiler.typecheck(full_path("/test_code/liquid/fun_def_multiple_args.fl")))
+
+        # Nodes visited in the same context point to it instead of a copy each
+        contexts = [node.get_layer_annotation("liquid", "liquid", "context") for node in compiler.parsed_tree.iter_subtrees()]
+        contexts = [ctx for ctx in contexts if ctx is not None]
+        self.assertLess(len({id(ctx) for ctx in contexts}), len(contexts))
+
     def test_fun_call_noArgs(self):
         typecheck_correct_file(self, "/test_code/liquid/fun_call_noArgs.fl")
 
@@ -249,12 +358,198 @@ class TestLiquidLayer(unittest.TestCase):
     def test_bin_op_cmp(self):
         typecheck_correct_file(self, "/test_code/liquid/bin_op_cmp.fl")
 
+    def test_bin_op_unsupported(self):
+        compiler = get_compiler(layer_path="layer_implementations")
+        src_file = full_path("/test_code/liquid/bin_op_unsupported.fl")
+
+        with self.assertRaises(LayerException) as context:
+            compiler.typecheck(src_file)
+
+        e = context.exception.original_exception
+        self.assertEqual("TypecheckException", e.__class__.__name__)
+        self.assertEqual("3:10: Operator '&&' is not supported on operands of type Int and Int", e.msg)
+
+    def test_bool_literals(self):
+        typecheck_correct_file(self, "/test_code/liquid/bool_literals.fl")
+
+    def test_bool_literals_fail(self):
+        compiler = get_compiler(layer_path="layer_implementations")
+        src_file = full_path("/test_code/liquid/bool_literals_fail.fl")
+
+        with self.assertRaises(LayerException) as context:
+            compiler.typecheck(src_file)
+
+        self.assertEqual("liquid", context.exception.layer_name)
+        e = context.exception.original_exception
+        self.assertEqual("LiquidSubtypeException", e.__class__.__name__)
+        self.assertEqual(4, e.lineno)
+        self.assertEqual(1, e.offset)
+
+        type_expected = parse_type("{b:Bool | b}")
+        type_actual = parse_type("{v:Bool | !v}")
+        self.assertEqual(type_actual, e.type_actual)
+        self.assertEqual(type_expected, e.type_expected)
+
     def test_uninterpreted_fun(self):
         typecheck_correct_file(self, "/test_code/liquid/uninterpreted_fun.fl")
 
     def test_additional_context(self):
         typecheck_correct_file(self, "/test_code/liquid/additional_context.fl")
 
+    def test_entailment_cache(self):
+        compiler = get_compiler(layer_path=full_path("/../layer_implementations"))
+        src_file = full_path("/test_code/liquid/fun_def_multiple_args.fl")
+
+        compiler.typecheck(src_file)
+        stats = dict(compiler.entailment_cache_stats)
+        self.assertGreater(stats["misses"], 0)
+
+        # A second typecheck of the same program re-uses every validity result
+        compiler.typecheck(src_file)
+        self.assertEqual(stats["misses"], compiler.entailment_cache_stats["misses"])
+        self.assertEqual(2 * stats["hits"] + stats["misses"], compiler.entailment_cache_stats["hits"])
+
+    def test_entailment_cache_failure(self):
+        compiler = get_compiler(layer_path=full_path("/../layer_implementations"))
+        src_file = full_path("/test_code/liquid/simple_assignment_fail.fl")
+
+        for _ in range(2):
+            with self.assertRaises(LayerException):
+                compiler.typecheck(src_file)
+        self.assertGreater(compiler.entailment_cache_stats["hits"], 0)
+
+    def test_parallel_layer_failure(self):
+        # Errors raised in a worker process keep their position and types
+        compiler = get_compiler(layer_path=full_path("/../layer_implementations"), jobs=2)
+        src_file = full_path("/test_code/liquid/simple_assignment_fail.fl")
+
+        with self.assertRaises(LayerException) as context:
+            compiler.typecheck(src_file)
+
+        self.assertEqual("liquid", context.exception.layer_name)
+        e = context.exception.original_exception
+        self.assertEqual("LiquidSubtypeException", e.__class__.__name__)
+        self.assertEqual(4, e.lineno)
+        self.assertEqual(1, e.offset)
+        self.assertEqual(parse_type("{v:Int | v == 0}"), e.type_actual)
+        self.assertEqual(parse_type("{c:Int | c > 0}"), e.type_expected)
+
+SUMMARIZED_PROGRAM = """
+first :: liquid :: { v:Int | v >= 0 } -> { v:Int | v >= 0 }
+first x {
+    y :: liquid :: {v:Int | v >= 0}
+    let y := x + 1 in {
+        y
+    }
+}
+
+second :: liquid :: { v:Int | v >= 0 } -> { v:Int | v >= 0 }
+second x {
+    z :: liquid :: {v:Int | v >= 0}
+    let z := x + {increment} in {
+        z
+    }
+}
+
+first(1)
+"""
+
+CALLER_PROGRAM = """
+first :: liquid :: { v:Int | v >= 0 } -> { v:Int | {bound} }
+first x {
+    y :: liquid :: {v:Int | v >= 1}
+    let y := x + 1 in {
+        y
+    }
+}
+
+second :: liquid :: { v:Int | v >= 0 } -> { v:Int | v >= 1 }
+second x {
+    z :: liquid :: {v:Int | v >= 1}
+    let z := first(x) in {
+        z
+    }
+}
+
+second(1)
+"""
+
+class TestLayerQualifiers(unittest.TestCase):
+    def test_qualifiers_are_scoped_to_their_layer(self):
+        compiler = get_compiler(full_path("/../examples/python_impls/use_case_2.py"), full_path("/../layer_implementations"))
+        compiler.typecheck(full_path("/../examples/code/use_case_2/separate_layer_dim_success.fl"))
+
+        self.assertTrue(all(state.name == "SUCCESS" for state in compiler.layer_states.values()))
+        # rows and cols only tried their dataset qualifiers while they were verified
+        self.assertEqual([], qualifiers.qualifier_library.domain)
+
+
+class TestFunctionSummaries(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.directory.name, "cache")
+        self.src_file = os.path.join(self.directory.name, "program.fl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def typecheck(self, increment, **options):
+        return self.typecheck_source(SUMMARIZED_PROGRAM.replace("{increment}", increment), **options)
+
+    def typecheck_source(self, source, **options):
+        with open(self.src_file, "w") as f:
+            f.write(source)
+        compiler = LayeredCompiler("layer_implementations", full_path("/implementations.py"), typecheck_cache_dir=self.cache_dir,
+                                   **options)
+        compiler.typecheck(self.src_file)
+        return compiler
+
+    def test_unchanged_functions_are_restored(self):
+        compiler = self.typecheck("2")
+        self.assertEqual(compiler.function_summary_stats, {"hits": 0, "misses": 2})
+        fresh_tree = compiler.parsed_tree
+
+        # Only the edited function is verified again
+        compiler = self.typecheck("3")
+        self.assertEqual(compiler.function_summary_stats, {"hits": 1, "misses": 1})
+
+        # The annotations of the body of the first function are restored
+        annotations = []
+        for tree in [fresh_tree, compiler.parsed_tree]:
+            first = next(node for node in tree.iter_subtrees_topdown() if node.data == "fun_def")
+            annotations.append([sorted((layer_id, identifier, key, repr(value)) for layer_id, identifier, key, value in node.iter_layer_annotations())
+                                for node in first.iter_subtrees_topdown()])
+        self.assertEqual(annotations[0], annotations[1])
+        self.assertTrue(any(annotations[1]))
+
+        compiler = self.typecheck("4")
+        self.assertEqual(compiler.function_summary_stats, {"hits": 1, "misses": 1})
+
+    def test_failing_functions_are_verified_again(self):
+        self.typecheck("2")
+
+        with self.assertRaises(LayerException):
+            self.typecheck("x - 5")
+        with self.assertRaises(LayerException) as context:
+            self.typecheck("x - 5")
+
+        self.assertEqual(13, context.exception.original_exception.lineno)
+
+    def test_callers_are_verified_again(self):
+        compiler = self.typecheck_source(CALLER_PROGRAM.replace("{bound}", "v >= 1"))
+        self.assertEqual(compiler.function_summary_stats, {"hits": 0, "misses": 2})
+
+        # Only the signature of the callee changes, and the caller no longer verifies
+        with self.assertRaises(LayerException) as context:
+            self.typecheck_source(CALLER_PROGRAM.replace("{bound}", "v >= 0"))
+        self.assertEqual(13, context.exception.original_exception.lineno)
+
+    def test_options_are_part_of_the_key(self):
+        self.typecheck("2")
+        compiler = self.typecheck("3", horn_backend="spacer")
+        self.assertEqual(compiler.function_summary_stats, {"hits": 0, "misses": 2})
+
 refinement_replacement_test_vals = [
     ([parse_type("{v:Int | v > 0}")],
      [RefinedType("$arg0", t_int,
@@ -525,19 +820,27 @@ fun_call_var_renaming_test_vals = [
 ]
 @pytest.mark.parametrize("types_before,types_after", refinement_replacement_test_vals)
 def test_refinement_substitutions(types_before, types_after):
-    substitute_refinement_names([*types_before, None])
-    assert types_after == types_before
+    assert types_after == substitute_refinement_names([*types_before, None])[:-1]
 
 @pytest.mark.parametrize("arg_names,types_before,types_after", argument_names_substitution_test_vals)
 def test_argument_names_substitution(arg_names, types_before, types_after):
-    substitute_argument_names(arg_names, types_before)
-    assert types_after == types_before
+    assert types_after == substitute_argument_names(arg_names, types_before)
 
 @pytest.mark.parametrize("arg_names,types_before,types_after", end_to_end_test_vals)
 def test_fun_def_end_to_end(arg_names, types_before, types_after):
-    substitute_refinement_names([*types_before, None])
-    substitute_argument_names(arg_names, types_before)
-    assert types_after == types_before
+    renamed_types = substitute_refinement_names([*types_before, None])[:-1]
+    assert types_after == substitute_argument_names(arg_names, renamed_types)
+
+def test_substitutions_leave_types_unchanged():
+    types_before = [parse_type("{x:Int | x > 0}"), parse_type("{y:Int | y > x}"), parse_type("{z:Int | z > y}")]
+    reprs_before = [repr(t) for t in types_before]
+    renamed_types = substitute_argument_names(["a", "b"], substitute_refinement_names(types_before))
+    assert [repr(t) for t in types_before] == reprs_before
+    assert renamed_types[0] is not types_before[0]
+    # The return type is not renamed, so it is shared
+    assert renamed_types[-1] is types_before[-1]
+    with pytest.raises(AttributeError):
+        types_before[0].refinement = renamed_types[0].refinement
 
 @pytest.mark.parametrize("test_input,expected_output", fun_call_var_renaming_test_vals)
 def test_fun_call_var_renaming(test_input, expected_output):
@@ -17,6 +17,15 @@ class TestParser(unittest.TestCase):
         self.assertEqual(tree.children[0].children[2].value, "{Refinement}")
         pass
 
+    def test_layers_collected_while_parsing(self):
+        compiler = get_compiler()
+        tree = compiler.parse(full_path("/test_code/syntax/layer.fl"))
+
+        self.assertIs(compiler.parsed_tree, tree)
+        self.assertEqual(list(compiler.parsed_layers.keys()), ["layer"])
+        self.assertEqual(compiler.parsed_layers["layer"].refinements, {"id": ["{Refinement}"]})
+        self.assertFalse(any(node.data == "newline" for node in tree.iter_subtrees()))
+
     def test_assign(self):
         tree = parse_file("/test_code/syntax/assign.fl")
 
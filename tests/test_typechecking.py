@@ -1,7 +1,10 @@
 import unittest
 
 from compiler.Exceptions import LayerException
-from utils import get_compiler, full_path, typecheck_correct_file
+from compiler.transformers.CreateAnnotatedTree import make_annotated_tree
+from layers.Layer import Layer
+from layers.LayerImplWrapper import LayerImplWrapper
+from utils import get_compiler, full_path, typecheck_correct_file, parse_file
 
 
 class Typechecking(unittest.TestCase):
@@ -118,3 +121,21 @@ class Typechecking(unittest.TestCase):
         self.assertEqual(e.__class__.__name__, "TypecheckException")
         self.assertEqual(e.lineno, 5)
         self.assertEqual(e.offset, 1)
+
+    def test_type_annotations_share_scope(self):
+        tree = make_annotated_tree(parse_file("/test_code/typechecking/type_annotation_different_scope.fl"))
+        LayerImplWrapper(full_path("/../layer_implementations"), Layer("types")).typecheck(tree)
+
+        statements = tree.children
+        # Both statements after the type definitions point to the same scope instead of a copy per node
+        fun_def, assign = statements[-2], statements[-1]
+        self.assertEqual(["bool"], assign.get_layer_annotation("types", "x", "type"))
+        self.assertEqual(["int", "bool"], assign.get_layer_annotation("types", "function", "fun_type"))
+        self.assertEqual({"type": ["bool"]}, assign.get_all_layer_annotations("types", "x"))
+        fun_def_scopes = {(layer_id, key): scope for layer_id, key, scope in fun_def.iter_layer_scopes()}
+        assign_scopes = {(layer_id, key): scope for layer_id, key, scope in assign.iter_layer_scopes()}
+        self.assertIs(fun_def_scopes["types", "type"], assign_scopes["types", "type"])
+
+        # Inside the function, x is shadowed by its local type
+        inner_assign = fun_def.children[-1].children[1]
+        self.assertEqual(["int"], inner_assign.get_layer_annotation("types", "x", "type"))
@@ -15,8 +15,8 @@ def parse_file(file_path):
 
     return tree
 
-def get_compiler(impl_path = full_path("/implementations.py"), layer_path = full_path("/layer_implementations")):
-    compiler = LayeredCompiler(layer_path, impl_path)
+def get_compiler(impl_path = full_path("/implementations.py"), layer_path = full_path("/layer_implementations"), jobs = 1, vc_jobs = 0, fun_def_jobs = 0):
+    compiler = LayeredCompiler(layer_path, impl_path, jobs=jobs, vc_jobs=vc_jobs, fun_def_jobs=fun_def_jobs)
 
     return compiler
 